@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""Time every generator on synthetic projects of increasing size.
+
+For each size a pristine project is built once with ``synthetic_db.py``.
+Each generator then runs in its own copy of it three times: cold (nothing
+generated yet), warm (again, with no changes) and after changing the
+description of the newest photo. Every run records wall time, peak RSS of
+the child process and the files it created, modified or removed. Results
+are written as JSON, named after the current commit, so runs on different
+commits can be compared.
+
+    python3 benchmarks/generators.py --sizes 1000,10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from synthetic_db import PROJECT_ROOT, build_synthetic_project, copy_project_files
+
+
+GENERATORS = {
+    "feed-rss": "feed-rss.py",
+    "photo-pages": "generate_photo_pages.py",
+    "editorial": "generate_editorial_collections.py",
+    "update-tags": "update-tags.py",
+    "update-ai-tags": "update-ai-tags.py",
+    "publish": "publish.py",
+}
+PHASES = ("cold", "warm", "single-change")
+DEFAULT_SIZES = "1000,10000,100000,500000"
+IGNORED_DIRS = {"files", "__pycache__"}
+
+
+def snapshot(project: Path) -> dict[str, tuple[int, int]]:
+    """Map every generated file to its size and modification time."""
+    files: dict[str, tuple[int, int]] = {}
+    pending = [project]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in IGNORED_DIRS:
+                        pending.append(Path(entry.path))
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def clone_project(base: Path, destination: Path) -> None:
+    """Copy a pristine project, hard-linking the read-only images."""
+    def copy(source: str, target: str) -> None:
+        if Path(source).parent.name == "files":
+            os.link(source, target)
+        else:
+            shutil.copy2(source, target)
+
+    shutil.copytree(base, destination, copy_function=copy)
+    copy_project_files(destination)
+
+
+def change_newest_photo(project: Path) -> None:
+    with sqlite3.connect(project / "fotos.db") as connection:
+        connection.execute(
+            """
+            UPDATE imagenes
+            SET description = COALESCE(description, '') || ' #benchmark'
+            WHERE id = (SELECT id FROM imagenes ORDER BY date DESC LIMIT 1)
+            """
+        )
+
+
+def run_generator(project: Path, script: str) -> dict:
+    before = snapshot(project)
+    with tempfile.TemporaryFile() as errors:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, script],
+            cwd=project / "scripts",
+            stdout=subprocess.DEVNULL,
+            stderr=errors,
+        )
+        _, status, usage = os.wait4(process.pid, 0)
+        wall_seconds = time.perf_counter() - start
+        returncode = os.waitstatus_to_exitcode(status)
+        process.returncode = returncode
+        if returncode != 0:
+            errors.seek(0)
+            sys.stderr.write(errors.read().decode("utf-8", "replace"))
+    after = snapshot(project)
+    return {
+        "wall_seconds": round(wall_seconds, 4),
+        # ru_maxrss is reported in KiB on Linux.
+        "peak_rss_kib": usage.ru_maxrss,
+        "files_written": sum(1 for path, state in after.items() if before.get(path) != state),
+        "files_removed": sum(1 for path in before if path not in after),
+        "returncode": returncode,
+    }
+
+
+def benchmark_generator(base: Path, workdir: Path, photos: int, name: str) -> list[dict]:
+    project = workdir / f"{name}-{photos}"
+    if project.exists():
+        shutil.rmtree(project)
+    clone_project(base, project)
+    results = []
+    try:
+        for phase in PHASES:
+            if phase == "single-change":
+                change_newest_photo(project)
+            result = {"generator": name, "photos": photos, "phase": phase}
+            result.update(run_generator(project, GENERATORS[name]))
+            results.append(result)
+            print(
+                f"{name:>15} {photos:>7} {phase:>13}: {result['wall_seconds']:8.3f} s, "
+                f"{result['peak_rss_kib'] / 1024:7.1f} MiB, {result['files_written']} escritos",
+                file=sys.stderr,
+            )
+    finally:
+        shutil.rmtree(project, ignore_errors=True)
+    return results
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def run_benchmarks(sizes: list[int], generators: list[str], workdir: Path, seed: int = 1) -> dict:
+    results = []
+    for photos in sizes:
+        base = workdir / f"base-{photos}-{seed}"
+        if not (base / "fotos.db").exists():
+            print(f"Creando proyecto sintético con {photos} fotos…", file=sys.stderr)
+            build_synthetic_project(base, photos, seed)
+        for name in generators:
+            results.extend(benchmark_generator(base, workdir, photos, name))
+    return {
+        "commit": current_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="tamaños separados por comas")
+    parser.add_argument(
+        "--generators",
+        default=",".join(GENERATORS),
+        help=f"generadores separados por comas ({', '.join(GENERATORS)})",
+    )
+    parser.add_argument(
+        "--workdir",
+        type=Path,
+        help="directorio donde conservar los proyectos sintéticos entre ejecuciones",
+    )
+    parser.add_argument("--seed", type=int, default=1, help="semilla de los datos sintéticos")
+    parser.add_argument("--output", type=Path, help="archivo JSON de resultados")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    generators = [name for name in args.generators.split(",") if name]
+    unknown = [name for name in generators if name not in GENERATORS]
+    if unknown:
+        parser.error(f"generadores desconocidos: {', '.join(unknown)}")
+
+    if args.workdir:
+        args.workdir.mkdir(parents=True, exist_ok=True)
+        report = run_benchmarks(sizes, generators, args.workdir, args.seed)
+    else:
+        with tempfile.TemporaryDirectory(prefix="fotos-bench-") as directory:
+            report = run_benchmarks(sizes, generators, Path(directory), args.seed)
+
+    output = args.output or PROJECT_ROOT / "benchmarks" / "results" / f"{report['commit'][:12]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(f"Resultados en {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Compare per-page regex substitution with the precompiled PageTemplate.
+
+Renders the same synthetic meta blocks into ``index.html`` both ways and
+reports the wall time of each path. Nothing is written to disk.
+
+    python3 benchmarks/page_template.py --pages 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+
+from generate_photo_pages import META_BLOCK_RE, build_meta_block  # noqa: E402
+from page_template import PageTemplate  # noqa: E402
+
+
+def synthetic_meta_blocks(count: int) -> list[str]:
+    return [
+        build_meta_block(
+            str(100000 + index),
+            f"{100000 + index}.jpg",
+            f"Autor {index % 50}",
+            f"Foto {index} de la Plaza Mayor #valladolid #plazamayor",
+            (1600, 1200),
+        )
+        for index in range(count)
+    ]
+
+
+def time_regex(template: str, blocks: list[str]) -> float:
+    start = time.perf_counter()
+    for meta in blocks:
+        META_BLOCK_RE.sub(meta, template, count=1)
+    return time.perf_counter() - start
+
+
+def time_page_template(template: str, blocks: list[str]) -> float:
+    start = time.perf_counter()
+    compiled = PageTemplate(template, {"meta": META_BLOCK_RE})
+    for meta in blocks:
+        compiled.render(meta=meta)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=50000, help="páginas a renderizar")
+    parser.add_argument("--repeat", type=int, default=3, help="repeticiones; se usa la mejor")
+    args = parser.parse_args()
+
+    template = (PROJECT_ROOT / "index.html").read_text(encoding="utf-8")
+    blocks = synthetic_meta_blocks(args.pages)
+    compiled = PageTemplate(template, {"meta": META_BLOCK_RE})
+    if compiled.render(meta=blocks[0]) != META_BLOCK_RE.sub(blocks[0], template, count=1):
+        raise SystemExit("Las dos rutas no producen la misma página")
+
+    regex = min(time_regex(template, blocks) for _ in range(args.repeat))
+    joined = min(time_page_template(template, blocks) for _ in range(args.repeat))
+    print(f"Plantilla: {len(template.encode('utf-8')) / 1024:.1f} KiB, {args.pages} páginas")
+    print(f"re.sub por página:  {regex:.3f} s ({regex / args.pages * 1e6:.1f} µs/página)")
+    print(f"PageTemplate:       {joined:.3f} s ({joined / args.pages * 1e6:.1f} µs/página)")
+    print(f"Mejora: x{regex / joined:.1f}")
+
+
+if __name__ == "__main__":
+    main()
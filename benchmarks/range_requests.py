@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""Count the bytes each front-end query fetches from the range layout.
+
+The database written by ``scripts/range_layout.py`` is opened through an
+apsw VFS that reads it from a stand-in for the static server: every read
+is served from the chunk files in blocks of ``requestChunkSize`` bytes,
+like an HTTP-range VFS in the browser, and the requests and bytes are
+counted. Each query of the web client runs on a new connection, as on a
+first visit, so its count includes the header and the schema. Blocks are
+cached per connection and nothing is read ahead, so the counts are the
+least a client can fetch.
+
+Needs ``apsw`` (``pip install apsw``).
+
+    python3 benchmarks/range_requests.py --photos 10000 --page-sizes 1024,4096,8192
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import apsw
+except ImportError:  # pragma: no cover - optional dependency
+    apsw = None
+
+from synthetic_db import PROJECT_ROOT, build_synthetic_project
+
+sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+
+import range_layout  # noqa: E402
+
+
+# Copied from the client; tests/test_range_requests.py checks they still are.
+# ``?`` is bound to the path of the newest photo posted to Bluesky.
+QUERIES = {
+    "populares.js:total": ("js/populares.js", "SELECT COUNT(*) AS total FROM imagenes"),
+    "populares.js:populares": ("js/populares.js", """
+      SELECT i.*, bic.like_count, bic.comment_count, bic.repost_count, bic.last_updated, bp.post_id,
+             ia.is_appropriate, ia.description as ai_description, ia.tags as ai_tags
+      FROM imagenes i
+      JOIN bluesky_interactions_cache bic ON i.id = bic.image_id
+      JOIN bluesky_posts bp ON i.id = bp.image_id
+      LEFT JOIN image_analysis ia ON i.id = ia.image_id
+      WHERE (ia.is_appropriate = 1 OR ia.is_appropriate IS NULL)
+        AND (bic.like_count > 0 OR bic.comment_count > 0 OR bic.repost_count > 0)
+      ORDER BY (bic.like_count + bic.comment_count * 2 + bic.repost_count) DESC, bic.like_count DESC
+    """),
+    "editorial-promo.js:populares": ("js/editorial-promo.js", """
+          SELECT i.id, i.path, i.description, bic.like_count, bic.comment_count
+          FROM imagenes i
+          JOIN bluesky_interactions_cache bic ON i.id = bic.image_id
+          LEFT JOIN image_analysis ia ON i.id = ia.image_id
+          WHERE (ia.is_appropriate = 1 OR ia.is_appropriate IS NULL)
+            AND (bic.like_count > 0 OR bic.comment_count > 0 OR bic.repost_count > 0)
+          ORDER BY (bic.like_count + bic.comment_count * 2 + bic.repost_count) DESC,
+                   bic.like_count DESC
+          LIMIT 3
+    """),
+    "database-manager.js:post_id": ("js/database-manager.js", """
+          SELECT bp.post_id
+           FROM bluesky_posts bp
+           JOIN imagenes i ON bp.image_id = i.id
+           WHERE i.path = ?
+    """),
+    "database-manager.js:interacciones": ("js/database-manager.js", """
+          SELECT bic.like_count, bic.comment_count, bic.repost_count, bic.last_updated,
+                 bp.post_id
+          FROM bluesky_interactions_cache bic
+          JOIN imagenes i ON bic.image_id = i.id
+          JOIN bluesky_posts bp ON bp.image_id = i.id
+          WHERE i.path = ?
+    """),
+    "miradas.js:fotos": ("js/miradas.js", """
+      SELECT i.id, i.path, i.author, i.description, i.date,
+             ia.description AS ai_description, ia.tags AS ai_tags,
+             ia.is_appropriate
+      FROM imagenes i
+      LEFT JOIN image_analysis ia ON ia.image_id = i.id
+      WHERE ia.is_appropriate = 1 OR ia.is_appropriate IS NULL
+      ORDER BY i.date DESC
+    """),
+    "database-manager.js:galeria": ("js/database-manager.js", """
+      SELECT i.*, date(i.date) as fecha_grupo,
+             ia.is_appropriate,
+             ia.description as ai_description,
+             ia.tags as ai_tags
+      FROM imagenes i
+      LEFT JOIN image_analysis ia ON i.id = ia.image_id
+      ORDER BY i.date DESC
+    """),
+}
+DEFAULT_PAGE_SIZES = "1024,4096,8192"
+
+
+class RangeServer:
+    """Serves byte ranges of the layout in ``directory`` and counts them."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        self.config = json.loads((self.directory / range_layout.CONFIG_NAME).read_text(encoding="utf-8"))
+        self.requests = 0
+        self.bytes = 0
+
+    def fetch(self, offset: int, length: int) -> bytes:
+        """Return ``length`` bytes from ``offset``, one request per chunk file."""
+        chunk_size = self.config["serverChunkSize"]
+        data = bytearray()
+        while length > 0:
+            number, start = divmod(offset, chunk_size)
+            size = min(length, chunk_size - start)
+            name = self.config["urlPrefix"] + str(number).zfill(self.config["suffixLength"])
+            with open(self.directory / name, "rb") as chunk:
+                chunk.seek(start)
+                part = chunk.read(size)
+            self.requests += 1
+            self.bytes += len(part)
+            data += part
+            offset += size
+            length -= size
+        return bytes(data)
+
+
+class RangeFile:
+    """The database as an HTTP-range VFS sees it: read-only, fetched in blocks."""
+
+    def __init__(self, server: RangeServer) -> None:
+        self.server = server
+        self.block = server.config["requestChunkSize"]
+        self.size = server.config["databaseLengthBytes"]
+        self.blocks: dict[int, bytes] = {}
+
+    def xRead(self, amount: int, offset: int) -> bytes:
+        first, last = offset // self.block, (offset + amount - 1) // self.block
+        number = first
+        while number <= last:
+            if number in self.blocks:
+                number += 1
+                continue
+            # Consecutive missing blocks are fetched in one request.
+            end = number
+            while end + 1 <= last and end + 1 not in self.blocks:
+                end += 1
+            start = number * self.block
+            data = self.server.fetch(start, min((end + 1) * self.block, self.size) - start)
+            for index in range(number, end + 1):
+                self.blocks[index] = data[(index - number) * self.block:(index - number + 1) * self.block]
+            number = end + 1
+        data = b"".join(self.blocks[index] for index in range(first, last + 1))
+        start = offset - first * self.block
+        return data[start:start + amount]
+
+    def xFileSize(self) -> int:
+        return self.size
+
+    def xCheckReservedLock(self) -> bool:
+        return False
+
+    def xLock(self, level: int) -> None:
+        pass
+
+    def xUnlock(self, level: int) -> None:
+        pass
+
+    def xSectorSize(self) -> int:
+        return 0
+
+    def xDeviceCharacteristics(self) -> int:
+        return 0
+
+    def xFileControl(self, op: int, pointer: int) -> bool:
+        return False
+
+    def xClose(self) -> None:
+        pass
+
+
+@contextmanager
+def open_database(server: RangeServer) -> Iterator:
+    """Yield an apsw connection that reads the database from ``server``."""
+    if apsw is None:
+        raise RuntimeError("Hace falta apsw: pip install apsw")
+
+    class RangeVFS(apsw.VFS):
+        def __init__(self) -> None:
+            self.name = f"range-{id(self)}"
+            super().__init__(self.name, "")
+
+        def xOpen(self, name, flags):
+            return RangeFile(server)
+
+        def xAccess(self, pathname: str, flags: int) -> bool:
+            return False
+
+    vfs = RangeVFS()
+    connection = apsw.Connection(
+        "file:fotos-public.db?immutable=1",
+        flags=apsw.SQLITE_OPEN_READONLY | apsw.SQLITE_OPEN_URI,
+        vfs=vfs.name,
+    )
+    try:
+        yield connection
+    finally:
+        connection.close()
+        vfs.unregister()
+
+
+def sample_path(directory: Path) -> str | None:
+    with open_database(RangeServer(directory)) as connection:
+        row = connection.execute(
+            "SELECT i.path FROM imagenes i JOIN bluesky_posts bp ON bp.image_id = i.id"
+            " ORDER BY i.date DESC LIMIT 1"
+        ).fetchone()
+    return row[0] if row else None
+
+
+def measure(directory: Path) -> list[dict]:
+    """Run every query on a cold connection and count what it fetched."""
+    path = sample_path(directory)
+    results = []
+    for name, (_, sql) in QUERIES.items():
+        server = RangeServer(directory)
+        with open_database(server) as connection:
+            rows = connection.execute(sql, (path,) if "?" in sql else ()).fetchall()
+        results.append({"query": name, "rows": len(rows), "requests": server.requests, "bytes": server.bytes})
+    return results
+
+
+def run(project: Path, page_sizes: list[int]) -> list[dict]:
+    report = []
+    for page_size in page_sizes:
+        size, chunks, _ = range_layout.write_layout(project, page_size=page_size)
+        directory = project / range_layout.DIRECTORY
+        report.append({"page_size": page_size, "database_bytes": size, "chunks": chunks,
+                       "queries": measure(directory)})
+    return report
+
+
+def print_report(report: list[dict]) -> None:
+    for layout in report:
+        print(f"page_size {layout['page_size']}: {layout['database_bytes']} bytes en {layout['chunks']} fragmentos")
+        for result in layout["queries"]:
+            share = result["bytes"] / layout["database_bytes"] * 100
+            print(
+                f"  {result['query']:<36} {result['rows']:>7} filas {result['requests']:>6} peticiones"
+                f" {result['bytes']:>11} bytes ({share:.1f} %)"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--project", type=Path, help="proyecto con fotos.db (por defecto, uno sintético)")
+    parser.add_argument("--photos", type=int, default=10000, help="fotos del proyecto sintético")
+    parser.add_argument("--page-sizes", default=DEFAULT_PAGE_SIZES, help="tamaños de página separados por comas")
+    parser.add_argument("--output", type=Path, help="archivo JSON de resultados")
+    args = parser.parse_args()
+    if apsw is None:
+        parser.error("hace falta apsw: pip install apsw")
+    page_sizes = [int(size) for size in args.page_sizes.split(",") if size]
+
+    with tempfile.TemporaryDirectory(prefix="fotos-ranges-") as directory:
+        project = Path(directory) / "project"
+        if args.project:
+            # The layouts are written next to a copy, not in the project.
+            project.mkdir()
+            shutil.copyfile(args.project / "fotos.db", project / "fotos.db")
+        else:
+            build_synthetic_project(project, args.photos)
+        report = run(project, page_sizes)
+
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Compare the ElementTree and minidom round trip with the streaming RSS writer.
+
+Serialises the same synthetic feed both ways and reports the best wall time
+of each path. Nothing is written to disk.
+
+    python3 benchmarks/rss_feed.py --items 100 --runs 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from xml.dom import minidom
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+
+import rss_writer  # noqa: E402
+
+
+CHANNEL = [
+    ("title", "Fotos de Valladolid - Aldea Pucela", {}),
+    ("link", "https://fotos.aldeapucela.org/", {}),
+    ("description", "Fotos de Valladolid de la mayor comunidad vecinal online sobre Valladolid", {}),
+    ("copyright", "Las imágenes están bajo licencia CC BY-SA 4.0 - https://creativecommons.org/licenses/by-sa/4.0/", {}),
+    (
+        "creativeCommons:license",
+        "https://creativecommons.org/licenses/by-sa/4.0/",
+        {"xmlns:creativeCommons": "http://backend.userland.com/creativeCommonsRssModule"},
+    ),
+    ("language", "es", {}),
+    ("lastBuildDate", "Tue, 14 Jul 2026 10:00:00 +0200", {}),
+]
+
+
+def synthetic_items(count: int) -> list[dict[str, str]]:
+    items = []
+    for index in range(count):
+        photo_id = 100000 + index
+        items.append({
+            "title": f"Foto {index} de la Plaza Mayor #valladolid",
+            "link": f"https://fotos.aldeapucela.org/f/{photo_id}/",
+            "description": (
+                f'<img src="https://fotos.aldeapucela.org/files/{photo_id}.jpg" '
+                'style="max-width:600px;height:auto;"/>'
+                f"<p>Foto {index} de la Plaza Mayor #valladolid</p>"
+                f"<p>Autor/a: Autor {index % 50} - CC BY-SA 4.0</p>"
+            ),
+            "pubDate": "Tue, 14 Jul 2026 10:00:00 +0200",
+            "guid": f"https://fotos.aldeapucela.org/files/{photo_id}.jpg",
+        })
+    return items
+
+
+def minidom_feed(items: list[dict[str, str]]) -> str:
+    rss = ET.Element("rss", version="2.0")
+    channel = ET.SubElement(rss, "channel")
+    for tag, text, attributes in CHANNEL:
+        ET.SubElement(channel, tag, attributes).text = text
+    for item_data in items:
+        item = ET.SubElement(channel, "item")
+        for field, value in item_data.items():
+            ET.SubElement(item, field).text = value
+    return minidom.parseString(ET.tostring(rss)).toprettyxml(indent="  ")
+
+
+def streamed_feed(items: list[dict[str, str]]) -> str:
+    return "".join(rss_writer.encode(CHANNEL, items))
+
+
+def best_time(serialise, items: list[dict[str, str]], runs: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(runs):
+            serialise(items)
+        best = min(best, time.perf_counter() - start)
+    return best / runs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100, help="elementos del feed")
+    parser.add_argument("--runs", type=int, default=200, help="serializaciones por medición")
+    parser.add_argument("--repeat", type=int, default=3, help="repeticiones; se usa la mejor")
+    args = parser.parse_args()
+
+    items = synthetic_items(args.items)
+    if minidom_feed(items) != streamed_feed(items):
+        raise SystemExit("Las dos rutas no producen el mismo feed")
+
+    dom = best_time(minidom_feed, items, args.runs, args.repeat)
+    streamed = best_time(streamed_feed, items, args.runs, args.repeat)
+    print(f"Feed: {args.items} elementos, {len(streamed_feed(items).encode('utf-8')) / 1024:.1f} KiB")
+    print(f"ElementTree + minidom: {dom * 1e3:.3f} ms/feed")
+    print(f"rss_writer:            {streamed * 1e3:.3f} ms/feed")
+    print(f"Mejora: x{dom / streamed:.1f}")
+
+
+if __name__ == "__main__":
+    main()
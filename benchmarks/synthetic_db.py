@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Build a synthetic project tree with a realistic fotos.db and files/.
+
+The database uses the schema of ``fotos.db.sample`` and is filled with
+Spanish descriptions and hashtags, AI tag JSON, a share of inappropriate
+photos and Bluesky posts with cached interactions. Images are minimal JPEG
+headers with varied dimensions, enough for the page generators to read.
+The templates and ``scripts/`` are copied so every generator runs against
+the synthetic tree exactly as it would in production.
+
+    python3 benchmarks/synthetic_db.py /tmp/fotos-10k --photos 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import shutil
+import sqlite3
+import struct
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+TEMPLATE_FILES = ("index.html", "miradas/index.html", "data/editorial-collections.json")
+FIRST_PHOTO_ID = 100000
+FIRST_DATE = datetime(2019, 3, 1, 8, 0, 0)
+
+PLACES = [
+    "la Plaza Mayor", "el Campo Grande", "la ribera del Pisuerga", "la Catedral",
+    "San Pablo", "la Antigua", "el Museo de la Ciencia", "Las Moreras",
+    "la calle Santiago", "el barrio de La Rondilla", "Parquesol", "la Cúpula del Milenio",
+    "el Puente Colgante", "la Acera de Recoletos", "el mercado del Val", "Delicias",
+]
+MOMENTS = [
+    "al atardecer", "esta mañana", "después de la lluvia", "con niebla",
+    "en plena Semana Santa", "durante las fiestas", "de noche", "en otoño",
+]
+HASHTAGS = [
+    "#valladolid", "#pucela", "#plazamayor", "#pisuerga", "#campogrande", "#semanasanta",
+    "#atardecer", "#noche", "#río", "#arquitectura", "#murales", "#otoño", "#fuentes",
+    "#bicicleta", "#mercado", "#niebla", "#catedral", "#ñandú", "#patrimonio", "#calles",
+]
+AI_TAGS = [
+    "edificio", "cielo", "árbol", "río", "puente", "calle", "persona", "coche",
+    "iglesia", "torre", "nube", "farola", "noche", "atardecer", "mural", "grafiti",
+    "fuente", "agua", "parque", "flor", "banco", "bicicleta", "escultura", "plaza",
+    "mercado", "tienda", "ventana", "balcón", "escalera", "pájaro", "perro", "niebla",
+    "lluvia", "sombra", "reflejo", "luz", "ladrillo", "piedra", "cartel", "semáforo",
+]
+AUTHORS = [f"Vecina {number}" for number in range(1, 121)] + [f"Vecino {number}" for number in range(1, 121)]
+INAPPROPRIATE_SHARE = 0.02
+BLUESKY_SHARE = 0.4
+DESCRIPTION_SHARE = 0.85
+
+
+def jpeg_header(width: int, height: int) -> bytes:
+    """Smallest JPEG the metadata parser accepts: SOI, APP0, SOF0 and EOI."""
+    app0 = b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+    sof = b"\x08" + struct.pack(">HH", height, width) + b"\x03\x01\x22\x00\x02\x11\x01\x03\x11\x01"
+    return (
+        b"\xff\xd8"
+        + b"\xff\xe0" + struct.pack(">H", len(app0) + 2) + app0
+        + b"\xff\xc0" + struct.pack(">H", len(sof) + 2) + sof
+        + b"\xff\xd9"
+    )
+
+
+def description(generator: random.Random) -> str | None:
+    if generator.random() > DESCRIPTION_SHARE:
+        return None
+    tags = " ".join(generator.sample(HASHTAGS, generator.randint(1, 4)))
+    text = f"{generator.choice(PLACES).capitalize()} {generator.choice(MOMENTS)}. {tags}"
+    if generator.random() < 0.1:
+        text += " (https://bsky.app/profile/aldeapucela.org)"
+    return text
+
+
+def create_database(db_path: Path, photos: int, seed: int) -> None:
+    schema = sqlite3.connect(PROJECT_ROOT / "fotos.db.sample")
+    try:
+        statements = [
+            sql for (sql,) in schema.execute(
+                "SELECT sql FROM sqlite_master WHERE sql IS NOT NULL AND name != 'sqlite_sequence'"
+            )
+        ]
+    finally:
+        schema.close()
+
+    generator = random.Random(seed)
+    # Spread the photos over the years the archive really covers.
+    step = (datetime(2026, 9, 1) - FIRST_DATE) / max(photos, 1)
+    connection = sqlite3.connect(db_path)
+    try:
+        connection.executescript(";\n".join(statements) + ";")
+        with connection:
+            for index in range(photos):
+                photo_id = FIRST_PHOTO_ID + index
+                date = (FIRST_DATE + step * index + timedelta(seconds=generator.randint(0, 3599)))
+                connection.execute(
+                    "INSERT INTO imagenes (id, path, date, author, description) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        photo_id,
+                        f"{photo_id}.jpg",
+                        date.isoformat(timespec="milliseconds") + "+02:00",
+                        generator.choice(AUTHORS),
+                        description(generator),
+                    ),
+                )
+                appropriate = generator.random() >= INAPPROPRIATE_SHARE
+                connection.execute(
+                    """
+                    INSERT INTO image_analysis
+                        (image_id, description, tags, risk_assessment, flags, is_appropriate)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        photo_id,
+                        f"Vista de {generator.choice(PLACES)} {generator.choice(MOMENTS)}.",
+                        json.dumps(generator.sample(AI_TAGS, generator.randint(3, 8)), ensure_ascii=False),
+                        "bajo" if appropriate else "alto",
+                        "[]" if appropriate else '["contenido_sensible"]',
+                        int(appropriate),
+                    ),
+                )
+                if generator.random() < BLUESKY_SHARE:
+                    connection.execute(
+                        "INSERT INTO bluesky_posts (image_id, post_id) VALUES (?, ?)",
+                        (photo_id, f"3l{photo_id:x}synthetic"),
+                    )
+                    connection.execute(
+                        """
+                        INSERT INTO bluesky_interactions_cache
+                            (image_id, like_count, comment_count, repost_count)
+                        VALUES (?, ?, ?, ?)
+                        """,
+                        (
+                            photo_id,
+                            int(generator.paretovariate(1.5)) - 1,
+                            int(generator.paretovariate(2.5)) - 1,
+                            int(generator.paretovariate(2.5)) - 1,
+                        ),
+                    )
+    finally:
+        connection.close()
+
+
+def create_files(files_dir: Path, photos: int, seed: int) -> None:
+    generator = random.Random(seed)
+    files_dir.mkdir(parents=True, exist_ok=True)
+    for index in range(photos):
+        width, height = generator.choice([(1600, 1200), (1200, 1600), (2048, 1536), (1080, 1080)])
+        (files_dir / f"{FIRST_PHOTO_ID + index}.jpg").write_bytes(jpeg_header(width, height))
+
+
+def copy_project_files(destination: Path) -> None:
+    """Copy the templates and the generator scripts the benchmarks run."""
+    for name in TEMPLATE_FILES:
+        target = destination / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(PROJECT_ROOT / name, target)
+    shutil.copytree(
+        PROJECT_ROOT / "scripts",
+        destination / "scripts",
+        ignore=shutil.ignore_patterns("__pycache__"),
+        dirs_exist_ok=True,
+    )
+
+
+def build_synthetic_project(destination: Path, photos: int, seed: int = 1) -> Path:
+    destination = Path(destination)
+    if (destination / "fotos.db").exists():
+        raise RuntimeError(f"Ya existe una base de datos en {destination}")
+    destination.mkdir(parents=True, exist_ok=True)
+    copy_project_files(destination)
+    create_database(destination / "fotos.db", photos, seed)
+    create_files(destination / "files", photos, seed)
+    return destination
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("destination", type=Path, help="directorio del proyecto sintético")
+    parser.add_argument("--photos", type=int, default=10000, help="número de fotos")
+    parser.add_argument("--seed", type=int, default=1, help="semilla para obtener siempre los mismos datos")
+    args = parser.parse_args()
+    build_synthetic_project(args.destination, args.photos, args.seed)
+    print(f"Proyecto sintético con {args.photos} fotos en {args.destination}")
+
+
+if __name__ == "__main__":
+    main()
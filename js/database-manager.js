@@ -1,6 +1,6 @@
 /**
  * DatabaseManager - Singleton para manejar la base de datos SQLite
- * Garantiza que fotos.db se descargue una sola vez por sesión
+ * Garantiza que la base de datos se descargue una sola vez por sesión
  */
 class DatabaseManager {
   constructor() {
@@ -55,9 +55,13 @@ class DatabaseManager {
         });
       }
 
-      // Descargar la base de datos
-      console.log('Descargando fotos.db...');
-      const response = await fetch('/fotos.db');
+      // Descargar la copia pública; fotos.db solo si aún no se ha generado
+      console.log('Descargando fotos-public.db...');
+      let response = await fetch('/fotos-public.db');
+      if (response.status === 404) {
+        console.log('Descargando fotos.db...');
+        response = await fetch('/fotos.db');
+      }
       
       if (!response.ok) {
         throw new Error(`Error descargando BD: ${response.status}`);
@@ -0,0 +1,147 @@
+"""AI tags of the analysed photos, normalised into fotos.db.
+
+``image_ai_tags`` holds one row per element of ``image_analysis.tags``, in
+array order, with the photo's date and moderation status copied next to it.
+Triggers on ``image_analysis`` and ``imagenes`` expand the JSON with
+``json_each``, so the table stays in step with every program that writes to
+fotos.db, not only with these scripts. A row exists while both the photo
+and its analysis do; tags that are not a valid JSON array are ignored.
+
+``tag_counts()`` turns the table into the ``ai-tags-cache.json`` entries with
+a ``GROUP BY`` for the counts and a window function that ranks the newest
+approved photos of each tag.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+from typing import Iterable
+
+import schema
+
+
+LATEST_PHOTOS = 4
+
+# Rows of the photos selected by {where}, from their current analysis.
+EXPAND = """
+    INSERT INTO image_ai_tags (image_id, position, tag, date, is_appropriate)
+    SELECT ia.image_id, tag.key, tag.value, COALESCE(i.date, ''), ia.is_appropriate
+    FROM image_analysis ia
+    JOIN imagenes i ON i.id = ia.image_id,
+        json_each(CASE WHEN json_valid(ia.tags) AND json_type(ia.tags) = 'array'
+                  THEN ia.tags ELSE '[]' END) AS tag
+    WHERE {where}
+"""
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS image_ai_tags (
+    image_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    tag NOT NULL,
+    date TEXT NOT NULL,
+    is_appropriate INTEGER
+);
+-- Not UNIQUE: a trigger must never make the writer's statement fail.
+CREATE INDEX IF NOT EXISTS image_ai_tags_image ON image_ai_tags (image_id);
+CREATE INDEX IF NOT EXISTS image_ai_tags_approved
+    ON image_ai_tags (tag, date DESC, image_id, position) WHERE is_appropriate = 1;
+
+CREATE TRIGGER IF NOT EXISTS image_ai_tags_analysis_insert
+AFTER INSERT ON image_analysis BEGIN
+    {EXPAND.format(where="ia.rowid = NEW.rowid")};
+END;
+CREATE TRIGGER IF NOT EXISTS image_ai_tags_analysis_update
+AFTER UPDATE OF image_id, tags, is_appropriate ON image_analysis BEGIN
+    DELETE FROM image_ai_tags WHERE image_id IN (OLD.image_id, NEW.image_id);
+    {EXPAND.format(where="ia.image_id IN (OLD.image_id, NEW.image_id)")};
+END;
+CREATE TRIGGER IF NOT EXISTS image_ai_tags_analysis_delete
+AFTER DELETE ON image_analysis BEGIN
+    DELETE FROM image_ai_tags WHERE image_id = OLD.image_id;
+END;
+CREATE TRIGGER IF NOT EXISTS image_ai_tags_imagenes_insert
+AFTER INSERT ON imagenes BEGIN
+    DELETE FROM image_ai_tags WHERE image_id = NEW.id;
+    {EXPAND.format(where="ia.image_id = NEW.id")};
+END;
+CREATE TRIGGER IF NOT EXISTS image_ai_tags_imagenes_update
+AFTER UPDATE OF id, path, date, author ON imagenes BEGIN
+    DELETE FROM image_ai_tags WHERE image_id IN (OLD.id, NEW.id);
+    {EXPAND.format(where="ia.image_id = NEW.id")};
+END;
+CREATE TRIGGER IF NOT EXISTS image_ai_tags_imagenes_delete
+AFTER DELETE ON imagenes BEGIN
+    DELETE FROM image_ai_tags WHERE image_id = OLD.id;
+END;
+"""
+
+# Recreated when their stored text differs, so a new definition replaces the old one.
+DROP_TRIGGERS = "".join(
+    f"DROP TRIGGER IF EXISTS {name};"
+    for name in re.findall(r"CREATE TRIGGER IF NOT EXISTS (\w+)", SCHEMA)
+)
+
+# Fills a new (or emptied) table from the existing analyses.
+BACKFILL = EXPAND.format(where="NOT EXISTS (SELECT 1 FROM image_ai_tags)")
+
+# The newest rows are picked by rowid through the partial index, so only a
+# few rows per tag are ranked.
+TAG_COUNTS = """
+    WITH counts AS (
+        SELECT tag, COUNT(*) AS count
+        FROM image_ai_tags
+        WHERE is_appropriate = 1 {tags}
+        GROUP BY tag
+    )
+    SELECT counts.tag, counts.count, i.path,
+        ROW_NUMBER() OVER (
+            PARTITION BY counts.tag
+            ORDER BY t.date DESC, t.image_id, t.position
+        ) AS rank
+    FROM counts
+    JOIN image_ai_tags t ON t.rowid IN (
+        SELECT p.rowid
+        FROM image_ai_tags p
+        WHERE p.tag = counts.tag AND p.is_appropriate = 1
+        ORDER BY p.date DESC, p.image_id, p.position
+        LIMIT ?
+    )
+    JOIN imagenes i ON i.id = t.image_id
+    ORDER BY counts.tag, rank
+"""
+
+
+def install(connection: sqlite3.Connection) -> bool:
+    """Create the table and its triggers; False if fotos.db has no AI tags."""
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(image_analysis)")}
+    has_images = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'imagenes'"
+    ).fetchone()
+    if "tags" not in columns or not has_images:
+        return False
+    if schema.installed(connection, SCHEMA):
+        return True
+    try:
+        connection.executescript(f"BEGIN IMMEDIATE; {DROP_TRIGGERS} {SCHEMA} {BACKFILL}; COMMIT;")
+    except sqlite3.Error:
+        connection.rollback()
+        raise
+    return True
+
+
+def tag_counts(connection: sqlite3.Connection, tags: Iterable | None = None) -> list[dict]:
+    """Return the cache entries of the approved photos, for every tag or only ``tags``."""
+    parameters: tuple = ()
+    where = ""
+    if tags is not None:
+        where = "AND tag IN (SELECT value FROM json_each(?))"
+        parameters = (json.dumps(list(tags)),)
+    entries: dict = {}
+    for tag, count, path, _ in connection.execute(
+        TAG_COUNTS.format(tags=where), parameters + (LATEST_PHOTOS,)
+    ):
+        entry = entries.setdefault(tag, {"tag": tag, "count": count, "latest_photos": []})
+        entry["latest_photos"].append(path)
+    return list(entries.values())
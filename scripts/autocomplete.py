@@ -0,0 +1,83 @@
+"""Prefix index of the hashtags and AI tags, for tag autocompletion.
+
+Both vocabularies are read from ``tags-cache.json`` and
+``ai-tags-cache.json`` and keyed by their accent-insensitive, lower-case
+form: ``normalize_tag`` without the ``#``, which some AI tags also start
+with. Entries are grouped by the first ``PREFIX_LENGTH`` characters of the
+key in ``autocomplete/{prefix}.json``, sorted by key, so a client fetches
+the bucket of the first two letters typed and finds the rest of the prefix
+by binary search. ``autocomplete/index.json`` lists the buckets with their
+sizes. Bucket names are escaped like the shards in ``tag_shards``.
+
+Each entry is ``[key, tag, kind, count]``: ``kind`` is ``"tags"`` or
+``"ai-tags"``, the directory that holds the tag's photo list.
+"""
+
+from __future__ import annotations
+
+import json
+from itertools import groupby
+from pathlib import Path
+
+import precompress
+from generate_photo_pages import write_text_if_changed
+from hashtag_index import normalize_tag
+from tag_shards import shard_name
+
+
+DIRECTORY = "autocomplete"
+INDEX_NAME = "index.json"
+PREFIX_LENGTH = 2
+FIELDS = ["key", "tag", "kind", "count"]
+VERSION = 1
+CACHES = (("tags", "tags-cache.json"), ("ai-tags", "ai-tags-cache.json"))
+
+
+def tag_key(tag) -> str:
+    """Accent-insensitive, lower-case form of a tag, without leading ``#``."""
+    return normalize_tag("#" + str(tag).lower().lstrip("#"))[1:]
+
+
+def load_entries(project_root: Path) -> list[list]:
+    """Return the entries of both tag caches, sorted by key."""
+    entries = []
+    for kind, name in CACHES:
+        try:
+            cache = json.loads((project_root / name).read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            continue
+        for entry in cache.get("tags", []):
+            entries.append([tag_key(entry["tag"]), entry["tag"], kind, entry["count"]])
+    entries.sort(key=lambda entry: (entry[0], entry[2], -entry[3], str(entry[1])))
+    return entries
+
+
+def write_index(project_root: Path) -> tuple[int, int]:
+    """Write the buckets that changed and the index.
+
+    Returns the number of buckets and how many of them were written.
+    """
+    project_root = Path(project_root)
+    directory = project_root / DIRECTORY
+    buckets = {}
+    written = 0
+    for prefix, group in groupby(load_entries(project_root), key=lambda entry: entry[0][:PREFIX_LENGTH]):
+        name = shard_name(prefix)
+        if name is None:
+            continue
+        group = list(group)
+        document = {"version": VERSION, "prefix": prefix, "fields": FIELDS, "entries": group}
+        written += write_text_if_changed(
+            directory / f"{name}.json", json.dumps(document, ensure_ascii=False, separators=(",", ":")) + "\n"
+        )
+        buckets[prefix] = {"file": f"{name}.json", "count": len(group)}
+
+    current = {bucket["file"] for bucket in buckets.values()} | {INDEX_NAME}
+    for path in directory.glob("*.json"):
+        if path.name not in current:
+            path.unlink()
+            precompress.remove_siblings(path)
+
+    index = {"version": VERSION, "prefix_length": PREFIX_LENGTH, "fields": FIELDS, "buckets": buckets}
+    write_text_if_changed(directory / INDEX_NAME, json.dumps(index, ensure_ascii=False, indent=2) + "\n")
+    return len(buckets), written
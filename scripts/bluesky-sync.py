@@ -8,6 +8,9 @@ import sys
 from datetime import datetime, timedelta
 import json
 
+import metrics
+import profiling
+
 # Configuración
 BLUESKY_THREAD_HANDLE = 'fotos.aldeapucela.org'
 API_BASE_URL = 'https://public.api.bsky.app/xrpc/app.bsky.feed.getPostThread'
@@ -37,7 +40,8 @@ def get_bluesky_stats(post_id):
             'User-Agent': 'AldeaPucela-Photos-Bot/1.0'
         }
         
-        response = requests.get(url, headers=headers, timeout=10)
+        with metrics.stage('bluesky_api'):
+            response = requests.get(url, headers=headers, timeout=10)
         response.raise_for_status()
         
         data = response.json()
@@ -54,6 +58,8 @@ def get_bluesky_stats(post_id):
             return None
             
     except requests.exceptions.RequestException as e:
+        status = e.response.status_code if e.response is not None else type(e).__name__
+        metrics.increment('http_errors', status=status)
         print(f"❌ Error API para post {post_id}: {e}")
         return None
     except (KeyError, ValueError, TypeError) as e:
@@ -155,11 +161,16 @@ def update_bluesky_cache(force=False, photo=None, test_mode=False):
             # Rate limiting - pausa entre requests
             if i < total_posts:  # No pausar en el último
                 time.sleep(RATE_LIMIT_DELAY)
+                metrics.add_time('rate_limit', RATE_LIMIT_DELAY)
         
         # Confirmar cambios
         conn.commit()
         conn.close()
         
+        metrics.increment('posts', updated_count, result='updated')
+        metrics.increment('posts', skipped_count, result='skipped')
+        metrics.increment('posts', error_count, result='error')
+
         # Resumen final
         print(f"\n🎉 Actualización completada:")
         print(f"   ✅ Actualizados: {updated_count}")
@@ -227,6 +238,7 @@ if __name__ == "__main__":
     parser.add_argument("--test", action="store_true", help="procesa como máximo tres posts")
     parser.add_argument("--force", action="store_true", help="ignora la caché de 12 horas y vuelve a consultar BlueSky")
     parser.add_argument("--photo", metavar="ID_O_ARCHIVO", help="sincroniza sólo una foto, por ejemplo 186917 o 186917.jpg")
+    profiling.add_arguments(parser)
     args = parser.parse_args()
 
     if args.stats:
@@ -240,11 +252,12 @@ if __name__ == "__main__":
     if args.photo:
         print(f"🎯 Limitando sincronización a la foto: {args.photo}")
 
-    # Ejecutar actualización
-    success = update_bluesky_cache(force=args.force, photo=args.photo, test_mode=args.test)
-    
-    # Mostrar estadísticas finales
-    show_cache_stats()
-    
-    # Exit code para cron
-    sys.exit(0 if success else 1)
+    with metrics.run('bluesky_sync'), profiling.session('bluesky_sync', args):
+        # Ejecutar actualización
+        success = update_bluesky_cache(force=args.force, photo=args.photo, test_mode=args.test)
+
+        # Mostrar estadísticas finales
+        show_cache_stats()
+
+        # Exit code para cron
+        sys.exit(0 if success else 1)
@@ -3,82 +3,142 @@ import sqlite3
 import os
 import sys
 import argparse
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
-def delete_photo(photo_id):
-    try:
-        # Get the project root directory (parent of scripts directory)
-        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        db_path = os.path.join(project_root, 'fotos.db')
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        # 1. Buscar la ruta del archivo en la base de datos usando el ID
-        cursor.execute("SELECT path FROM imagenes WHERE id = ?", (photo_id,))
-        result = cursor.fetchone()
-
-        if result is None:
-            print(f"No se encontró ninguna foto con ID {photo_id} en la base de datos.")
-            return False
+import metrics
+import profiling
+import publish
 
-        file_name = result[0]
-        file_path = os.path.join(project_root, 'files', file_name)
+# Hilos para borrar los archivos físicos; el borrado espera sobre todo al disco.
+UNLINK_WORKERS = 4
 
-        # 2. Borrar el archivo físico si existe
-        file_deleted = False
-        if os.path.exists(file_path):
+def read_ids(path):
+    """Lee los IDs de un archivo, uno por línea; '-' es la entrada estándar."""
+    lines = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        ids = []
+        for number, line in enumerate(lines, 1):
+            value = line.split('#', 1)[0].strip()
+            if not value:
+                continue
             try:
-                os.remove(file_path)
-                print(f"Archivo borrado: {file_path}")
-                file_deleted = True
-            except OSError as e:
-                print(f"Error al borrar el archivo físico {file_path}: {e}")
-                # Decidir si continuar o no. Por ahora, continuaremos para borrar la entrada de la BD.
-        else:
-            print(f"Advertencia: El archivo físico no existe en la ruta esperada: {file_path}")
-            # Considerar esto como éxito parcial si la entrada de la BD se borra
-
-        # 3. Borrar el registro de la base de datos usando el ID
-        cursor.execute("DELETE FROM imagenes WHERE id = ?", (photo_id,))
-        rows_affected = cursor.rowcount
-        conn.commit()
-
-        if rows_affected > 0:
-            print(f"Registro de la foto con ID {photo_id} (archivo: {file_name}) eliminado de la base de datos.")
-            # El éxito general depende de si se encontró en la BD y se pudo borrar el registro.
-            # El borrado del archivo es secundario pero se informa.
-            return True
-        else:
-            # Esto no debería ocurrir si fetchone() devolvió algo, pero por si acaso.
-            print(f"Error inesperado: No se pudo borrar el registro con ID {photo_id} de la base de datos.")
-            return False
+                ids.append(int(value))
+            except ValueError:
+                raise ValueError(f"{path}:{number}: '{value}' no es un ID válido") from None
+        return ids
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
 
-    except sqlite3.Error as e:
-        print(f"Error en la base de datos: {e}")
-        return False
+def remove_file(file_path):
+    """Borra un archivo físico y devuelve el resultado para el informe."""
+    try:
+        os.remove(file_path)
+        return 'borrada'
+    except FileNotFoundError:
+        return 'borrada (el archivo físico no existía)'
     except OSError as e:
-        print(f"Error al borrar el archivo: {e}")
-        return False
-    finally:
-        if conn:
+        return f'borrada de la base de datos, pero no se pudo borrar el archivo: {e}'
+
+def delete_photos(photo_ids, project_root=None):
+    """Borra varias fotos en una sola transacción y devuelve el resultado de cada ID.
+
+    Los registros se borran primero; los archivos, solo si la transacción se
+    confirma, en un pequeño grupo de hilos.
+    """
+    project_root = Path(project_root) if project_root else Path(__file__).resolve().parent.parent
+    photo_ids = list(dict.fromkeys(photo_ids))
+    outcomes = {photo_id: 'no se encontró en la base de datos' for photo_id in photo_ids}
+
+    with metrics.stage('db'):
+        conn = sqlite3.connect(project_root / 'fotos.db')
+        try:
+            with conn:
+                ids_json = json.dumps(photo_ids)
+                found = conn.execute(
+                    "SELECT id, path FROM imagenes WHERE id IN (SELECT value FROM json_each(?))",
+                    (ids_json,),
+                ).fetchall()
+                conn.execute("DELETE FROM imagenes WHERE id IN (SELECT value FROM json_each(?))", (ids_json,))
+        finally:
             conn.close()
 
+    with metrics.stage('unlink'), ThreadPoolExecutor(max_workers=UNLINK_WORKERS) as executor:
+        results = executor.map(
+            remove_file, [project_root / 'files' / path for _, path in found]
+        )
+        for (photo_id, path), outcome in zip(found, results):
+            outcomes[photo_id] = f'{outcome} ({path})'
+    metrics.increment('photos_deleted', len(found))
+    return outcomes
+
+def delete_photo(photo_id):
+    """Borra una foto; se mantiene para quien llame con un solo ID."""
+    outcome = delete_photos([photo_id])[photo_id]
+    print(f"{photo_id}: {outcome}")
+    return outcome.startswith('borrada')
+
+def republish(project_root):
+    """Publica una sola vez todos los borrados.
+
+    Devuelve False si otra generación está en curso; se le pide entonces una
+    publicación completa al terminar, o la hará la siguiente ejecución.
+    """
+    with publish.generation_lock(project_root) as acquired:
+        if not acquired:
+            publish.request_publish(project_root)
+            return False
+        with metrics.stage('publish'):
+            # Keep the format the site already publishes.
+            publish.publish(project_root, legacy_json=(project_root / 'data.json').is_file())
+    return True
+
 def main():
-    parser = argparse.ArgumentParser(description='Borrar foto de la galería y base de datos')
-    parser.add_argument('photo_id', type=int, help='ID de la foto a borrar')
+    parser = argparse.ArgumentParser(description='Borrar fotos de la galería y base de datos')
+    parser.add_argument('photo_ids', type=int, nargs='*', metavar='ID', help='IDs de las fotos a borrar')
+    parser.add_argument('--file', '-i', metavar='ARCHIVO',
+                        help="archivo con un ID por línea ('-' para la entrada estándar)")
     parser.add_argument('--force', '-f', action='store_true', help='Borrar sin confirmación')
-    
+    profiling.add_arguments(parser)
+
     args = parser.parse_args()
-    
+    photo_ids = list(args.photo_ids)
+    if args.file:
+        try:
+            photo_ids += read_ids(args.file)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    photo_ids = list(dict.fromkeys(photo_ids))
+    if not photo_ids:
+        parser.error('indica al menos un ID o un archivo con --file')
+
     if not args.force:
-        confirm = input(f"¿Está seguro de que desea borrar la foto con ID {args.photo_id}? (s/N): ")
+        if len(photo_ids) == 1:
+            question = f"¿Está seguro de que desea borrar la foto con ID {photo_ids[0]}? (s/N): "
+        else:
+            question = f"¿Está seguro de que desea borrar {len(photo_ids)} fotos? (s/N): "
+        confirm = input(question)
         if confirm.lower() != 's':
             print("Operación cancelada")
             return
-    
-    if delete_photo(args.photo_id):
-        sys.exit(0)
-    else:
-        sys.exit(1)
+
+    project_root = Path(__file__).resolve().parent.parent
+    with profiling.session('borrar_foto', args):
+        try:
+            outcomes = delete_photos(photo_ids, project_root)
+        except sqlite3.Error as e:
+            print(f"Error en la base de datos; no se ha borrado ninguna foto: {e}")
+            sys.exit(1)
+        for photo_id, outcome in outcomes.items():
+            print(f"{photo_id}: {outcome}")
+        deleted = sum(outcome.startswith('borrada') for outcome in outcomes.values())
+        print(f"{deleted} de {len(outcomes)} fotos borradas")
+        if deleted and not republish(project_root):
+            print("Otra generación sigue activa; publicará los borrados al terminar.")
+    sys.exit(0 if deleted == len(outcomes) else 1)
 
 if __name__ == "__main__":
-    main()
+    with metrics.run('borrar_foto'):
+        main()
@@ -0,0 +1,267 @@
+"""Append-only change feed for clients that mirror the gallery.
+
+Every run of ``feed-rss.py`` that changes the public photos appends one
+segment, ``changes/{cursor}.json``, with the ``added``, ``updated`` and
+``removed`` events that follow ``cursor``. Every event carries its own
+cursor, one more than the previous event. ``changes/latest.json`` holds the
+newest cursor and lists the segments still available, so a client at
+cursor ``C`` fetches ``changes/C.json`` and only reads the list when that
+file does not exist.
+
+Old segments are compacted. Beyond ``MAX_SEGMENTS`` the oldest ones are
+merged into one that keeps only the last event of each photo, and segments
+older than ``RETENTION_DAYS`` are dropped. ``added`` and ``updated`` carry
+the whole item, so clients apply both as an upsert. A client whose cursor is
+older than ``oldest`` resynchronises from the paginated API in ``data/``.
+
+The photos already published and the segments are tracked in the
+``.feed-state.sqlite`` sidecar in the project root.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import json_stream
+import precompress
+from generate_photo_pages import write_text_if_changed
+
+
+CHANGES_DIR = "changes"
+LATEST_NAME = "latest.json"
+STATE_NAME = ".feed-state.sqlite"
+MAX_SEGMENTS = 64
+RETENTION_DAYS = 30
+VERSION = 1
+
+
+def item_digest(item: dict) -> str:
+    return hashlib.sha256(
+        json.dumps(item, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def segment_name(cursor: int) -> str:
+    return f"{cursor}.json"
+
+
+class ChangeFeed:
+    """Published state of the feed and the segments written from it."""
+
+    def __init__(self, path: Path, directory: Path):
+        self.path = Path(path)
+        self.directory = Path(directory)
+        self.created = not self.path.exists()
+        self.connection = sqlite3.connect(self.path)
+        if self.created:
+            self.path.chmod(0o600)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS published (
+                image_id INTEGER PRIMARY KEY,
+                photo_id TEXT NOT NULL,
+                digest TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS segments (
+                start INTEGER PRIMARY KEY,
+                end INTEGER NOT NULL,
+                created TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS settings (
+                name TEXT PRIMARY KEY,
+                value
+            ) WITHOUT ROWID;
+            CREATE TEMP TABLE IF NOT EXISTS seen (image_id INTEGER PRIMARY KEY);
+            CREATE TEMP TABLE IF NOT EXISTS events (
+                cursor INTEGER PRIMARY KEY,
+                photo_id TEXT NOT NULL UNIQUE,
+                type TEXT NOT NULL,
+                item TEXT
+            );
+            """
+        )
+        if self.created:
+            self.restart()
+
+    def restart(self) -> None:
+        """Start from an empty state without ever moving the cursor back.
+
+        Segments written by a lost state cannot be described any more, so
+        they are removed and clients resynchronise from the JSON pages.
+        """
+        head = 0
+        try:
+            latest = json.loads((self.directory / LATEST_NAME).read_text(encoding="utf-8"))
+            head = int(latest.get("cursor", 0))
+        except (FileNotFoundError, ValueError, TypeError, AttributeError):
+            pass
+        if self.directory.is_dir():
+            for path in self.directory.glob("*.json"):
+                if path.name != LATEST_NAME:
+                    path.unlink()
+                    precompress.remove_siblings(path)
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO settings (name, value) VALUES ('head', ?)", (head,)
+            )
+
+    @property
+    def head(self) -> int:
+        return self.connection.execute("SELECT value FROM settings WHERE name = 'head'").fetchone()[0]
+
+    def record(
+        self,
+        photos: Iterable[tuple[int, str, dict]],
+        changed: list[int] | None,
+        now: datetime | None = None,
+    ) -> int:
+        """Append the events that turn the published state into ``photos``.
+
+        ``photos`` are ``(image_id, public id, item)`` of the public photos
+        among ``changed``, or of every public photo when ``changed`` is
+        ``None``. A new state only records the photos, without events.
+        Returns the number of events written.
+        """
+        now = now or datetime.now(timezone.utc)
+        start = self.head
+        cursor = start
+        with self.connection:
+            self.connection.execute("DELETE FROM seen")
+            self.connection.execute("DELETE FROM events")
+            for image_id, photo_id, item in photos:
+                digest = item_digest(item)
+                self.connection.execute("INSERT INTO seen (image_id) VALUES (?)", (image_id,))
+                previous = self.connection.execute(
+                    "SELECT digest FROM published WHERE image_id = ?", (image_id,)
+                ).fetchone()
+                if previous is not None and previous[0] == digest:
+                    continue
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO published (image_id, photo_id, digest) VALUES (?, ?, ?)",
+                    (image_id, photo_id, digest),
+                )
+                if not self.created:
+                    cursor += 1
+                    self.add_event(cursor, photo_id, "added" if previous is None else "updated", item)
+
+            if changed is None:
+                removed = self.connection.execute(
+                    """
+                    SELECT image_id, photo_id FROM published
+                    WHERE image_id NOT IN (SELECT image_id FROM seen)
+                    ORDER BY image_id
+                    """
+                ).fetchall()
+            else:
+                removed = self.connection.execute(
+                    """
+                    SELECT image_id, photo_id FROM published
+                    WHERE image_id IN (SELECT value FROM json_each(?))
+                    AND image_id NOT IN (SELECT image_id FROM seen)
+                    ORDER BY image_id
+                    """,
+                    (json.dumps(changed),),
+                ).fetchall()
+            for image_id, photo_id in removed:
+                self.connection.execute("DELETE FROM published WHERE image_id = ?", (image_id,))
+                cursor += 1
+                self.add_event(cursor, photo_id, "removed", None)
+
+            if cursor > start:
+                self.write_segment(start, self.pending_events())
+                self.connection.execute(
+                    "INSERT INTO segments (start, end, created) VALUES (?, ?, ?)",
+                    (start, cursor, now.isoformat(timespec="seconds")),
+                )
+                self.connection.execute("UPDATE settings SET value = ? WHERE name = 'head'", (cursor,))
+            self.compact(now)
+        self.created = False
+        self.write_latest()
+        return cursor - start
+
+    def add_event(self, cursor: int, photo_id: str, event_type: str, item: dict | None) -> None:
+        # A photo appears once per segment: its newest event replaces older ones.
+        self.connection.execute(
+            "INSERT OR REPLACE INTO events (cursor, photo_id, type, item) VALUES (?, ?, ?, ?)",
+            (cursor, photo_id, event_type, None if item is None else json.dumps(item, ensure_ascii=False)),
+        )
+
+    def pending_events(self) -> Iterator[dict]:
+        for cursor, photo_id, event_type, item in self.connection.execute(
+            "SELECT cursor, photo_id, type, item FROM events ORDER BY cursor"
+        ):
+            event = {"cursor": cursor, "type": event_type, "id": photo_id}
+            if item is not None:
+                event["item"] = json.loads(item)
+            yield event
+
+    def write_segment(self, start: int, events: Iterable[dict]) -> None:
+        json_stream.write_if_changed(
+            self.directory / segment_name(start),
+            json_stream.encode({"cursor": start, "events": json_stream.ITEMS}, events),
+        )
+
+    def remove_segment(self, start: int) -> None:
+        path = self.directory / segment_name(start)
+        path.unlink(missing_ok=True)
+        precompress.remove_siblings(path)
+        self.connection.execute("DELETE FROM segments WHERE start = ?", (start,))
+
+    def compact(self, now: datetime) -> None:
+        """Drop expired segments and merge the oldest ones beyond the limit."""
+        cutoff = (now - timedelta(days=RETENTION_DAYS)).isoformat(timespec="seconds")
+        for (start,) in self.connection.execute(
+            "SELECT start FROM segments WHERE created < ?", (cutoff,)
+        ).fetchall():
+            self.remove_segment(start)
+
+        segments = self.connection.execute(
+            "SELECT start, end, created FROM segments ORDER BY start"
+        ).fetchall()
+        if len(segments) <= MAX_SEGMENTS:
+            return
+        merged = segments[:len(segments) - MAX_SEGMENTS // 2 + 1]
+        self.connection.execute("DELETE FROM events")
+        for start, _, _ in merged:
+            path = self.directory / segment_name(start)
+            for event in json.loads(path.read_text(encoding="utf-8"))["events"]:
+                self.add_event(event["cursor"], event["id"], event["type"], event.get("item"))
+        first = merged[0][0]
+        for start, _, _ in merged[1:]:
+            self.remove_segment(start)
+        self.write_segment(first, self.pending_events())
+        self.connection.execute(
+            "UPDATE segments SET end = ?, created = ? WHERE start = ?",
+            (merged[-1][1], merged[-1][2], first),
+        )
+
+    def write_latest(self) -> None:
+        head = self.head
+        segments = [
+            {"file": segment_name(start), "cursor": start, "next": end}
+            for start, end in self.connection.execute("SELECT start, end FROM segments ORDER BY start")
+        ]
+        latest = {
+            "version": VERSION,
+            "cursor": head,
+            "oldest": segments[0]["cursor"] if segments else head,
+            "segments": segments,
+        }
+        write_text_if_changed(
+            self.directory / LATEST_NAME,
+            json.dumps(latest, ensure_ascii=False, indent=2) + "\n",
+        )
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "ChangeFeed":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
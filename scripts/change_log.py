@@ -0,0 +1,171 @@
+"""Row-level change log kept in fotos.db by triggers.
+
+Every insert, update or delete on ``imagenes``, ``image_analysis`` and
+``bluesky_posts`` appends the affected photo to ``photo_changes``. Each
+generator stores the last sequence number it processed in
+``generator_state``, so an idle run costs a single indexed query and a run
+with changes only looks at the photos that actually changed.
+
+A generator that leaves a change unprocessed for ``STALE_AFTER`` loses its
+state, so that a script that stopped running does not keep the log from
+being compacted; if it runs again, it finds no state and rebuilds
+everything.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS photo_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    image_id INTEGER NOT NULL,
+    path TEXT,
+    changed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS generator_state (
+    name TEXT PRIMARY KEY,
+    last_seq INTEGER NOT NULL,
+    signature TEXT
+);
+"""
+
+# The path is recorded too, because generated files are named after it and
+# it is no longer available once the photo has been deleted.
+IMAGE_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS photo_changes_imagenes_insert
+AFTER INSERT ON imagenes BEGIN
+    INSERT INTO photo_changes (image_id, path) VALUES (NEW.id, NEW.path);
+END;
+CREATE TRIGGER IF NOT EXISTS photo_changes_imagenes_update
+AFTER UPDATE ON imagenes BEGIN
+    INSERT INTO photo_changes (image_id, path)
+    SELECT OLD.id, OLD.path WHERE OLD.id IS NOT NEW.id OR OLD.path IS NOT NEW.path;
+    INSERT INTO photo_changes (image_id, path) VALUES (NEW.id, NEW.path);
+END;
+CREATE TRIGGER IF NOT EXISTS photo_changes_imagenes_delete
+AFTER DELETE ON imagenes BEGIN
+    INSERT INTO photo_changes (image_id, path) VALUES (OLD.id, OLD.path);
+END;
+"""
+
+RELATED_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS photo_changes_{table}_insert
+AFTER INSERT ON {table} BEGIN
+    INSERT INTO photo_changes (image_id, path)
+    VALUES (NEW.image_id, (SELECT path FROM imagenes WHERE id = NEW.image_id));
+END;
+CREATE TRIGGER IF NOT EXISTS photo_changes_{table}_update
+AFTER UPDATE ON {table} BEGIN
+    INSERT INTO photo_changes (image_id, path)
+    SELECT OLD.image_id, (SELECT path FROM imagenes WHERE id = OLD.image_id)
+    WHERE OLD.image_id IS NOT NEW.image_id;
+    INSERT INTO photo_changes (image_id, path)
+    VALUES (NEW.image_id, (SELECT path FROM imagenes WHERE id = NEW.image_id));
+END;
+CREATE TRIGGER IF NOT EXISTS photo_changes_{table}_delete
+AFTER DELETE ON {table} BEGIN
+    INSERT INTO photo_changes (image_id, path)
+    VALUES (OLD.image_id, (SELECT path FROM imagenes WHERE id = OLD.image_id));
+END;
+"""
+RELATED_TABLES = ("image_analysis", "bluesky_posts")
+# SQLite date modifier: how long a change may wait for a generator.
+STALE_AFTER = "-30 days"
+
+
+def install(connection: sqlite3.Connection) -> None:
+    """Create the change log and its triggers on the tables that exist."""
+    tables = {
+        name for (name,) in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )
+    }
+    script = SCHEMA
+    if "imagenes" in tables:
+        script += IMAGE_TRIGGERS
+    for table in RELATED_TABLES:
+        if table in tables:
+            script += RELATED_TRIGGERS.format(table=table)
+    connection.executescript(script)
+
+
+def head(connection: sqlite3.Connection) -> int:
+    """Return the newest sequence number, or 0 before ``install()``."""
+    try:
+        return connection.execute(
+            "SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'photo_changes'), 0)"
+        ).fetchone()[0]
+    except sqlite3.OperationalError:
+        # sqlite_sequence only exists once a table uses AUTOINCREMENT.
+        return 0
+
+
+def pending(connection: sqlite3.Connection, generator: str) -> tuple[int, int | None, str | None]:
+    """Return the newest sequence number and the generator's stored state.
+
+    The newest number comes from ``sqlite_sequence`` because AUTOINCREMENT keeps
+    it there even after compaction has emptied the log.
+    """
+    return connection.execute(
+        """
+        SELECT
+            COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'photo_changes'), 0),
+            (SELECT last_seq FROM generator_state WHERE name = ?),
+            (SELECT signature FROM generator_state WHERE name = ?)
+        """,
+        (generator, generator),
+    ).fetchone()
+
+
+def changes_since(
+    connection: sqlite3.Connection,
+    since: int,
+    until: int,
+) -> list[tuple[int, str | None]]:
+    """Return the distinct ``(image_id, path)`` pairs changed in ``(since, until]``."""
+    return connection.execute(
+        """
+        SELECT DISTINCT image_id, path
+        FROM photo_changes
+        WHERE seq > ? AND seq <= ?
+        """,
+        (since, until),
+    ).fetchall()
+
+
+def mark(connection: sqlite3.Connection, generator: str, sequence: int, signature: str | None) -> None:
+    """Store the generator's high-water mark and drop entries every generator has seen.
+
+    States whose oldest pending change is older than ``STALE_AFTER`` are
+    dropped first.
+    """
+    with connection:
+        connection.execute(
+            """
+            INSERT INTO generator_state (name, last_seq, signature) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                last_seq = excluded.last_seq,
+                signature = excluded.signature
+            """,
+            (generator, sequence, signature),
+        )
+        connection.execute(
+            """
+            DELETE FROM generator_state
+            WHERE (
+                SELECT changed_at FROM photo_changes
+                WHERE seq > generator_state.last_seq
+                ORDER BY seq
+                LIMIT 1
+            ) < datetime('now', ?)
+            """,
+            (STALE_AFTER,),
+        )
+        connection.execute(
+            """
+            DELETE FROM photo_changes
+            WHERE seq <= (SELECT MIN(last_seq) FROM generator_state)
+            """
+        )
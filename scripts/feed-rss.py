@@ -1,14 +1,38 @@
 #!/usr/bin/env python3
-import fcntl
+import argparse
 import hashlib
+import itertools
+import json
 import sqlite3
 import os
-import json
+import time
 from datetime import datetime
 from pathlib import Path
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
-from generate_photo_pages import generate_photo_pages, write_text_if_changed
+import change_feed
+import change_log
+import json_pages
+import json_stream
+import metrics
+import precompress
+import profiling
+import publish
+import rss_writer
+import watch
+from generate_photo_pages import WarmState, generate_photo_pages
+from snapshot import PUBLIC_PHOTOS, Snapshot
+
+RSS_ITEMS = 100
+
+# Channel information
+CHANNEL_TITLE = 'Fotos de Valladolid - Aldea Pucela'
+CHANNEL_LINK = 'https://fotos.aldeapucela.org/'
+CHANNEL_DESCRIPTION = 'Fotos de Valladolid de la mayor comunidad vecinal online sobre Valladolid'
+
+# License information
+RIGHTS = 'Las imágenes están bajo licencia CC BY-SA 4.0 - https://creativecommons.org/licenses/by-sa/4.0/'
+LICENSE = 'https://creativecommons.org/licenses/by-sa/4.0/'
+LICENSE_ATTRIBUTES = {'xmlns:creativeCommons': 'http://backend.userland.com/creativeCommonsRssModule'}
+LANGUAGE = 'es'
 
 def iso8601_to_rfc822(iso_date):
     """Convert ISO 8601 date to RFC 822 format required by RSS"""
@@ -21,178 +45,332 @@ def iso8601_to_rfc822(iso_date):
     except (AttributeError, TypeError, ValueError):
         return 'Thu, 01 Jan 1970 00:00:00 +0000'
 
-def generate_rss(project_root=None):
+def feed_item(path, date, author, description):
+    """RSS item fields of a photo, shared by feed.xml and the JSON API."""
+    # Item title - use first line of description or filename
+    if description:
+        # Use first line or first 60 chars of description
+        title_text = description.split('\n')[0][:60]
+        if len(title_text) == 60:
+            title_text += '...'
+    else:
+        title_text = os.path.basename(path)
+
+    image_id = os.path.splitext(os.path.basename(path))[0]
+    item_link = f'https://fotos.aldeapucela.org/f/{image_id}/'
+
+    # Item description
+    html_desc = f'<img src="https://fotos.aldeapucela.org/files/{path}" style="max-width:600px;height:auto;"/>'
+    if description:
+        html_desc += f'<p>{description}</p>'
+    if author:
+        html_desc += f'<p>Autor/a: {author} - CC BY-SA 4.0</p>'
+        html_desc += f'<p><a href="https://t.me/AldeaPucela/27202/{image_id}">Ver original</a></p>'
+
+    # Publication date - Convert ISO 8601 to RFC 822
+    pub_date = iso8601_to_rfc822(date)
+    guid = f'https://fotos.aldeapucela.org/files/{path}'
+
+    return {
+        'title': title_text,
+        'link': item_link,
+        'description': html_desc,
+        'pubDate': pub_date,
+        'guid': guid
+    }
+
+def channel(last_build_date):
+    """Skeleton of data.json, with json_stream.ITEMS for the items, and the RSS channel fields."""
+    channel_data = {
+        'title': CHANNEL_TITLE,
+        'link': CHANNEL_LINK,
+        'description': CHANNEL_DESCRIPTION,
+        'copyright': RIGHTS,
+        'creativeCommons:license': {
+            '_': LICENSE,
+            **LICENSE_ATTRIBUTES
+        },
+        'language': LANGUAGE,
+        'lastBuildDate': last_build_date,
+        'item': json_stream.ITEMS
+    }
+    channel_fields = [
+        ('title', CHANNEL_TITLE, {}),
+        ('link', CHANNEL_LINK, {}),
+        ('description', CHANNEL_DESCRIPTION, {}),
+        ('copyright', RIGHTS, {}),
+        ('creativeCommons:license', LICENSE, LICENSE_ATTRIBUTES),
+        ('language', LANGUAGE, {}),
+        ('lastBuildDate', last_build_date, {}),
+    ]
+    return [{'rss': {'version': '2.0', 'channel': channel_data}}], channel_fields
+
+def script_signature():
+    # The available compressors are part of the signature so that
+    # installing brotli writes the missing .br siblings.
+    return hashlib.sha256(
+        Path(__file__).read_bytes()
+        + Path(json_stream.__file__).read_bytes()
+        + Path(rss_writer.__file__).read_bytes()
+        + Path(json_pages.__file__).read_bytes()
+        + Path(change_feed.__file__).read_bytes()
+        + ''.join(precompress.sibling_suffixes()).encode('ascii')
+    ).hexdigest()
+
+def generate_rss(project_root=None, jobs=1, legacy_json=True, warm=None, snapshot=None):
     try:
         # Get the project root directory (parent of scripts directory)
         project_root = Path(project_root) if project_root else Path(__file__).resolve().parent.parent
         db_path = project_root / 'fotos.db'
-        
-        # Create RSS feed structure
-        rss = ET.Element('rss', version='2.0')
-        channel = ET.SubElement(rss, 'channel')
-        
-        # Add channel information
-        title = ET.SubElement(channel, 'title')
-        title.text = 'Fotos de Valladolid - Aldea Pucela'
-        
-        link = ET.SubElement(channel, 'link')
-        link.text = 'https://fotos.aldeapucela.org/'
-        
-        desc = ET.SubElement(channel, 'description')
-        desc.text = 'Fotos de Valladolid de la mayor comunidad vecinal online sobre Valladolid'
-        
-        # Add license information
-        rights = ET.SubElement(channel, 'copyright')
-        rights.text = 'Las imágenes están bajo licencia CC BY-SA 4.0 - https://creativecommons.org/licenses/by-sa/4.0/'
-        
-        license = ET.SubElement(channel, 'creativeCommons:license', {'xmlns:creativeCommons': 'http://backend.userland.com/creativeCommonsRssModule'})
-        license.text = 'https://creativecommons.org/licenses/by-sa/4.0/'
-        
-        language = ET.SubElement(channel, 'language')
-        language.text = 'es'
-        
-        # Se completa con la fecha de la foto más reciente para que la salida
-        # sea determinista cuando la base de datos no ha cambiado.
-        lastBuildDate = ET.SubElement(channel, 'lastBuildDate')
-        
-        # Connect to database and get all photos. RSS is limited below, while
-        # the JSON feed exposes the complete result set.
-        with sqlite3.connect(db_path) as conn:
-            photos = conn.execute("""
-                SELECT i.path, i.date, i.author, i.description
-                FROM imagenes i
-                LEFT JOIN image_analysis ia ON ia.image_id = i.id
-                WHERE i.description IS NOT NULL
-                AND (ia.is_appropriate = 1 OR ia.is_appropriate IS NULL)
-                ORDER BY i.date DESC
-            """).fetchall()
+        snapshot = snapshot or Snapshot(db_path)
 
         output_path = project_root / 'feed.xml'
         json_output_path = project_root / 'data.json'
-        state_path = project_root / '.feed-rss-state.json'
-        signature_payload = json.dumps(
-            {
-                'script': hashlib.sha256(Path(__file__).read_bytes()).hexdigest(),
-                'photos': photos,
-            },
-            ensure_ascii=False,
-            separators=(',', ':'),
-        )
-        feed_signature = hashlib.sha256(signature_payload.encode('utf-8')).hexdigest()
-        try:
-            previous_signature = json.loads(
-                state_path.read_text(encoding='utf-8')
-            ).get('signature')
-        except (FileNotFoundError, json.JSONDecodeError, OSError):
-            previous_signature = None
+        pages_index_path = project_root / json_pages.PAGES_DIR / json_pages.INDEX_NAME
+        changes_latest_path = project_root / change_feed.CHANGES_DIR / change_feed.LATEST_NAME
+        signature = script_signature()
+
+        # The change log tells whether any photo changed since the last run
+        # without reading the photos themselves.
+        with metrics.stage('change_log'), sqlite3.connect(db_path) as conn:
+            change_log.install(conn)
+            head, last_seq, previous_signature = change_log.pending(conn, 'feed-rss')
 
         if (
-            previous_signature == feed_signature
+            last_seq == head
+            and previous_signature == signature
             and output_path.is_file()
-            and json_output_path.is_file()
+            and pages_index_path.is_file()
+            and changes_latest_path.is_file()
+            and json_output_path.is_file() == legacy_json
         ):
             print(f"RSS: sin cambios ({output_path})")
-            print(f"JSON: sin cambios ({json_output_path})")
-            generate_photo_pages(project_root)
+            if legacy_json:
+                print(f"JSON: sin cambios ({json_output_path})")
+            print(f"JSON paginado: sin cambios ({pages_index_path})")
+            print(f"Cambios: sin eventos nuevos ({changes_latest_path})")
+            generate_photo_pages(project_root, jobs=jobs, warm=warm, snapshot=snapshot)
             return
 
-        lastBuildDate.text = datetime.now().strftime('%a, %d %b %Y %H:%M:%S +0200')
-
-        channel_data = {
-            'title': title.text,
-            'link': link.text,
-            'description': desc.text,
-            'copyright': rights.text,
-            'creativeCommons:license': {
-                '_': license.text,
-                'xmlns:creativeCommons': 'http://backend.userland.com/creativeCommonsRssModule'
-            },
-            'language': language.text,
-            'lastBuildDate': lastBuildDate.text,
-            'item': []
-        }
-
-        # Build all items for the JSON API and only the latest 100 for RSS.
-        for index, photo in enumerate(photos):
-            path, date, author, description = photo
-
-            # Item title - use first line of description or filename
-            if description:
-                # Use first line or first 60 chars of description
-                title_text = description.split('\n')[0][:60]
-                if len(title_text) == 60:
-                    title_text += '...'
+        # Every output is written from the snapshot, which is consistent
+        # with its own position in the change log.
+        head = snapshot.head
+
+        last_build_date = datetime.now().strftime('%a, %d %b %Y %H:%M:%S +0200')
+
+        document, channel_fields = channel(last_build_date)
+
+        rss_items = []
+        item_count = 0
+
+        def feed_items(photos):
+            """Yield every JSON item, keeping the latest ones for the RSS feed."""
+            nonlocal item_count
+            for photo in photos:
+                started = time.perf_counter()
+                item_data = feed_item(photo.path, photo.date, photo.author, photo.description)
+                if item_count < RSS_ITEMS:
+                    rss_items.append(item_data)
+                item_count += 1
+                metrics.add_time('feed_items', time.perf_counter() - started)
+                yield item_data
+
+        if legacy_json:
+            # The JSON feed exposes every photo. Items are encoded and
+            # written one by one, so the feed is never held in memory.
+            with metrics.stage('json_serialize'):
+                json_changed = json_stream.write_if_changed(
+                    json_output_path,
+                    json_stream.encode(document, feed_items(snapshot.described(newest_first=True))),
+                )
+        else:
+            for _ in feed_items(itertools.islice(snapshot.described(newest_first=True), RSS_ITEMS)):
+                pass
+            # Without the flag a stale copy would keep listing photos
+            # that were removed or moderated since.
+            json_changed = json_output_path.is_file()
+            json_output_path.unlink(missing_ok=True)
+            precompress.remove_siblings(json_output_path)
+
+        # Pages are numbered oldest first, so they need their own pass.
+        with metrics.stage('json_pages'):
+            page_count, pages_written = json_pages.write_pages(
+                project_root,
+                (
+                    (photo.date, feed_item(photo.path, photo.date, photo.author, photo.description))
+                    for photo in snapshot.described()
+                ),
+            )
+
+        # Clients that mirror the gallery follow the change feed. Only
+        # the photos in the change log are compared, unless the output
+        # format may have changed.
+        with metrics.stage('change_feed'), change_feed.ChangeFeed(
+            project_root / change_feed.STATE_NAME, project_root / change_feed.CHANGES_DIR
+        ) as feed:
+            if last_seq is None or previous_signature != signature or feed.created:
+                changed = None
+                photos = snapshot.described()
             else:
-                title_text = os.path.basename(path)
-
-            image_id = os.path.splitext(os.path.basename(path))[0]
-            item_link = f'https://fotos.aldeapucela.org/f/{image_id}/'
-
-            # Item description
-            html_desc = f'<img src="https://fotos.aldeapucela.org/files/{path}" style="max-width:600px;height:auto;"/>'
-            if description:
-                html_desc += f'<p>{description}</p>'
-            if author:
-                html_desc += f'<p>Autor/a: {author} - CC BY-SA 4.0</p>'
-                html_desc += f'<p><a href="https://t.me/AldeaPucela/27202/{image_id}">Ver original</a></p>'
-
-            # Publication date - Convert ISO 8601 to RFC 822
-            pub_date = iso8601_to_rfc822(date)
-            guid = f'https://fotos.aldeapucela.org/files/{path}'
-
-            item_data = {
-                'title': title_text,
-                'link': item_link,
-                'description': html_desc,
-                'pubDate': pub_date,
-                'guid': guid
-            }
-            channel_data['item'].append(item_data)
-
-            if index < 100:
-                item = ET.SubElement(channel, 'item')
-                for field, value in item_data.items():
-                    element = ET.SubElement(item, field)
-                    element.text = value
-
-        # Generate pretty-printed XML
-        xmlstr = minidom.parseString(ET.tostring(rss)).toprettyxml(indent="  ")
-        
-        # Write to file
-        rss_changed = write_text_if_changed(output_path, xmlstr)
+                with sqlite3.connect(db_path) as conn:
+                    changed = sorted({
+                        image_id for image_id, _ in change_log.changes_since(conn, last_seq, head)
+                    })
+                photos = snapshot.described(image_ids=changed)
+            events = feed.record(
+                (
+                    (photo.id, os.path.splitext(os.path.basename(photo.path))[0],
+                     feed_item(photo.path, photo.date, photo.author, photo.description))
+                    for photo in photos
+                ),
+                changed,
+            )
+            feed_cursor = feed.head
 
-        json_content = json.dumps([{'rss': {
-                'version': '2.0',
-                'channel': channel_data
-            }}], ensure_ascii=False, indent=2) + '\n'
-        json_changed = write_text_if_changed(json_output_path, json_content)
+        with metrics.stage('rss_serialize'):
+            rss_changed = json_stream.write_if_changed(
+                output_path, rss_writer.encode(channel_fields, rss_items)
+            )
+        metrics.increment('feed_items', item_count)
 
         print(f"RSS: {'actualizado' if rss_changed else 'sin cambios'} ({output_path})")
-        print(f"JSON: {'actualizado' if json_changed else 'sin cambios'} ({json_output_path})")
-        state_content = json.dumps(
-            {'version': 1, 'signature': feed_signature},
-            indent=2,
-            sort_keys=True,
-        ) + '\n'
-        write_text_if_changed(state_path, state_content, mode=0o600)
-        generate_photo_pages(project_root)
+        if legacy_json:
+            print(f"JSON: {'actualizado' if json_changed else 'sin cambios'} ({json_output_path})")
+        elif json_changed:
+            print(f"JSON: eliminado ({json_output_path})")
+        print(f"JSON paginado: {pages_written} de {page_count} páginas actualizadas ({pages_index_path})")
+        print(f"Cambios: {events} eventos nuevos, cursor {feed_cursor} ({changes_latest_path})")
+        with sqlite3.connect(db_path) as conn:
+            change_log.mark(conn, 'feed-rss', head, signature)
+        generate_photo_pages(project_root, jobs=jobs, warm=warm, snapshot=snapshot)
         
     except Exception as e:
         print(f"Error generando el feed RSS: {e}")
         raise
 
 
+def republish_photo(project_root, snapshot, image_id, path):
+    """Apply the change of one photo to feed.xml, data.json, data/ and changes/.
+
+    ``snapshot`` is limited to ``image_id`` and the outputs must be up to
+    date except for that photo, which keeps its date. The other photos are
+    not encoded again: data.json keeps their text, and only the pages and
+    the feed items from the photo's position on are rewritten. Raises
+    ValueError if an output is missing or has an unexpected layout.
+    """
+    project_root = Path(project_root)
+    db_path = project_root / 'fotos.db'
+    output_path = project_root / 'feed.xml'
+    json_output_path = project_root / 'data.json'
+    pages_index_path = project_root / json_pages.PAGES_DIR / json_pages.INDEX_NAME
+    for required in (output_path, pages_index_path, project_root / change_feed.STATE_NAME):
+        if not required.is_file():
+            raise ValueError(f'Falta {required}')
+    position = snapshot.position(image_id)
+    if position is None:
+        raise ValueError(f'La foto {image_id} no está en la base de datos')
+
+    photo = snapshot.get(image_id)
+    item = None
+    if photo is not None and photo.description is not None:
+        item = feed_item(photo.path, photo.date, photo.author, photo.description)
+    document, channel_fields = channel(datetime.now().strftime('%a, %d %b %Y %H:%M:%S +0200'))
+
+    if json_output_path.is_file():
+        with metrics.stage('json_serialize'):
+            head, padding, tail = json_stream.layout(document)
+            guid = '"guid": ' + json.dumps(f'https://fotos.aldeapucela.org/files/{path}', ensure_ascii=False)
+
+            def encoded_items():
+                others = (
+                    encoded for encoded in json_stream.read_items(json_output_path, head, padding)
+                    if guid not in encoded
+                )
+                if item is not None:
+                    yield from itertools.islice(others, position.described_newest_first)
+                    yield json_stream.encode_item(item, padding)
+                yield from others
+
+            json_stream.write_if_changed(
+                json_output_path, json_stream.assemble(head, padding, tail, encoded_items())
+            )
+
+    described = PUBLIC_PHOTOS + ' AND i.description IS NOT NULL'
+    with sqlite3.connect(db_path) as conn:
+        if position.described_newest_first < RSS_ITEMS:
+            with metrics.stage('rss_serialize'):
+                rows = conn.execute(
+                    'SELECT i.path, i.date, i.author, i.description' + described
+                    + ' ORDER BY i.date DESC, i.id LIMIT ?',
+                    (RSS_ITEMS,),
+                )
+                json_stream.write_if_changed(
+                    output_path, rss_writer.encode(channel_fields, (feed_item(*row) for row in rows))
+                )
+
+        with metrics.stage('json_pages'):
+            first_page = position.described_oldest_first // json_pages.PAGE_SIZE + 1
+            rows = conn.execute(
+                'SELECT i.path, i.date, i.author, i.description' + described
+                + ' ORDER BY i.date, i.id LIMIT -1 OFFSET ?',
+                ((first_page - 1) * json_pages.PAGE_SIZE,),
+            )
+            json_pages.write_pages(
+                project_root, ((row[1], feed_item(*row)) for row in rows), first_page=first_page
+            )
+
+    with metrics.stage('change_feed'), change_feed.ChangeFeed(
+        project_root / change_feed.STATE_NAME, project_root / change_feed.CHANGES_DIR
+    ) as feed:
+        photo_id = os.path.splitext(os.path.basename(path))[0]
+        events = feed.record([] if item is None else [(image_id, photo_id, item)], [image_id])
+    print(f"Feed: foto {photo_id} {'publicada' if item else 'retirada'}, {events} eventos nuevos")
+
+
 def main():
+    parser = argparse.ArgumentParser(description='Genera el RSS, la API JSON y las páginas estáticas')
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help='procesos para regenerar las páginas estáticas (por defecto, 1)')
+    parser.add_argument('--legacy-json', action=argparse.BooleanOptionalAction, default=True,
+                        help='genera también data.json con todas las fotos; con --no-legacy-json '
+                             'solo se publica la API paginada de data/ y se elimina data.json')
+    parser.add_argument('--watch', action='store_true',
+                        help='se queda en ejecución y regenera en segundos cuando cambia fotos.db, '
+                             'en lugar de esperar al cron')
+    parser.add_argument('--debounce', type=float, default=watch.DEBOUNCE, metavar='S',
+                        help='con --watch, segundos sin cambios antes de regenerar '
+                             f'(por defecto, {watch.DEBOUNCE:g})')
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error('--jobs debe ser 1 o mayor')
+    if args.debounce < 0:
+        parser.error('--debounce no puede ser negativo')
+
     project_root = Path(__file__).resolve().parent.parent
-    lock_path = project_root / '.feed-rss.lock'
-    with lock_path.open('a+', encoding='utf-8') as lock_file:
-        try:
-            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
-        except BlockingIOError:
+    if args.watch:
+        # The daemon keeps the lock, so cron runs left as a fallback are
+        # skipped while it is alive.
+        with publish.generation_lock(project_root, wait=True), \
+                profiling.session('feed_rss', args), WarmState(project_root) as warm:
+            def rebuild():
+                # Each rebuild publishes everything, tag caches included,
+                # from one snapshot.
+                with metrics.run('publish'):
+                    publish.publish(project_root, jobs=args.jobs, legacy_json=args.legacy_json, warm=warm)
+
+            watch.watch(project_root / 'fotos.db', rebuild, 'feed-rss', debounce=args.debounce)
+        return
+    with publish.generation_lock(project_root) as acquired:
+        if not acquired:
             print('Otra generación sigue activa; se omite esta ejecución.')
             return
-        generate_rss(project_root)
-
+        with metrics.run('feed_rss'), profiling.session('feed_rss', args):
+            generate_rss(project_root, jobs=args.jobs, legacy_json=args.legacy_json)
+            # A moderation or deletion that found the lock busy asked for a
+            # full publish, tag caches included, before the lock is released.
+            while publish.publish_requested(project_root):
+                publish.publish(project_root, jobs=args.jobs, legacy_json=args.legacy_json)
 
 if __name__ == "__main__":
     main()
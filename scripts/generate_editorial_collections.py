@@ -3,11 +3,17 @@
 
 from __future__ import annotations
 
+import argparse
 import html
 import json
 import re
 from pathlib import Path
 
+import metrics
+import precompress
+import profiling
+from page_template import PageTemplate
+
 
 BASE_URL = "https://fotos.aldeapucela.org"
 META_RE = re.compile(
@@ -15,6 +21,7 @@ META_RE = re.compile(
     re.DOTALL,
 )
 SAFE_SLUG_RE = re.compile(r"^[a-z0-9]+(?:-[a-z0-9]+)*$")
+SLUG_RE = re.compile(re.escape('data-collection-slug=""'))
 
 
 def load_collections(project_root: Path) -> list[dict]:
@@ -49,9 +56,14 @@ def meta_block(collection: dict) -> str:
 def generate_editorial_collections(project_root: Path | None = None) -> int:
     project_root = Path(project_root) if project_root else Path(__file__).resolve().parent.parent
     template_path = project_root / "miradas" / "index.html"
-    template = template_path.read_text(encoding="utf-8")
-    if not META_RE.search(template):
-        raise RuntimeError("No se encontró EDITORIAL_META en la plantilla de Miradas")
+    template_text = template_path.read_text(encoding="utf-8")
+    slots = {"meta": META_RE}
+    if SLUG_RE.search(template_text):
+        slots["slug"] = SLUG_RE
+    try:
+        template = PageTemplate(template_text, slots)
+    except ValueError:
+        raise RuntimeError("No se encontró EDITORIAL_META en la plantilla de Miradas") from None
 
     collections = load_collections(project_root)
     slugs = [str(collection.get("slug", "")) for collection in collections]
@@ -62,24 +74,31 @@ def generate_editorial_collections(project_root: Path | None = None) -> int:
         raise RuntimeError(f"Slugs de Miradas no seguros: {invalid}")
 
     generated = 0
-    for collection in collections:
-        slug = collection["slug"]
-        page = META_RE.sub(meta_block(collection), template, count=1)
-        page = page.replace(
-            'data-collection-slug=""',
-            f'data-collection-slug="{html.escape(slug, quote=True)}"',
-            1,
-        )
-        output = project_root / "miradas" / slug / "index.html"
-        output.parent.mkdir(parents=True, exist_ok=True)
-        previous = output.read_text(encoding="utf-8") if output.exists() else None
-        if previous != page:
-            output.write_text(page, encoding="utf-8")
-            generated += 1
+    with metrics.stage("editorial"):
+        for collection in collections:
+            slug = collection["slug"]
+            page = template.render(
+                meta=meta_block(collection),
+                slug=f'data-collection-slug="{html.escape(slug, quote=True)}"',
+            )
+            output = project_root / "miradas" / slug / "index.html"
+            output.parent.mkdir(parents=True, exist_ok=True)
+            previous = output.read_text(encoding="utf-8") if output.exists() else None
+            if previous != page:
+                output.write_text(page, encoding="utf-8")
+                precompress.compress_file(output)
+                metrics.increment("files_written")
+                generated += 1
+            else:
+                precompress.ensure_siblings(output)
 
     print(f"Miradas: {generated} páginas actualizadas, {len(collections)} publicadas")
     return len(collections)
 
 
 if __name__ == "__main__":
-    generate_editorial_collections()
+    parser = argparse.ArgumentParser(description=__doc__)
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    with metrics.run("editorial"), profiling.session("editorial", args):
+        generate_editorial_collections()
@@ -3,17 +3,29 @@
 
 from __future__ import annotations
 
+import argparse
 import html
 import hashlib
 import json
-import os
 import re
 import shutil
 import sqlite3
-import struct
+import time
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
+from typing import ContextManager, Iterable, Iterator
 from urllib.parse import quote
-from xml.etree import ElementTree as ET
+
+import change_log
+import metrics
+import precompress
+import profiling
+import sitemap
+from image_metadata import CACHE_NAME as IMAGE_METADATA_NAME, ImageMetadataCache
+from page_manifest import PageManifest
+from page_template import PageTemplate
+from snapshot import PUBLIC_PHOTOS, Photo, Snapshot
 
 
 BASE_URL = "https://fotos.aldeapucela.org"
@@ -24,48 +36,17 @@ META_BLOCK_RE = re.compile(
 SAFE_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
 URL_RE = re.compile(r"https?://[^\s<>()]+", re.IGNORECASE)
 PARENTHESIZED_URL_RE = re.compile(r"[ \t]*\([ \t]*https?://[^\s<>()]+[ \t]*\)", re.IGNORECASE)
-MANIFEST_NAME = ".photo-pages-manifest.json"
+MANIFEST_NAME = ".photo-pages-manifest.sqlite"
+LEGACY_MANIFEST_NAME = ".photo-pages-manifest.json"
+PHOTO_FIELDS = ("path", "date", "author", "description")
+PARALLEL_CHUNK_SIZE = 500
+SITEMAP_SHARD_SIZE = sitemap.SHARD_SIZE
 
 
 def photo_id_from_path(image_path: str) -> str:
     return Path(image_path).stem
 
 
-def jpeg_dimensions(image_path: Path) -> tuple[int, int] | None:
-    """Read JPEG dimensions without adding a third-party dependency."""
-    try:
-        with image_path.open("rb") as image:
-            if image.read(2) != b"\xff\xd8":
-                return None
-            while True:
-                marker_start = image.read(1)
-                if not marker_start:
-                    return None
-                if marker_start != b"\xff":
-                    continue
-                marker = image.read(1)
-                while marker == b"\xff":
-                    marker = image.read(1)
-                if marker in {b"\xd8", b"\xd9"}:
-                    continue
-                length_bytes = image.read(2)
-                if len(length_bytes) != 2:
-                    return None
-                segment_length = struct.unpack(">H", length_bytes)[0]
-                if marker and marker[0] in {
-                    0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
-                    0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF,
-                }:
-                    data = image.read(5)
-                    if len(data) != 5:
-                        return None
-                    height, width = struct.unpack(">HH", data[1:])
-                    return width, height
-                image.seek(segment_length - 2, os.SEEK_CUR)
-    except (OSError, struct.error, ValueError):
-        return None
-
-
 def strip_urls_for_sharing(value: str | None) -> str:
     """Remove external URLs and their empty wrapping parentheses."""
     without_parenthesized_urls = PARENTHESIZED_URL_RE.sub("", value or "")
@@ -94,6 +75,7 @@ def build_meta_block(
     author: str | None,
     description: str | None,
     dimensions: tuple[int, int] | None,
+    image_type: str = "image/jpeg",
 ) -> str:
     title = photo_title(photo_id, description)
     page_title = f"{title} — Fotos de Valladolid | Aldea Pucela"
@@ -117,14 +99,15 @@ def build_meta_block(
     lines = [
         "  <!-- SOCIAL_META_START -->",
         f"  <title>{escaped['page_title']}</title>",
-        '  <link rel="alternate" type="application/rss+xml" title="Fotos de Valladolid - Aldea Pucela" href="/feed.xml" />',
+        '  <link rel="alternate" type="application/rss+xml" '
+        'title="Fotos de Valladolid - Aldea Pucela" href="/feed.xml" />',
         f'  <link rel="canonical" href="{escaped["canonical_url"]}">',
         f'  <meta property="og:title" content="{escaped["title"]}">',
         '  <meta property="og:type" content="article">',
         f'  <meta property="og:description" content="{escaped["summary"]}">',
         f'  <meta property="og:image" content="{escaped["image_url"]}">',
         f'  <meta property="og:image:secure_url" content="{escaped["image_url"]}">',
-        '  <meta property="og:image:type" content="image/jpeg">',
+        f'  <meta property="og:image:type" content="{image_type}">',
     ]
     if dimensions:
         width, height = dimensions
@@ -144,43 +127,51 @@ def build_meta_block(
     return "\n".join(lines)
 
 
-def public_photos(db_path: Path) -> list[sqlite3.Row]:
-    connection = sqlite3.connect(db_path)
-    connection.row_factory = sqlite3.Row
-    try:
-        return connection.execute(
-            """
-            SELECT i.path, i.date, i.author, i.description
-            FROM imagenes i
-            LEFT JOIN image_analysis ia ON ia.image_id = i.id
-            WHERE ia.is_appropriate = 1 OR ia.is_appropriate IS NULL
-            ORDER BY i.date DESC
-            """
-        ).fetchall()
-    finally:
-        connection.close()
-
-
-def write_text_if_changed(path: Path, content: str, mode: int = 0o644) -> bool:
-    """Atomically write text only when its bytes differ from the existing file."""
+def page_fields(photo: Photo) -> dict:
+    return {key: getattr(photo, key) for key in PHOTO_FIELDS}
+
+
+def chunked(photos: Iterable[Photo], size: int) -> Iterator[list[dict]]:
+    """Group snapshot photos into picklable chunks of at most ``size`` photos."""
+    chunk: list[dict] = []
+    for photo in photos:
+        chunk.append(page_fields(photo))
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_text_if_changed(path: Path, content: str, mode: int = 0o644, compress: bool = True) -> bool:
+    """Atomically write text only when its bytes differ from the existing file.
+
+    With ``compress`` the ``.gz``/``.br`` siblings are rewritten together with
+    the file, or created if an unchanged file is missing them.
+    """
+    data = content.encode("utf-8")
     try:
-        if path.read_text(encoding="utf-8") == content:
+        if path.read_bytes() == data:
+            if compress:
+                precompress.ensure_siblings(path, mode)
             return False
     except FileNotFoundError:
         pass
 
+    start = time.perf_counter()
     path.parent.mkdir(parents=True, exist_ok=True)
     temporary = path.with_name(f".{path.name}.tmp")
-    temporary.write_text(content, encoding="utf-8")
+    temporary.write_bytes(data)
     temporary.chmod(mode)
     temporary.replace(path)
+    if compress:
+        precompress.write_siblings(path, data, mode)
+    metrics.add_time("write", time.perf_counter() - start)
+    metrics.increment("files_written")
     return True
 
 
-def write_sitemap(project_root: Path, photos: list[sqlite3.Row]) -> bool:
-    namespace = "http://www.sitemaps.org/schemas/sitemap/0.9"
-    ET.register_namespace("", namespace)
-    urlset = ET.Element(f"{{{namespace}}}urlset")
+def sitemap_locations(project_root: Path) -> list[str]:
     locations = ["/", "/populares/", "/miradas/", "/etiquetas/", "/elementos/"]
     collections_path = project_root / "data" / "editorial-collections.json"
     if collections_path.exists():
@@ -193,32 +184,32 @@ def write_sitemap(project_root: Path, photos: list[sqlite3.Row]) -> bool:
             )
         except (json.JSONDecodeError, OSError, TypeError, KeyError):
             pass
-    for location in locations:
-        url = ET.SubElement(urlset, f"{{{namespace}}}url")
-        ET.SubElement(url, f"{{{namespace}}}loc").text = BASE_URL + location
-    for photo in photos:
-        photo_id = photo_id_from_path(photo["path"])
-        url = ET.SubElement(urlset, f"{{{namespace}}}url")
-        ET.SubElement(url, f"{{{namespace}}}loc").text = f"{BASE_URL}/f/{quote(photo_id, safe='')}/"
-        if photo["date"]:
-            ET.SubElement(url, f"{{{namespace}}}lastmod").text = str(photo["date"])[:10]
-    tree = ET.ElementTree(urlset)
-    ET.indent(tree, space="  ")
-    content = ET.tostring(urlset, encoding="unicode", xml_declaration=True)
-    return write_text_if_changed(project_root / "sitemap.xml", content)
+    return [BASE_URL + location for location in locations]
 
 
-def load_manifest(path: Path) -> dict[str, str]:
-    try:
-        data = json.loads(path.read_text(encoding="utf-8"))
-        pages = data.get("pages", {})
-        return pages if isinstance(pages, dict) else {}
-    except (FileNotFoundError, json.JSONDecodeError, OSError):
-        return {}
+def write_sitemap(project_root: Path, manifest: PageManifest, snapshot: Snapshot) -> bool:
+    """Rewrite the sitemap shards whose photos changed and the sitemap index."""
+    photos = (
+        (
+            f"{BASE_URL}/f/{quote(photo_id_from_path(photo.path), safe='')}/",
+            str(photo.date)[:10] if photo.date else None,
+        )
+        for photo in snapshot.photos
+    )
+    digests, written = sitemap.write_sitemaps(
+        project_root,
+        BASE_URL,
+        sitemap_locations(project_root),
+        photos,
+        manifest.shard_digests(),
+        SITEMAP_SHARD_SIZE,
+    )
+    manifest.replace_shard_digests(digests)
+    return bool(written)
 
 
 def photo_signature(
-    photo: sqlite3.Row,
+    photo: dict,
     build_signature: str,
     image_path: Path,
 ) -> str:
@@ -240,75 +231,373 @@ def photo_signature(
     return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
 
 
-def generate_photo_pages(project_root: Path | None = None) -> int:
-    project_root = Path(project_root) if project_root else Path(__file__).resolve().parent.parent
-    template = (project_root / "index.html").read_text(encoding="utf-8")
-    if not META_BLOCK_RE.search(template):
-        raise RuntimeError("No se encontró el bloque SOCIAL_META en index.html")
+def render_photo_page(
+    project_root: Path,
+    template: PageTemplate,
+    photo_id: str,
+    photo: dict,
+    metadata_cache: ImageMetadataCache,
+) -> None:
+    image_name = Path(photo["path"]).name
+    metadata = metadata_cache.get(project_root / "files" / image_name)
+    meta = build_meta_block(
+        photo_id,
+        image_name,
+        photo["author"],
+        photo["description"],
+        metadata.display_dimensions if metadata else None,
+        metadata.mime_type if metadata else "image/jpeg",
+    )
+    page = template.render(meta=meta)
+    page_path = project_root / "f" / photo_id / "index.html"
+    page_path.parent.mkdir(mode=0o755, parents=True, exist_ok=True)
+    page_path.parent.chmod(0o755)
+    write_text_if_changed(page_path, page)
 
-    photos = public_photos(project_root / "fotos.db")
-    ids = [photo_id_from_path(photo["path"]) for photo in photos]
+
+def render_photo_pages(
+    project_root: Path,
+    template: PageTemplate,
+    build_signature: str,
+    photos: list[dict],
+    previous_signatures: dict[str, str],
+    metadata_cache: ImageMetadataCache,
+) -> tuple[dict[str, str], int, int]:
+    """Render the pages whose signature changed and return the new signatures.
+
+    Hashing and rendering are timed per photo but recorded once per call;
+    the rendering time includes the writes.
+    """
+    signatures: dict[str, str] = {}
+    generated = 0
+    unchanged = 0
+    hashing_seconds = 0.0
+    rendering_seconds = 0.0
+    for photo in photos:
+        started = time.perf_counter()
+        photo_id = photo_id_from_path(photo["path"])
+        image_path = project_root / "files" / Path(photo["path"]).name
+        signature = photo_signature(photo, build_signature, image_path)
+        signatures[photo_id] = signature
+        page_path = project_root / "f" / photo_id / "index.html"
+
+        if previous_signatures.get(photo_id) == signature and page_path.is_file():
+            unchanged += 1
+            hashing_seconds += time.perf_counter() - started
+            continue
+
+        hashed = time.perf_counter()
+        hashing_seconds += hashed - started
+        render_photo_page(project_root, template, photo_id, photo, metadata_cache)
+        rendering_seconds += time.perf_counter() - hashed
+        generated += 1
+    metrics.add_time("signature", hashing_seconds, len(signatures))
+    if generated:
+        metrics.add_time("render", rendering_seconds, generated)
+    return signatures, generated, unchanged
+
+
+def _render_photo_pages_chunk(
+    arguments: tuple[Path, str, str, list[dict], dict[str, str]],
+) -> tuple[dict[str, str], int, int, list[tuple], tuple[dict, dict]]:
+    project_root = arguments[0]
+    # Forked workers inherit the parent's metrics; only this chunk's are returned.
+    metrics.reset()
+    # Workers only read the cache; the parent stores what they had to parse.
+    with ImageMetadataCache(project_root / IMAGE_METADATA_NAME, readonly=True) as cache:
+        signatures, generated, unchanged = render_photo_pages(*arguments, cache)
+    precompress.drain()
+    return signatures, generated, unchanged, cache.pending, metrics.snapshot()
+
+
+def open_metadata_cache(
+    project_root: Path,
+    metadata_cache: ImageMetadataCache | None,
+) -> ContextManager[ImageMetadataCache]:
+    """Use the caller's open cache, or open one for the duration of a build."""
+    if metadata_cache is not None:
+        return nullcontext(metadata_cache)
+    return ImageMetadataCache(project_root / IMAGE_METADATA_NAME)
+
+
+def check_photo_ids(ids: list[str]) -> None:
     if len(ids) != len(set(ids)):
         raise RuntimeError("Hay identificadores públicos de foto duplicados")
     invalid_ids = [photo_id for photo_id in ids if not SAFE_ID_RE.fullmatch(photo_id)]
     if invalid_ids:
         raise RuntimeError(f"Identificadores públicos no seguros: {invalid_ids[:5]}")
 
-    output = project_root / "f"
-    output.mkdir(mode=0o755, exist_ok=True)
-    output.chmod(0o755)
-    manifest_path = project_root / MANIFEST_NAME
-    previous_signatures = load_manifest(manifest_path)
-    build_signature = hashlib.sha256(
-        template.encode("utf-8") + Path(__file__).read_bytes()
-    ).hexdigest()
 
-    current_signatures: dict[str, str] = {}
+def replaced_images(
+    project_root: Path,
+    connection: sqlite3.Connection,
+    metadata_cache: ImageMetadataCache | None = None,
+) -> list[tuple[int, str]]:
+    """Photos whose file in files/ was replaced without touching their row.
+
+    The change log only sees the database, so the files are compared with
+    the size and mtime the metadata cache recorded when their page was
+    rendered.
+    """
+    with open_metadata_cache(project_root, metadata_cache) as metadata_cache:
+        names = [
+            Path(key).name for key in metadata_cache.replaced() if Path(key).parent == Path("files")
+        ]
+    if not names:
+        return []
+    return connection.execute(
+        "SELECT id, path FROM imagenes WHERE path IN (SELECT value FROM json_each(?))",
+        (json.dumps(names),),
+    ).fetchall()
+
+
+def build_all_pages(
+    project_root: Path,
+    template: PageTemplate,
+    build_signature: str,
+    manifest: PageManifest,
+    snapshot: Snapshot,
+    jobs: int,
+    metadata_cache: ImageMetadataCache | None = None,
+) -> tuple[int, int, list[str]]:
+    """Render the stale pages of every public photo and remove retired ones.
+
+    Photos are handled in chunks; with ``jobs > 1`` each chunk is rendered
+    by a process pool that never holds more than a few chunks.
+    """
+    manifest.begin_full_build()
+
+    def prepared_chunks() -> Iterator[tuple[list[dict], dict[str, str]]]:
+        chunks = chunked(snapshot.newest_first(), PARALLEL_CHUNK_SIZE)
+        while True:
+            # Preparing photos and looking up signatures is the query stage.
+            started = time.perf_counter()
+            chunk = next(chunks, None)
+            if chunk is None:
+                return
+            ids = [photo_id_from_path(photo["path"]) for photo in chunk]
+            check_photo_ids(ids)
+            manifest.mark_seen(ids)
+            previous = manifest.signatures(ids)
+            metrics.add_time("db_query", time.perf_counter() - started)
+            yield chunk, previous
+
     generated = 0
     unchanged = 0
-    for photo, photo_id in zip(photos, ids):
-        image_name = Path(photo["path"]).name
-        image_path = project_root / "files" / image_name
-        signature = photo_signature(photo, build_signature, image_path)
-        current_signatures[photo_id] = signature
-        page_path = output / photo_id / "index.html"
+    with open_metadata_cache(project_root, metadata_cache) as metadata_cache:
+        if jobs > 1:
+            # Workers are forked: no compression thread may be running then,
+            # and each worker starts with a pool of its own.
+            precompress.drain()
+            with ProcessPoolExecutor(max_workers=jobs, initializer=precompress.reset) as executor:
+                pending: set = set()
+                chunks = prepared_chunks()
+                while True:
+                    for chunk, previous in chunks:
+                        pending.add(executor.submit(
+                            _render_photo_pages_chunk,
+                            (project_root, template, build_signature, chunk, previous),
+                        ))
+                        if len(pending) >= jobs * 2:
+                            break
+                    if not pending:
+                        break
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        signatures, chunk_generated, chunk_unchanged, metadata, values = future.result()
+                        metadata_cache.pending.extend(metadata)
+                        metrics.merge(values)
+                        manifest.update(signatures.items())
+                        generated += chunk_generated
+                        unchanged += chunk_unchanged
+        else:
+            for chunk, previous in prepared_chunks():
+                signatures, chunk_generated, chunk_unchanged = render_photo_pages(
+                    project_root, template, build_signature, chunk, previous, metadata_cache
+                )
+                manifest.update(signatures.items())
+                generated += chunk_generated
+                unchanged += chunk_unchanged
+        metadata_cache.flush()
+
+    removed_ids = manifest.unseen()
+    for photo_id in removed_ids:
+        if SAFE_ID_RE.fullmatch(photo_id):
+            shutil.rmtree(project_root / "f" / photo_id, ignore_errors=True)
+    manifest.remove(removed_ids)
+    return generated, unchanged, removed_ids
 
-        if previous_signatures.get(photo_id) == signature and page_path.is_file():
-            unchanged += 1
-            continue
 
-        dimensions = jpeg_dimensions(image_path)
-        meta = build_meta_block(
-            photo_id,
-            image_name,
-            photo["author"],
-            photo["description"],
-            dimensions,
-        )
-        page = META_BLOCK_RE.sub(meta, template, count=1)
-        page_path.parent.mkdir(mode=0o755, parents=True, exist_ok=True)
-        page_path.parent.chmod(0o755)
-        write_text_if_changed(page_path, page)
-        generated += 1
+def update_changed_pages(
+    project_root: Path,
+    template: PageTemplate,
+    build_signature: str,
+    manifest: PageManifest,
+    snapshot: Snapshot,
+    changes: list[tuple[int, str | None]],
+    metadata_cache: ImageMetadataCache | None = None,
+) -> tuple[int, int, list[str]]:
+    """Render or remove only the pages of the photos in the change log."""
+    with metrics.stage("db_query"):
+        photos = [page_fields(photo) for photo in snapshot.changed({image_id for image_id, _ in changes})]
+    ids = [photo_id_from_path(photo["path"]) for photo in photos]
+    check_photo_ids(ids)
 
-    current_ids = set(ids)
-    existing_ids = {
-        directory.name
-        for directory in output.iterdir()
-        if directory.is_dir() and SAFE_ID_RE.fullmatch(directory.name)
-    }
-    removed_ids = sorted(existing_ids - current_ids)
+    with open_metadata_cache(project_root, metadata_cache) as metadata_cache:
+        signatures, generated, unchanged = render_photo_pages(
+            project_root, template, build_signature, photos, manifest.signatures(ids),
+            metadata_cache,
+        )
+        metadata_cache.flush()
+    manifest.update(signatures.items())
+
+    touched_ids = sorted({photo_id_from_path(path) for _, path in changes if path} - set(ids))
+    known_ids = manifest.signatures(touched_ids)
+    removed_ids = [
+        photo_id for photo_id in touched_ids
+        if SAFE_ID_RE.fullmatch(photo_id)
+        and (photo_id in known_ids or (project_root / "f" / photo_id).is_dir())
+    ]
     for photo_id in removed_ids:
-        shutil.rmtree(output / photo_id)
+        shutil.rmtree(project_root / "f" / photo_id, ignore_errors=True)
+    manifest.remove(removed_ids)
+    return generated, unchanged, removed_ids
+
+
+def sitemap_signature(project_root: Path) -> str:
+    collections_path = project_root / "data" / "editorial-collections.json"
+    try:
+        collections = collections_path.read_bytes()
+    except OSError:
+        collections = b""
+    return hashlib.sha256(
+        collections + Path(__file__).read_bytes() + Path(sitemap.__file__).read_bytes()
+    ).hexdigest()
+
+
+def page_signature(template_text: str) -> str:
+    # Installing brotli changes the signature, so every page gets its .br sibling.
+    return hashlib.sha256(
+        template_text.encode("utf-8")
+        + Path(__file__).read_bytes()
+        + "".join(precompress.sibling_suffixes()).encode("ascii")
+    ).hexdigest()
+
+
+def load_template(project_root: Path) -> tuple[str, PageTemplate]:
+    template_text = (project_root / "index.html").read_text(encoding="utf-8")
+    try:
+        return template_text, PageTemplate(template_text, {"meta": META_BLOCK_RE})
+    except ValueError:
+        raise RuntimeError("No se encontró el bloque SOCIAL_META en index.html") from None
+
+
+class WarmState:
+    """Sidecars and the compiled template, kept open between rebuilds.
 
-    manifest = json.dumps(
-        {"version": 1, "pages": current_signatures},
-        ensure_ascii=False,
-        indent=2,
-        sort_keys=True,
-    ) + "\n"
-    write_text_if_changed(manifest_path, manifest, mode=0o600)
-    sitemap_changed = write_sitemap(project_root, photos)
+    Used by long-running callers such as ``feed-rss.py --watch``. The
+    template is compiled again only when ``index.html`` changes.
+    """
+
+    def __init__(self, project_root: Path):
+        self.project_root = Path(project_root)
+        self.manifest = PageManifest(
+            self.project_root / MANIFEST_NAME,
+            self.project_root / "f",
+            self.project_root / LEGACY_MANIFEST_NAME,
+        )
+        self.metadata_cache = ImageMetadataCache(self.project_root / IMAGE_METADATA_NAME)
+        self._template_key: tuple[int, int] | None = None
+        self._template: tuple[str, PageTemplate] | None = None
+
+    def template(self) -> tuple[str, PageTemplate]:
+        stat = (self.project_root / "index.html").stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+        if self._template is None or key != self._template_key:
+            self._template = load_template(self.project_root)
+            self._template_key = key
+        return self._template
+
+    def close(self) -> None:
+        self.manifest.close()
+        self.metadata_cache.close()
+
+    def __enter__(self) -> "WarmState":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def generate_photo_pages(
+    project_root: Path | None = None,
+    jobs: int = 1,
+    warm: WarmState | None = None,
+    snapshot: Snapshot | None = None,
+    check_files: bool = False,
+) -> int:
+    """Bring the photo pages and the sitemap up to date and return the page count.
+
+    ``check_files`` also looks for files replaced in files/ without a
+    change to their row, which means a stat of every cached image.
+    """
+    project_root = Path(project_root) if project_root else Path(__file__).resolve().parent.parent
+    snapshot = snapshot or Snapshot(project_root / "fotos.db")
+    template_text, template = warm.template() if warm else load_template(project_root)
+
+    output = project_root / "f"
+    output.mkdir(mode=0o755, exist_ok=True)
+    output.chmod(0o755)
+    manifest_path = project_root / MANIFEST_NAME
+    build_signature = page_signature(template_text)
+
+    with metrics.stage("change_log"), sqlite3.connect(project_root / "fotos.db") as connection:
+        change_log.install(connection)
+        head, last_seq, last_build = change_log.pending(connection, "photo-pages")
+        _, sitemap_seq, last_sitemap = change_log.pending(connection, "sitemap")
+    if snapshot.loaded or last_seq != head or sitemap_seq != head:
+        # Pages are rendered from the snapshot, which holds every change
+        # up to its head; later ones are left for the next run.
+        head = snapshot.head
+
+    if warm is not None:
+        manifest_context = nullcontext(warm.manifest)
+    else:
+        manifest_context = PageManifest(manifest_path, output, project_root / LEGACY_MANIFEST_NAME)
+    metadata_cache = warm.metadata_cache if warm else None
+    with manifest_context as manifest:
+        incremental = last_seq is not None and last_build == build_signature and not manifest.created
+        if incremental:
+            with sqlite3.connect(project_root / "fotos.db") as connection:
+                changes = change_log.changes_since(connection, last_seq, head)
+                if check_files:
+                    changes += replaced_images(project_root, connection, metadata_cache)
+            with metrics.stage("pages"):
+                generated, unchanged, removed_ids = update_changed_pages(
+                    project_root, template, build_signature, manifest, snapshot, changes, metadata_cache
+                )
+        else:
+            with metrics.stage("pages"):
+                generated, unchanged, removed_ids = build_all_pages(
+                    project_root, template, build_signature, manifest, snapshot, jobs, metadata_cache
+                )
+        # A manifest kept open by WarmState is complete from now on.
+        manifest.created = False
+        total = manifest.count()
+        if incremental:
+            unchanged = total - generated
+
+        sitemap_changed = False
+        current_sitemap = sitemap_signature(project_root)
+        sitemap_stale = sitemap_seq != head or last_sitemap != current_sitemap
+        if sitemap_stale or not (project_root / sitemap.INDEX_NAMES[0]).is_file():
+            with metrics.stage("sitemap"):
+                sitemap_changed = write_sitemap(project_root, manifest, snapshot)
+
+    if last_seq != head or last_build != build_signature or sitemap_stale:
+        with sqlite3.connect(project_root / "fotos.db") as connection:
+            change_log.mark(connection, "photo-pages", head, build_signature)
+            change_log.mark(connection, "sitemap", head, current_sitemap)
 
     editorial_template = project_root / "miradas" / "index.html"
     editorial_config = project_root / "data" / "editorial-collections.json"
@@ -325,13 +614,104 @@ def generate_photo_pages(project_root: Path | None = None) -> int:
             spec.loader.exec_module(module)
             module.generate_editorial_collections(project_root)
 
+    with metrics.stage("compress_wait"):
+        precompress.drain()
+    metrics.increment("pages_generated", generated)
+    metrics.increment("pages_unchanged", unchanged)
+    metrics.increment("pages_removed", len(removed_ids))
     print(
         f"Páginas estáticas: {generated} generadas, {unchanged} sin cambios, "
-        f"{len(removed_ids)} eliminadas, {len(photos)} totales; "
+        f"{len(removed_ids)} eliminadas, {total} totales; "
         f"sitemap {'actualizado' if sitemap_changed else 'sin cambios'}"
     )
-    return len(photos)
+    return total
+
+
+def republish_photo_page(
+    project_root: Path,
+    snapshot: Snapshot,
+    image_id: int,
+    changes: list[tuple[int, str | None]],
+    warm: WarmState | None = None,
+) -> None:
+    """Render or remove the page of one photo and rewrite its sitemap shard.
+
+    ``snapshot`` is limited to ``image_id``, and the pages and the sitemap
+    must be up to date except for that photo, which keeps its date. Shards
+    before the photo's one are kept as they are. Raises ``ValueError`` if
+    the manifest or the sitemap is missing.
+    """
+    project_root = Path(project_root)
+    position = snapshot.position(image_id)
+    if position is None:
+        raise ValueError(f"La foto {image_id} no está en la base de datos")
+    template_text, template = warm.template() if warm else load_template(project_root)
+    if warm is not None:
+        manifest_context = nullcontext(warm.manifest)
+    elif (project_root / MANIFEST_NAME).is_file():
+        manifest_context = PageManifest(project_root / MANIFEST_NAME, project_root / "f")
+    else:
+        raise ValueError(f"Falta {project_root / MANIFEST_NAME}")
+
+    with manifest_context as manifest:
+        with metrics.stage("pages"):
+            generated, _, removed_ids = update_changed_pages(
+                project_root, template, page_signature(template_text), manifest, snapshot, changes,
+                warm.metadata_cache if warm else None,
+            )
+        with metrics.stage("sitemap"), sqlite3.connect(project_root / "fotos.db") as connection:
+            first_shard = position.oldest_first // SITEMAP_SHARD_SIZE + 1
+            rows = connection.execute(
+                "SELECT i.path, i.date" + PUBLIC_PHOTOS + " ORDER BY i.date, i.id LIMIT -1 OFFSET ?",
+                ((first_shard - 1) * SITEMAP_SHARD_SIZE,),
+            )
+            digests, written = sitemap.write_sitemaps(
+                project_root,
+                BASE_URL,
+                sitemap_locations(project_root),
+                (
+                    (f"{BASE_URL}/f/{quote(photo_id_from_path(path), safe='')}/",
+                     str(date)[:10] if date else None)
+                    for path, date in rows
+                ),
+                manifest.shard_digests(),
+                SITEMAP_SHARD_SIZE,
+                first_shard,
+            )
+        manifest.replace_shard_digests(digests)
+
+    with metrics.stage("compress_wait"):
+        precompress.drain()
+    metrics.increment("pages_generated", generated)
+    metrics.increment("pages_removed", len(removed_ids))
+    print(
+        f"Páginas estáticas: {generated} generadas, {len(removed_ids)} eliminadas; "
+        f"sitemap {'actualizado' if written else 'sin cambios'}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        metavar="N",
+        help="procesos para regenerar las páginas (por defecto, 1)",
+    )
+    parser.add_argument(
+        "--check-files",
+        action="store_true",
+        help="busca también archivos de files/ sustituidos sin cambiar la base de datos",
+    )
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs debe ser 1 o mayor")
+    with metrics.run("photo_pages"), profiling.session("photo_pages", args):
+        generate_photo_pages(jobs=args.jobs, check_files=args.check_files)
 
 
 if __name__ == "__main__":
-    generate_photo_pages()
+    main()
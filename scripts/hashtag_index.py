@@ -0,0 +1,171 @@
+"""Hashtags of the photo descriptions, indexed in fotos.db.
+
+``photo_hashtags`` holds one row per hashtag in a description, in the order
+they appear, with the photo's date copied next to it ('' when it has none,
+so that the index on the table also gives the newest-first order).
+``sync()`` keeps it in step with ``imagenes`` through the change log: only
+the photos changed since the last sync are scanned again, and a change of
+``HASHTAG_RE`` rebuilds the whole table. Hashtags are extracted in Python
+rather than in a trigger because the normalisation needs ``unicodedata``,
+which the other programs writing to fotos.db do not have.
+
+``tag_counts()`` turns the table into the ``tags-cache.json`` entries with a
+``GROUP BY`` for the counts and a window function that ranks the newest
+photos of each tag. Only public photos count, so the cache no longer lists
+the hashtags or the files of photos rejected by moderation.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+import unicodedata
+from typing import Iterable
+
+import change_log
+import metrics
+import schema
+
+
+GENERATOR = "photo-hashtags"
+# Includes accented characters and ñ.
+HASHTAG_RE = re.compile(r'#([a-záéíóúüñA-ZÁÉÍÓÚÜÑ0-9_]+)')
+LATEST_PHOTOS = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS photo_hashtags (
+    image_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    normalized_tag TEXT NOT NULL,
+    original_tag TEXT NOT NULL,
+    date TEXT NOT NULL,
+    UNIQUE (image_id, position)
+);
+CREATE INDEX IF NOT EXISTS photo_hashtags_tag
+    ON photo_hashtags (normalized_tag, date DESC, image_id, position);
+"""
+
+PUBLIC = "(ia.is_appropriate = 1 OR ia.is_appropriate IS NULL)"
+# Counts per tag over the public photos, and the newest photos of each tag
+# as update-tags.py has always listed them. The newest rows are picked by
+# rowid through the tag index, so only a few rows per tag are ranked.
+TAG_COUNTS = f"""
+    WITH counts AS (
+        SELECT h.normalized_tag, COUNT(*) AS count
+        FROM photo_hashtags h
+        LEFT JOIN image_analysis ia ON ia.image_id = h.image_id
+        WHERE {PUBLIC} {{tags}}
+        GROUP BY h.normalized_tag
+    )
+    SELECT counts.normalized_tag, counts.count, h.original_tag, i.path,
+        ROW_NUMBER() OVER (
+            PARTITION BY counts.normalized_tag
+            ORDER BY h.date DESC, h.image_id, h.position
+        ) AS rank
+    FROM counts
+    JOIN photo_hashtags h ON h.rowid IN (
+        SELECT p.rowid
+        FROM photo_hashtags p
+        LEFT JOIN image_analysis ia ON ia.image_id = p.image_id
+        WHERE p.normalized_tag = counts.normalized_tag AND {PUBLIC}
+        ORDER BY p.date DESC, p.image_id, p.position
+        LIMIT ?
+    )
+    JOIN imagenes i ON i.id = h.image_id
+    ORDER BY counts.normalized_tag, rank
+"""
+
+
+def normalize_tag(tag: str) -> str:
+    """Remove accents from a tag while keeping the # symbol."""
+    return '#' + ''.join(c for c in unicodedata.normalize('NFD', tag[1:])
+                         if unicodedata.category(c) != 'Mn')
+
+
+def extract(description: str | None) -> list[tuple[str, str]]:
+    """Return ``(normalized, original)`` for every hashtag, in order."""
+    return [
+        (normalize_tag(match.group(0)), match.group(0))
+        for match in HASHTAG_RE.finditer((description or '').lower())
+    ]
+
+
+def index_photos(connection: sqlite3.Connection, rows: Iterable[tuple[int, str | None, str | None]]) -> None:
+    connection.executemany(
+        "INSERT INTO photo_hashtags (image_id, position, normalized_tag, original_tag, date) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (
+            (image_id, position, normalized, original, date or '')
+            for image_id, description, date in rows
+            for position, (normalized, original) in enumerate(extract(description))
+        ),
+    )
+
+
+def sync(connection: sqlite3.Connection) -> int:
+    """Bring ``photo_hashtags`` up to date and return how many photos were scanned.
+
+    The change log is checked with a plain read first, so an idle run does
+    not take the write lock of fotos.db.
+    """
+    if not schema.installed(connection, change_log.SCHEMA + SCHEMA):
+        change_log.install(connection)
+        connection.executescript(SCHEMA)
+    head, last_seq, signature = change_log.pending(connection, GENERATOR)
+    if last_seq == head and signature == HASHTAG_RE.pattern:
+        return 0
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        # Read again under the lock, in case another run synced meanwhile.
+        head, last_seq, signature = change_log.pending(connection, GENERATOR)
+        if last_seq is None or signature != HASHTAG_RE.pattern:
+            connection.execute("DELETE FROM photo_hashtags")
+            rows = connection.execute(
+                "SELECT id, description, date FROM imagenes WHERE description LIKE '%#%'"
+            ).fetchall()
+        elif head != last_seq:
+            changed = change_log.changes_since(connection, last_seq, head)
+            ids = json.dumps(sorted({image_id for image_id, _ in changed}))
+            connection.execute(
+                "DELETE FROM photo_hashtags WHERE image_id IN (SELECT value FROM json_each(?))", (ids,)
+            )
+            rows = connection.execute(
+                "SELECT id, description, date FROM imagenes "
+                "WHERE id IN (SELECT value FROM json_each(?)) AND description LIKE '%#%'",
+                (ids,),
+            ).fetchall()
+        else:
+            connection.rollback()
+            return 0
+        index_photos(connection, rows)
+        # Commits the table together with its position in the change log.
+        change_log.mark(connection, GENERATOR, head, HASHTAG_RE.pattern)
+    except BaseException:
+        connection.rollback()
+        raise
+    metrics.increment('photos_indexed', len(rows))
+    return len(rows)
+
+
+def tag_counts(connection: sqlite3.Connection, tags: Iterable[str] | None = None) -> list[dict]:
+    """Return the cache entries of the public photos, for every tag or only ``tags``."""
+    parameters: tuple = ()
+    where = ""
+    if tags is not None:
+        where = "AND h.normalized_tag IN (SELECT value FROM json_each(?))"
+        parameters = (json.dumps(sorted(tags)),)
+    query = TAG_COUNTS.format(tags=where)
+    entries: dict[str, dict] = {}
+    for normalized, count, original, path, _ in connection.execute(query, parameters + (LATEST_PHOTOS,)):
+        entry = entries.get(normalized)
+        if entry is None:
+            # The newest photo gives the spelling shown for the tag.
+            entry = entries[normalized] = {
+                "tag": original,
+                "normalized_tag": normalized,
+                "count": count,
+                "latest_photos": [],
+            }
+        entry["latest_photos"].append(path)
+    return list(entries.values())
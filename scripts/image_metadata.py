@@ -0,0 +1,238 @@
+"""Persistent cache of image dimensions, orientation and format."""
+
+from __future__ import annotations
+
+import mmap
+import os
+import sqlite3
+import struct
+from pathlib import Path
+from typing import NamedTuple
+
+
+CACHE_NAME = ".image-metadata.sqlite"
+JPEG_SOF_MARKERS = {
+    0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+    0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF,
+}
+# Markers without a length field: TEM, RSTn, SOI and EOI.
+JPEG_STANDALONE_MARKERS = {0x01, *range(0xD0, 0xDA)}
+MIME_TYPES = {"jpeg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+
+
+class ImageMetadata(NamedTuple):
+    width: int
+    height: int
+    orientation: int
+    format: str
+
+    @property
+    def display_dimensions(self) -> tuple[int, int]:
+        """Dimensions once the EXIF orientation has been applied."""
+        if self.orientation in {5, 6, 7, 8}:
+            return self.height, self.width
+        return self.width, self.height
+
+    @property
+    def mime_type(self) -> str:
+        return MIME_TYPES.get(self.format, "image/jpeg")
+
+
+def exif_orientation(exif: bytes) -> int:
+    """Read the orientation tag from a TIFF-encoded EXIF block."""
+    if exif[:2] == b"II":
+        order = "<"
+    elif exif[:2] == b"MM":
+        order = ">"
+    else:
+        return 1
+    if struct.unpack_from(f"{order}H", exif, 2)[0] != 42:
+        return 1
+    ifd = struct.unpack_from(f"{order}I", exif, 4)[0]
+    entries = struct.unpack_from(f"{order}H", exif, ifd)[0]
+    for index in range(entries):
+        entry = ifd + 2 + index * 12
+        if struct.unpack_from(f"{order}H", exif, entry)[0] == 0x0112:
+            orientation = struct.unpack_from(f"{order}H", exif, entry + 8)[0]
+            return orientation if 1 <= orientation <= 8 else 1
+    return 1
+
+
+def jpeg_metadata(data: bytes) -> ImageMetadata | None:
+    offset = 2
+    orientation = 1
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            offset += 1
+            continue
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker in JPEG_STANDALONE_MARKERS:
+            offset += 2
+            continue
+        segment_length = struct.unpack_from(">H", data, offset + 2)[0]
+        segment = offset + 4
+        if marker == 0xE1 and data[segment:segment + 6] == b"Exif\x00\x00":
+            try:
+                orientation = exif_orientation(data[segment + 6:offset + 2 + segment_length])
+            except struct.error:
+                orientation = 1
+        elif marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack_from(">HH", data, segment + 1)
+            return ImageMetadata(width, height, orientation, "jpeg")
+        offset += 2 + segment_length
+    return None
+
+
+def png_metadata(data: bytes) -> ImageMetadata | None:
+    if data[12:16] != b"IHDR":
+        return None
+    width, height = struct.unpack_from(">II", data, 16)
+    return ImageMetadata(width, height, 1, "png")
+
+
+def webp_metadata(data: bytes) -> ImageMetadata | None:
+    chunk = data[12:16]
+    if chunk == b"VP8 " and data[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack_from("<HH", data, 26)
+        return ImageMetadata(width & 0x3FFF, height & 0x3FFF, 1, "webp")
+    if chunk == b"VP8L" and data[20] == 0x2F:
+        bits = int.from_bytes(data[21:25], "little")
+        return ImageMetadata((bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1, 1, "webp")
+    if chunk == b"VP8X":
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return ImageMetadata(width, height, 1, "webp")
+    return None
+
+
+def parse_image_header(data: bytes) -> ImageMetadata | None:
+    """Identify a JPEG, PNG or WebP header and read its metadata."""
+    try:
+        if data[:2] == b"\xff\xd8":
+            return jpeg_metadata(data)
+        if data[:8] == b"\x89PNG\r\n\x1a\n":
+            return png_metadata(data)
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            return webp_metadata(data)
+    except (struct.error, IndexError):
+        return None
+    return None
+
+
+def read_image_metadata(image_path: Path) -> ImageMetadata | None:
+    """Map the file once and parse its header without per-byte reads."""
+    try:
+        with image_path.open("rb") as image:
+            with mmap.mmap(image.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return parse_image_header(data)
+    except (OSError, ValueError):
+        return None
+
+
+class ImageMetadataCache:
+    """SQLite sidecar keyed by ``(path, size, mtime_ns)``.
+
+    Lookups for unchanged files never open the image. New entries are kept
+    in ``pending`` until ``flush()`` so read-only users, such as the page
+    workers, can hand them back to the process that owns the cache.
+    """
+
+    def __init__(self, path: Path, readonly: bool = False):
+        self.path = Path(path)
+        self.pending: list[tuple] = []
+        if readonly:
+            try:
+                self.connection = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True)
+                self.connection.execute("SELECT 1 FROM image_metadata LIMIT 1")
+            except sqlite3.Error:
+                self.connection = sqlite3.connect(":memory:")
+                self.create_schema()
+        else:
+            existed = self.path.exists()
+            self.connection = sqlite3.connect(self.path)
+            if not existed:
+                self.path.chmod(0o600)
+            self.create_schema()
+
+    def create_schema(self) -> None:
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS image_metadata (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                width INTEGER,
+                height INTEGER,
+                orientation INTEGER,
+                format TEXT
+            )
+            """
+        )
+
+    def get(self, image_path: Path) -> ImageMetadata | None:
+        try:
+            image_stat = image_path.stat()
+        except OSError:
+            return None
+        try:
+            key = str(image_path.relative_to(self.path.parent))
+        except ValueError:
+            key = str(image_path)
+        row = self.connection.execute(
+            """
+            SELECT width, height, orientation, format
+            FROM image_metadata
+            WHERE path = ? AND size = ? AND mtime_ns = ?
+            """,
+            (key, image_stat.st_size, image_stat.st_mtime_ns),
+        ).fetchone()
+        if row is not None:
+            return ImageMetadata(*row) if row[3] else None
+
+        metadata = read_image_metadata(image_path)
+        # Unreadable images are cached too, so they are not parsed again.
+        self.pending.append(
+            (key, image_stat.st_size, image_stat.st_mtime_ns, *(metadata or (None,) * 4))
+        )
+        return metadata
+
+    def replaced(self) -> list[str]:
+        """Cached paths whose file now has another size or mtime.
+
+        Files that no longer exist are left out.
+        """
+        paths = []
+        for key, size, mtime_ns in self.connection.execute(
+            "SELECT path, size, mtime_ns FROM image_metadata"
+        ):
+            try:
+                image_stat = os.stat(self.path.parent / key)
+            except OSError:
+                continue
+            if (image_stat.st_size, image_stat.st_mtime_ns) != (size, mtime_ns):
+                paths.append(key)
+        return paths
+
+    def store(self, entries: list[tuple]) -> None:
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO image_metadata VALUES (?, ?, ?, ?, ?, ?, ?)",
+                entries,
+            )
+
+    def flush(self) -> None:
+        if self.pending:
+            self.store(self.pending)
+            self.pending = []
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "ImageMetadataCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
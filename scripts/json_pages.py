@@ -0,0 +1,99 @@
+"""Paginated JSON API: fixed-size, date-ordered pages and a small index.
+
+Photos are numbered oldest first, so a new photo only changes the last page
+and ``data/index.json``. The index lists every page with its item count,
+the dates it covers and the SHA-256 of its bytes; it is also the state used
+to skip pages whose content did not change.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Iterable
+
+import precompress
+from generate_photo_pages import write_text_if_changed
+
+
+PAGES_DIR = "data"
+INDEX_NAME = "index.json"
+PAGE_SIZE = 1000
+VERSION = 1
+
+
+def page_name(number: int) -> str:
+    return f"page-{number:04d}.json"
+
+
+def load_index(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def encode_page(number: int, items: list[dict]) -> str:
+    return json.dumps({"page": number, "items": items}, ensure_ascii=False, indent=2) + "\n"
+
+
+def write_pages(
+    project_root: Path,
+    photos: Iterable[tuple[str, dict]],
+    page_size: int = PAGE_SIZE,
+    first_page: int = 1,
+) -> tuple[int, int]:
+    """Write ``(date, item)`` pairs, oldest first, as pages and an index.
+
+    With ``first_page``, ``photos`` start at that page and the pages before
+    it are kept as the index lists them. Returns the number of pages and
+    how many of them were written.
+    """
+    directory = project_root / PAGES_DIR
+    index_path = directory / INDEX_NAME
+    index = load_index(index_path)
+    previous = {page.get("file"): page.get("sha256") for page in index.get("pages", [])}
+    pages: list[dict] = index.get("pages", [])[:first_page - 1]
+    if len(pages) != first_page - 1 or (pages and index.get("page_size") != page_size):
+        raise ValueError(f"{index_path} no tiene las páginas anteriores a la {first_page}")
+    written = 0
+    total = sum(page["count"] for page in pages)
+
+    def flush(batch: list[tuple[str, dict]]) -> None:
+        nonlocal written
+        name = page_name(len(pages) + 1)
+        content = encode_page(len(pages) + 1, [item for _, item in batch])
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        path = directory / name
+        if previous.get(name) == digest and path.is_file():
+            precompress.ensure_siblings(path)
+        elif write_text_if_changed(path, content):
+            written += 1
+        pages.append({
+            "file": name,
+            "count": len(batch),
+            "first": batch[0][0],
+            "last": batch[-1][0],
+            "sha256": digest,
+        })
+
+    batch: list[tuple[str, dict]] = []
+    for date, item in photos:
+        batch.append((date, item))
+        total += 1
+        if len(batch) == page_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    current = {page["file"] for page in pages}
+    for path in directory.glob("page-*.json"):
+        if path.name not in current:
+            path.unlink()
+            precompress.remove_siblings(path)
+
+    index = {"version": VERSION, "page_size": page_size, "total": total, "pages": pages}
+    write_text_if_changed(index_path, json.dumps(index, ensure_ascii=False, indent=2) + "\n")
+    return len(pages), written
@@ -0,0 +1,135 @@
+"""Write large JSON documents without holding them in memory.
+
+The document is encoded as a skeleton in which one list is replaced by a
+placeholder. The list items are then encoded one by one, as they come out
+of a database cursor, and written between the two halves of the skeleton.
+The result is byte for byte ``json.dumps(document, ensure_ascii=False,
+indent=2) + "\\n"`` with the real list in place of the placeholder.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import metrics
+import precompress
+
+
+ITEMS = "__json_stream_items__"
+INDENT = 2
+
+
+def layout(document: object, indent: int = INDENT) -> tuple[str, str, str]:
+    """Encode the skeleton: the text before and after ``ITEMS`` and its indentation."""
+    skeleton = json.dumps(document, ensure_ascii=False, indent=indent)
+    placeholder = json.dumps(ITEMS)
+    head, found, tail = skeleton.partition(placeholder)
+    if not found or placeholder in tail:
+        raise ValueError(f"El documento debe contener {ITEMS!r} exactamente una vez")
+    line = head[head.rfind("\n") + 1:]
+    return head, line[:len(line) - len(line.lstrip(" "))], tail
+
+
+def encode_item(item: object, padding: str, indent: int = INDENT) -> str:
+    """One list item as it appears in the document, without its separator."""
+    item_padding = "\n" + padding + " " * indent
+    # Encoded strings never contain a raw newline, so every newline starts
+    # a line of the item.
+    return item_padding[1:] + json.dumps(item, ensure_ascii=False, indent=indent).replace("\n", item_padding)
+
+
+def assemble(head: str, padding: str, tail: str, encoded_items: Iterable[str]) -> Iterator[str]:
+    """Yield the document with items already encoded by ``encode_item``."""
+    yield head
+    empty = True
+    for encoded in encoded_items:
+        yield ("[\n" if empty else ",\n") + encoded
+        empty = False
+    yield "[]" if empty else "\n" + padding + "]"
+    yield tail + "\n"
+
+
+def encode(document: object, items: Iterable[object], indent: int = INDENT) -> Iterator[str]:
+    """Yield the encoded document with ``ITEMS`` replaced by ``items``."""
+    head, padding, tail = layout(document, indent)
+    yield from assemble(head, padding, tail, (encode_item(item, padding, indent) for item in items))
+
+
+def read_items(path: Path, head: str, padding: str, indent: int = INDENT) -> Iterator[str]:
+    """Yield the items of a file written by ``encode``, as ``encode_item`` returns them.
+
+    Items are copied as text, without decoding them. Only the number of
+    lines of ``head`` is used, so other values before the list, such as a
+    date, may differ. Raises ``ValueError`` if the file has another layout.
+    """
+    start = padding + " " * indent + "{\n"
+    end = padding + " " * indent + "}"
+    with path.open(encoding="utf-8") as lines:
+        for _ in range(head.count("\n")):
+            if not next(lines, ""):
+                raise ValueError(f"{path} no tiene el formato esperado")
+        opening = next(lines, "")
+        if not opening.endswith("[\n"):
+            if "[]" in opening:
+                return
+            raise ValueError(f"{path} no tiene el formato esperado")
+        item: list[str] = []
+        for line in lines:
+            if item:
+                if line.startswith(end):
+                    item.append(end)
+                    yield "".join(item)
+                    item = []
+                else:
+                    item.append(line)
+            elif line == start:
+                item.append(line)
+            elif line.startswith(padding + "]"):
+                return
+            else:
+                raise ValueError(f"{path} no tiene el formato esperado")
+    raise ValueError(f"{path} está incompleto")
+
+
+def file_digest(path: Path) -> bytes | None:
+    try:
+        with path.open("rb") as existing:
+            return hashlib.file_digest(existing, "sha256").digest()
+    except FileNotFoundError:
+        return None
+
+
+def write_if_changed(path: Path, chunks: Iterable[str], mode: int = 0o644) -> bool:
+    """Stream ``chunks`` to a temporary file and keep it only if it differs.
+
+    The new content is hashed while it is written and compared with the
+    hash of the existing file, which is read in blocks. Unchanged files keep
+    their modification time and their ``.gz``/``.br`` siblings.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f".{path.name}.tmp")
+    digest = hashlib.sha256()
+    try:
+        with temporary.open("wb") as output:
+            for chunk in chunks:
+                data = chunk.encode("utf-8")
+                digest.update(data)
+                output.write(data)
+        if digest.digest() == file_digest(path):
+            temporary.unlink()
+            precompress.ensure_siblings(path, mode)
+            return False
+        start = time.perf_counter()
+        temporary.chmod(mode)
+        temporary.replace(path)
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+    precompress.compress_file(path, mode)
+    metrics.add_time("write", time.perf_counter() - start)
+    metrics.increment("files_written")
+    return True
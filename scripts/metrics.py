@@ -0,0 +1,196 @@
+"""Per-stage timings and counters shared by the maintenance scripts.
+
+Stages and counters are always recorded in memory, which costs a dictionary
+update. When a script wrapped in ``run()`` finishes they are exported to
+the destinations that are configured:
+
+- ``FOTOS_METRICS_DIR``: the textfile collector directory of
+  node-exporter. Each job replaces ``fotos_<job>.prom`` with the values of
+  its last run.
+- ``FOTOS_METRICS_LOG``: a file that receives one JSON line per stage and a
+  summary line per run. ``-`` writes the lines to stderr.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterator
+
+
+METRICS_DIR_ENV = "FOTOS_METRICS_DIR"
+METRICS_LOG_ENV = "FOTOS_METRICS_LOG"
+PREFIX = "fotos"
+NAME_RE = re.compile(r"[^a-zA-Z0-9_]")
+
+_job: str | None = None
+# stage -> [calls, seconds, longest single measurement]
+_stages: dict[str, list[float]] = {}
+_counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+# Called as hook(stage, seconds) when a stage() block ends; used by profiling.
+stage_hooks: list[Callable[[str, float], None]] = []
+
+
+def add_time(name: str, seconds: float, calls: int = 1) -> None:
+    """Accumulate time measured by the caller, without logging a line."""
+    entry = _stages.get(name)
+    if entry is None:
+        _stages[name] = [calls, seconds, seconds]
+    else:
+        entry[0] += calls
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        add_time(name, seconds)
+        log_event({"event": "stage", "stage": name, "seconds": round(seconds, 6)})
+        for hook in stage_hooks:
+            hook(name, seconds)
+
+
+def increment(name: str, value: float = 1, **labels: object) -> None:
+    key = (name, tuple(sorted((label, str(text)) for label, text in labels.items())))
+    _counters[key] = _counters.get(key, 0) + value
+
+
+def snapshot() -> tuple[dict, dict]:
+    """Picklable copy of the recorded values, for worker processes."""
+    return {name: list(entry) for name, entry in _stages.items()}, dict(_counters)
+
+
+def merge(values: tuple[dict, dict]) -> None:
+    stages, counters = values
+    for name, (calls, seconds, longest) in stages.items():
+        add_time(name, seconds, int(calls))
+        _stages[name][2] = max(_stages[name][2], longest)
+    for key, value in counters.items():
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def reset() -> None:
+    _stages.clear()
+    _counters.clear()
+
+
+def log_event(fields: dict) -> None:
+    destination = os.environ.get(METRICS_LOG_ENV)
+    if not destination:
+        return
+    line = json.dumps(
+        {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), "job": _job, **fields},
+        ensure_ascii=False,
+    )
+    if destination == "-":
+        print(line, file=sys.stderr)
+        return
+    with open(destination, "a", encoding="utf-8") as log:
+        log.write(line + "\n")
+
+
+def label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def labels_text(labels: dict[str, str]) -> str:
+    return "{" + ",".join(f'{name}="{label_value(value)}"' for name, value in labels.items()) + "}"
+
+
+def sample_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def textfile(job: str, seconds: float, success: bool, finished_at: float) -> str:
+    """Render the last run in the Prometheus text exposition format."""
+    lines: list[str] = []
+
+    def metric(name: str, help_text: str, samples: list[tuple[dict[str, str], float]]) -> None:
+        lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {PREFIX}_{name} gauge")
+        for labels, value in samples:
+            lines.append(f"{PREFIX}_{name}{labels_text({'job': job, **labels})} {sample_value(value)}")
+
+    metric("run_duration_seconds", "Duración de la última ejecución.", [({}, seconds)])
+    metric("run_success", "1 si la última ejecución terminó sin errores.", [({}, int(success))])
+    metric("run_timestamp_seconds", "Hora Unix del final de la última ejecución.", [({}, finished_at)])
+    stages = sorted(_stages.items())
+    metric("stage_seconds", "Tiempo acumulado por etapa en la última ejecución.",
+           [({"stage": name}, entry[1]) for name, entry in stages])
+    metric("stage_calls", "Veces que se midió cada etapa en la última ejecución.",
+           [({"stage": name}, entry[0]) for name, entry in stages])
+    metric("stage_max_seconds", "Mayor duración registrada de una vez para cada etapa.",
+           [({"stage": name}, entry[2]) for name, entry in stages])
+
+    by_name: dict[str, list[tuple[dict[str, str], float]]] = {}
+    for (name, labels), value in sorted(_counters.items()):
+        by_name.setdefault(NAME_RE.sub("_", name), []).append((dict(labels), value))
+    for name, samples in by_name.items():
+        metric(name, f"Contador {name} de la última ejecución.", samples)
+    return "\n".join(lines) + "\n"
+
+
+def export(job: str, seconds: float, success: bool) -> None:
+    finished_at = time.time()
+    log_event({
+        "event": "run",
+        "status": "ok" if success else "error",
+        "seconds": round(seconds, 6),
+        "stages": {
+            name: {"calls": entry[0], "seconds": round(entry[1], 6), "max_seconds": round(entry[2], 6)}
+            for name, entry in sorted(_stages.items())
+        },
+        "counters": [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(_counters.items())
+        ],
+    })
+    directory = os.environ.get(METRICS_DIR_ENV)
+    if directory:
+        # node-exporter may read at any moment, so the file is replaced atomically.
+        path = Path(directory) / f"{PREFIX}_{NAME_RE.sub('_', job)}.prom"
+        temporary = path.with_name(f".{path.name}.tmp")
+        temporary.write_text(textfile(job, seconds, success, finished_at), encoding="utf-8")
+        temporary.chmod(0o644)
+        temporary.replace(path)
+
+
+@contextmanager
+def run(job: str) -> Iterator[None]:
+    """Record a script run and export its metrics when it ends.
+
+    Nested calls, such as a script that runs another in-process, are
+    recorded as part of the outer run.
+    """
+    global _job
+    if _job is not None:
+        yield
+        return
+    reset()
+    _job = job
+    start = time.perf_counter()
+    success = False
+    try:
+        yield
+        success = True
+    except SystemExit as error:
+        success = error.code in (None, 0)
+        raise
+    finally:
+        try:
+            export(job, time.perf_counter() - start, success)
+        except OSError as error:
+            print(f"No se pudieron exportar las métricas: {error}", file=sys.stderr)
+        finally:
+            _job = None
@@ -3,10 +3,14 @@
 
 import argparse
 import sqlite3
-import subprocess
 import sys
 from pathlib import Path
 
+import change_log
+import metrics
+import profiling
+import publish
+
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 
@@ -25,6 +29,13 @@ def get_photo(connection, photo_id):
     ).fetchone()
 
 
+def change_log_position(db_path):
+    """Posición del registro de cambios antes de moderar, para ``republish()``."""
+    with sqlite3.connect(db_path) as connection:
+        change_log.install(connection)
+        return change_log.head(connection)
+
+
 def set_appropriateness(db_path, photo_id, is_appropriate):
     """Actualiza la decisión de moderación y devuelve la foto afectada."""
     with sqlite3.connect(db_path) as connection:
@@ -39,14 +50,26 @@ def set_appropriateness(db_path, photo_id, is_appropriate):
         return photo
 
 
-def regenerate_public_files(project_root):
-    """Actualiza los recursos que solo muestran fotos aptas."""
-    commands = (
-        (project_root / "scripts" / "feed-rss.py",),
-        (project_root / "scripts" / "update-ai-tags.py",),
-    )
-    for (script,) in commands:
-        subprocess.run((sys.executable, str(script)), cwd=project_root, check=True)
+def regenerate_public_files(project_root, photo_id=None, since=None):
+    """Actualiza los recursos que solo muestran fotos aptas.
+
+    Con ``photo_id`` y la posición ``since`` del registro de cambios anterior
+    a la moderación, solo se reescriben los archivos que muestran esa foto.
+    Devuelve False si otra generación está en curso; se le pide entonces una
+    publicación completa, que incluye los cachés de etiquetas, al terminar.
+    Si ya no llega a verla, la hará la siguiente ejecución de ``feed-rss.py``
+    o de ``publish.py``.
+    """
+    with publish.generation_lock(project_root) as acquired:
+        if not acquired:
+            publish.request_publish(project_root)
+            return False
+        with metrics.stage("regenerate"):
+            if photo_id is None:
+                publish.publish(project_root)
+            else:
+                publish.republish(project_root, photo_id, since)
+    return True
 
 
 def status_label(is_appropriate):
@@ -64,6 +87,7 @@ def main():
     parser.add_argument(
         "--force", "-f", action="store_true", help="Aplicar sin pedir confirmación"
     )
+    profiling.add_arguments(parser)
     args = parser.parse_args()
 
     db_path = PROJECT_ROOT / "fotos.db"
@@ -95,19 +119,25 @@ def main():
             print("Operación cancelada.")
             return
 
-    set_appropriateness(db_path, args.photo_id, desired_status)
     try:
-        regenerate_public_files(PROJECT_ROOT)
-    except subprocess.CalledProcessError as error:
+        with profiling.session("moderar_foto", args):
+            since = change_log_position(db_path)
+            set_appropriateness(db_path, args.photo_id, desired_status)
+            regenerated = regenerate_public_files(PROJECT_ROOT, args.photo_id, since)
+    except Exception as error:
         print(
             "El estado se actualizó, pero no se pudieron regenerar todos los archivos públicos. "
-            f"Ejecuta los scripts de regeneración manualmente. ({error})",
+            f"Ejecuta scripts/publish.py manualmente. ({error})",
             file=sys.stderr,
         )
         raise SystemExit(1)
 
-    print("Moderación actualizada y archivos públicos regenerados.")
+    if regenerated:
+        print("Moderación actualizada y archivos públicos regenerados.")
+    else:
+        print("Moderación actualizada; la generación en curso, o la siguiente, publicará el cambio.")
 
 
 if __name__ == "__main__":
-    main()
+    with metrics.run("moderar_foto"):
+        main()
@@ -0,0 +1,126 @@
+"""SQLite manifest of the generated ``/f/{id}/`` pages and sitemap shards."""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Iterable
+
+
+class PageManifest:
+    """Indexed sidecar mapping each photo page to the signature it was built from.
+
+    A full build registers every public id in a temporary ``seen`` table, so
+    pages to remove are a set difference computed by SQLite instead of a
+    directory listing held in memory.
+    """
+
+    def __init__(self, path: Path, pages_dir: Path, legacy_path: Path | None = None):
+        self.path = Path(path)
+        self.created = not self.path.exists()
+        self.connection = sqlite3.connect(self.path)
+        if self.created:
+            self.path.chmod(0o600)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                photo_id TEXT PRIMARY KEY,
+                signature TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS sitemap_shards (
+                name TEXT PRIMARY KEY,
+                digest TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TEMP TABLE IF NOT EXISTS seen (photo_id TEXT PRIMARY KEY) WITHOUT ROWID;
+            """
+        )
+        if self.created:
+            self.adopt(pages_dir, legacy_path)
+
+    def adopt(self, pages_dir: Path, legacy_path: Path | None) -> None:
+        """Import the old JSON manifest and register pages it did not know about."""
+        pages: dict[str, str] = {}
+        if legacy_path is not None:
+            try:
+                data = json.loads(legacy_path.read_text(encoding="utf-8")).get("pages", {})
+                pages.update(data if isinstance(data, dict) else {})
+            except (FileNotFoundError, json.JSONDecodeError, OSError, AttributeError):
+                pass
+        if pages_dir.is_dir():
+            for directory in pages_dir.iterdir():
+                if directory.is_dir():
+                    pages.setdefault(directory.name, "")
+        self.update(pages.items())
+        if legacy_path is not None:
+            legacy_path.unlink(missing_ok=True)
+
+    def signatures(self, photo_ids: list[str]) -> dict[str, str]:
+        return dict(self.connection.execute(
+            """
+            SELECT photo_id, signature FROM pages
+            WHERE photo_id IN (SELECT value FROM json_each(?))
+            """,
+            (json.dumps(photo_ids),),
+        ))
+
+    def update(self, entries: Iterable[tuple[str, str]]) -> None:
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO pages (photo_id, signature) VALUES (?, ?)",
+                entries,
+            )
+
+    def remove(self, photo_ids: list[str]) -> None:
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM pages WHERE photo_id = ?",
+                ((photo_id,) for photo_id in photo_ids),
+            )
+
+    def begin_full_build(self) -> None:
+        with self.connection:
+            self.connection.execute("DELETE FROM seen")
+
+    def mark_seen(self, photo_ids: list[str]) -> None:
+        """Record ids found by a full build; raises if one was already seen."""
+        try:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO seen (photo_id) VALUES (?)",
+                    ((photo_id,) for photo_id in photo_ids),
+                )
+        except sqlite3.IntegrityError:
+            raise RuntimeError("Hay identificadores públicos de foto duplicados") from None
+
+    def unseen(self) -> list[str]:
+        return [photo_id for (photo_id,) in self.connection.execute(
+            """
+            SELECT photo_id FROM pages
+            WHERE photo_id NOT IN (SELECT photo_id FROM seen)
+            ORDER BY photo_id
+            """
+        )]
+
+    def shard_digests(self) -> dict[str, str]:
+        return dict(self.connection.execute("SELECT name, digest FROM sitemap_shards"))
+
+    def replace_shard_digests(self, digests: dict[str, str]) -> None:
+        with self.connection:
+            self.connection.execute("DELETE FROM sitemap_shards")
+            self.connection.executemany(
+                "INSERT INTO sitemap_shards (name, digest) VALUES (?, ?)",
+                digests.items(),
+            )
+
+    def count(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "PageManifest":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
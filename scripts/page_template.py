@@ -0,0 +1,45 @@
+"""HTML templates split once into literal parts and replaceable slots."""
+
+from __future__ import annotations
+
+import re
+
+
+class PageTemplate:
+    """A template scanned once and rendered by joining its parts.
+
+    ``slots`` maps each slot name to the pattern whose first match it
+    replaces. Rendering is equivalent to substituting each match with
+    ``count=1``, without scanning the template again for every page, except
+    that values are inserted literally. ``re.sub`` expanded the backslash
+    escapes of its replacement: ``\\n`` in a description became a line
+    break, ``\\\\`` a single backslash, and an unknown escape such as ``\\d``
+    made the build fail.
+    """
+
+    def __init__(self, text: str, slots: dict[str, re.Pattern[str]]):
+        matches = []
+        for name, pattern in slots.items():
+            match = pattern.search(text)
+            if match is None:
+                raise ValueError(f"No se encontró el hueco {name!r} en la plantilla")
+            matches.append((match.start(), match.end(), name))
+        matches.sort()
+
+        self.parts: list[str] = []
+        self.slots: list[str] = []
+        position = 0
+        for start, end, name in matches:
+            if start < position:
+                raise ValueError(f"El hueco {name!r} se solapa con otro")
+            self.parts.append(text[position:start])
+            self.slots.append(name)
+            position = end
+        self.parts.append(text[position:])
+
+    def render(self, **values: str) -> str:
+        pieces = [self.parts[0]]
+        for name, part in zip(self.slots, self.parts[1:]):
+            pieces.append(values[name])
+            pieces.append(part)
+        return "".join(pieces)
@@ -0,0 +1,168 @@
+"""Precompressed ``.gz`` and ``.br`` siblings for generated files.
+
+Web servers such as nginx (``gzip_static`` / ``brotli_static``) send these
+files as they are, instead of compressing the same bytes on every request.
+Brotli siblings are only written when the optional ``brotli`` package is
+installed.
+"""
+
+from __future__ import annotations
+
+import gzip
+import os
+from contextlib import ExitStack
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the installation
+    brotli = None
+
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+# Maximum quality is too slow for files such as data.json.
+LARGE_BROTLI_QUALITY = 9
+# Files at least this large are compressed by the worker pool.
+POOL_THRESHOLD = 256 * 1024
+POOL_WORKERS = 2
+READ_CHUNK = 1024 * 1024
+
+_executor: ThreadPoolExecutor | None = None
+_pending: list[Future] = []
+
+
+def sibling_suffixes() -> tuple[str, ...]:
+    return (".gz", ".br") if brotli is not None else (".gz",)
+
+
+def sibling_paths(path: Path) -> list[Path]:
+    return [path.with_name(path.name + suffix) for suffix in sibling_suffixes()]
+
+
+def _write_sibling(path: Path, data: bytes, mode: int, source_mtime_ns: int | None) -> None:
+    temporary = path.with_name(f".{path.name}.tmp")
+    temporary.write_bytes(data)
+    temporary.chmod(mode)
+    if source_mtime_ns is not None:
+        os.utime(temporary, ns=(source_mtime_ns, source_mtime_ns))
+    temporary.replace(path)
+
+
+def _compress(path: Path, data: bytes, mode: int) -> None:
+    try:
+        source_mtime_ns = path.stat().st_mtime_ns
+    except OSError:
+        source_mtime_ns = None
+    # mtime=0 keeps the gzip bytes stable for identical sources.
+    _write_sibling(
+        path.with_name(path.name + ".gz"),
+        gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0),
+        mode,
+        source_mtime_ns,
+    )
+    if brotli is not None:
+        quality = LARGE_BROTLI_QUALITY if len(data) >= POOL_THRESHOLD else BROTLI_QUALITY
+        _write_sibling(
+            path.with_name(path.name + ".br"),
+            brotli.compress(data, mode=brotli.MODE_TEXT, quality=quality),
+            mode,
+            source_mtime_ns,
+        )
+
+
+def write_siblings(path: Path, data: bytes, mode: int = 0o644) -> None:
+    """Compress ``data``, the current bytes of ``path``, next to it.
+
+    Large files are handed to a thread pool, since zlib and brotli release
+    the GIL; call ``drain()`` before the process exits.
+    """
+    global _executor
+    if len(data) < POOL_THRESHOLD:
+        _compress(path, data, mode)
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=POOL_WORKERS)
+    _pending.append(_executor.submit(_compress, path, data, mode))
+
+
+def _compress_stream(path: Path, mode: int) -> None:
+    """Like ``_compress``, reading ``path`` in chunks instead of all at once."""
+    source_mtime_ns = path.stat().st_mtime_ns
+    compressor = (
+        brotli.Compressor(mode=brotli.MODE_TEXT, quality=LARGE_BROTLI_QUALITY)
+        if brotli is not None else None
+    )
+    targets = sibling_paths(path)
+    temporaries = [target.with_name(f".{target.name}.tmp") for target in targets]
+    with ExitStack() as stack:
+        source = stack.enter_context(path.open("rb"))
+        gzip_output = stack.enter_context(gzip.GzipFile(
+            filename="",
+            mode="wb",
+            fileobj=stack.enter_context(temporaries[0].open("wb")),
+            compresslevel=GZIP_LEVEL,
+            mtime=0,
+        ))
+        brotli_output = stack.enter_context(temporaries[1].open("wb")) if compressor else None
+        while block := source.read(READ_CHUNK):
+            gzip_output.write(block)
+            if compressor is not None:
+                brotli_output.write(compressor.process(block))
+        if compressor is not None:
+            brotli_output.write(compressor.finish())
+    for temporary, target in zip(temporaries, targets):
+        temporary.chmod(mode)
+        os.utime(temporary, ns=(source_mtime_ns, source_mtime_ns))
+        temporary.replace(target)
+
+
+def compress_file(path: Path, mode: int = 0o644) -> None:
+    """Compress an existing file; large ones are streamed by the pool."""
+    global _executor
+    if path.stat().st_size < POOL_THRESHOLD:
+        _compress(path, path.read_bytes(), mode)
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=POOL_WORKERS)
+    _pending.append(_executor.submit(_compress_stream, path, mode))
+
+
+def ensure_siblings(path: Path, mode: int = 0o644) -> None:
+    """Compress an unchanged file again if any sibling is missing or stale.
+
+    Siblings carry the mtime of the source they were made from, so one
+    left behind by an interrupted run no longer matches.
+    """
+    source_mtime_ns = path.stat().st_mtime_ns
+    for sibling in sibling_paths(path):
+        try:
+            if sibling.stat().st_mtime_ns == source_mtime_ns:
+                continue
+        except FileNotFoundError:
+            pass
+        compress_file(path, mode)
+        return
+
+
+def remove_siblings(path: Path) -> None:
+    for suffix in (".gz", ".br"):
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+
+def reset() -> None:
+    """Forget the pool in a forked process, where its threads do not exist."""
+    global _executor
+    _executor = None
+    _pending.clear()
+
+
+def drain() -> None:
+    """Wait for the pending compressions and re-raise the first failure."""
+    pending = list(_pending)
+    _pending.clear()
+    errors = [future.exception() for future in pending]
+    for error in errors:
+        if error is not None:
+            raise error
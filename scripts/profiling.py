@@ -0,0 +1,147 @@
+"""Opt-in profiling shared by the maintenance scripts.
+
+``--profile`` writes a cProfile ``.pstats`` file and a ``.collapsed`` file
+of sampled stacks, ready for ``flamegraph.pl`` or speedscope.
+``--trace-memory`` starts ``tracemalloc`` and appends the top allocations to
+a ``.memory.txt`` file at the end of every ``metrics.stage()`` and at the end
+of the run. Files are written to ``.profiles/`` in the project root, or to
+``--profile-dir``, named after the script and the start time.
+"""
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+import metrics
+
+
+PROFILE_DIR = Path(__file__).resolve().parent.parent / ".profiles"
+SAMPLE_INTERVAL = 0.005
+TRACE_FRAMES = 25
+TOP_ALLOCATIONS = 20
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("perfilado")
+    group.add_argument("--profile", action="store_true",
+                       help="guarda un perfil de cProfile y pilas muestreadas para flamegraphs")
+    group.add_argument("--trace-memory", action="store_true",
+                       help="guarda las mayores asignaciones de memoria al final de cada etapa")
+    group.add_argument("--profile-dir", type=Path, metavar="DIR",
+                       help=f"directorio de salida (por defecto, {PROFILE_DIR.name}/ en la raíz del proyecto)")
+
+
+class StackSampler:
+    """Sample the stack of one thread from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if frames:
+                self.counts[";".join(reversed(frames))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: Path) -> None:
+        """Write ``frame;frame;frame count`` lines, the collapsed-stack format."""
+        with path.open("w", encoding="utf-8") as output:
+            for stack, count in sorted(self.counts.items()):
+                output.write(f"{stack} {count}\n")
+
+
+class MemoryTracer:
+    def __init__(self, path: Path):
+        self.path = path
+        self.started = time.perf_counter()
+
+    def snapshot(self, label: str) -> None:
+        current, peak = tracemalloc.get_traced_memory()
+        statistics = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        )).statistics("lineno")
+        with self.path.open("a", encoding="utf-8") as output:
+            output.write(
+                f"== {label} (+{time.perf_counter() - self.started:.3f} s): "
+                f"actual {current / 1048576:.1f} MiB, pico {peak / 1048576:.1f} MiB ==\n"
+            )
+            for statistic in statistics[:TOP_ALLOCATIONS]:
+                output.write(f"{statistic}\n")
+            output.write("\n")
+
+    def stage_ended(self, name: str, seconds: float) -> None:
+        self.snapshot(f"etapa {name}")
+
+
+@contextmanager
+def session(name: str, args: argparse.Namespace) -> Iterator[None]:
+    """Profile the block when the script was run with the profiling options."""
+    profile = getattr(args, "profile", False)
+    trace_memory = getattr(args, "trace_memory", False)
+    if not profile and not trace_memory:
+        yield
+        return
+
+    directory = Path(getattr(args, "profile_dir", None) or PROFILE_DIR)
+    directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+    prefix = directory / f"{name}-{datetime.now():%Y%m%d-%H%M%S}"
+    written: list[Path] = []
+
+    tracer = None
+    if trace_memory:
+        tracemalloc.start(TRACE_FRAMES)
+        tracer = MemoryTracer(prefix.with_name(prefix.name + ".memory.txt"))
+        metrics.stage_hooks.append(tracer.stage_ended)
+    profiler = sampler = None
+    if profile:
+        sampler = StackSampler(threading.get_ident())
+        sampler.start()
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None and sampler is not None:
+            profiler.disable()
+            sampler.stop()
+            pstats_path = prefix.with_name(prefix.name + ".pstats")
+            collapsed_path = prefix.with_name(prefix.name + ".collapsed")
+            profiler.dump_stats(pstats_path)
+            sampler.write(collapsed_path)
+            written += [pstats_path, collapsed_path]
+        if tracer is not None:
+            tracer.snapshot("final")
+            metrics.stage_hooks.remove(tracer.stage_ended)
+            tracemalloc.stop()
+            written.append(tracer.path)
+        for path in written:
+            path.chmod(0o600)
+            print(f"Perfil guardado en {path}", file=sys.stderr)
@@ -0,0 +1,140 @@
+"""``fotos-public.db``: the part of fotos.db that the web client reads.
+
+The gallery downloads the whole database before running its first query,
+so the copy published for it only keeps the public photos (no analysis,
+or an approved one) and the columns the JS uses. Moderation details,
+rejected photos, the derived tables of the generators and their indexes
+stay in fotos.db. Table and column names are unchanged, so the queries in
+``database-manager.js``, ``populares.js``, ``miradas.js`` and
+``editorial-promo.js`` run as they are on either file.
+
+Each related table is keyed by ``image_id``, which becomes its rowid, so
+the joins on ``i.id`` are rowid lookups. The popularity score the JS
+orders by, ``like_count + comment_count * 2 + repost_count``, is
+precomputed in an expression index, so the popular photos are read in
+order instead of being sorted.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+
+import metrics
+import precompress
+from snapshot import PUBLIC_PHOTOS
+
+
+NAME = "fotos-public.db"
+
+# (table, key, columns): the key becomes the rowid. Only the tables and
+# columns that fotos.db has are copied.
+TABLES = (
+    ("imagenes", "id", (
+        "path TEXT NOT NULL", "date DATETIME NOT NULL", "author TEXT", "description TEXT",
+    )),
+    ("image_analysis", "image_id", (
+        "description TEXT NOT NULL", "tags TEXT", "is_appropriate BOOLEAN NOT NULL",
+    )),
+    ("bluesky_posts", "image_id", ("post_id TEXT NOT NULL",)),
+    ("bluesky_interactions_cache", "image_id", (
+        "like_count INTEGER DEFAULT 0", "comment_count INTEGER DEFAULT 0",
+        "repost_count INTEGER DEFAULT 0", "last_updated DATETIME",
+    )),
+)
+
+# Match the client's queries: the gallery and miradas order by date, the
+# Bluesky lookups go by path and populares and the editorial promo by score.
+INDEXES = {
+    "imagenes": """
+        CREATE INDEX public.imagenes_date ON imagenes (date DESC);
+        CREATE INDEX public.imagenes_path ON imagenes (path);
+    """,
+    "bluesky_interactions_cache": """
+        CREATE INDEX public.bluesky_interactions_cache_popularity ON bluesky_interactions_cache (
+            (like_count + comment_count * 2 + repost_count) DESC, like_count DESC
+        );
+    """,
+}
+
+# With ``clustered``, photos are stored in date order, the gallery's order,
+# and found by id through an index instead.
+CLUSTERED_INDEXES = """
+    CREATE UNIQUE INDEX public.imagenes_id ON imagenes (id);
+    CREATE INDEX public.imagenes_path ON imagenes (path);
+"""
+
+
+def copy_script(connection: sqlite3.Connection, clustered: bool = False) -> str:
+    """SQL that creates, fills and indexes the public tables."""
+    script = []
+    for table, key, declarations in TABLES:
+        present = {row[1] for row in connection.execute(f"PRAGMA main.table_info({table})")}
+        if key not in present:
+            continue
+        clustered_table = clustered and table == "imagenes"
+        declarations = [f"{key} INTEGER NOT NULL" if clustered_table else f"{key} INTEGER PRIMARY KEY"] + [
+            declaration for declaration in declarations if declaration.split()[0] in present
+        ]
+        names = [declaration.split()[0] for declaration in declarations]
+        columns = ", ".join(names)
+        if clustered_table:
+            script.append(
+                f"CREATE TABLE public.imagenes ({', '.join(declarations)}, PRIMARY KEY (date, id)) WITHOUT ROWID;"
+            )
+        else:
+            script.append(f"CREATE TABLE public.{table} ({', '.join(declarations)});")
+        if table == "imagenes":
+            selected = ", ".join(f"i.{name}" for name in names)
+            order = "i.date, i.id" if clustered_table else "i.id"
+            script.append(
+                f"INSERT INTO public.imagenes ({columns}) SELECT {selected} {PUBLIC_PHOTOS} ORDER BY {order};"
+            )
+        else:
+            script.append(
+                f"INSERT INTO public.{table} ({columns}) SELECT {columns} FROM main.{table}"
+                f" WHERE {key} IN (SELECT id FROM public.imagenes) ORDER BY {key};"
+            )
+        script.append(CLUSTERED_INDEXES if clustered_table else INDEXES.get(table, ""))
+    return "\n".join(script)
+
+
+def build(source: Path, target: Path, page_size: int | None = None, clustered: bool = False) -> None:
+    """Write the public copy of ``source`` to ``target``, replacing it."""
+    target.unlink(missing_ok=True)
+    connection = sqlite3.connect(f"file:{source}?mode=ro", uri=True, isolation_level=None)
+    try:
+        connection.execute("ATTACH DATABASE ? AS public", (str(target),))
+        if page_size:
+            connection.execute(f"PRAGMA public.page_size = {int(page_size)}")
+        connection.executescript(f"BEGIN; {copy_script(connection, clustered)} COMMIT;")
+        connection.execute("VACUUM public")
+    finally:
+        connection.close()
+
+
+def write_public_db(project_root: Path) -> tuple[int, int, bool]:
+    """Rebuild ``fotos-public.db`` and replace it only if its bytes changed.
+
+    Returns its size, the size of fotos.db and whether the file changed.
+    """
+    project_root = Path(project_root)
+    source = project_root / "fotos.db"
+    target = project_root / NAME
+    temporary = target.with_name(f".{NAME}.tmp")
+    with metrics.stage("public_db"):
+        build(source, temporary)
+        data = temporary.read_bytes()
+        try:
+            changed = target.read_bytes() != data
+        except FileNotFoundError:
+            changed = True
+        if changed:
+            temporary.chmod(0o644)
+            temporary.replace(target)
+            precompress.compress_file(target)
+        else:
+            temporary.unlink()
+            precompress.ensure_siblings(target)
+        precompress.drain()
+    return len(data), source.stat().st_size, changed
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""Regenerate every public file from one snapshot of fotos.db.
+
+The feed, the JSON API, the change feed, the photo pages and the sitemap
+are written in this process from the same ``Snapshot``: a copy of the
+public photos made in one read transaction, so they all show the library
+as of the position of the change log they mark as published. The
+editorial collections follow from their own configuration; both tag
+caches, the search index and ``fotos-public.db`` are read from the tables
+the triggers keep in fotos.db.
+
+``republish()`` is the targeted variant for a moderation decision on a
+single photo: it only rewrites the files that show that photo.
+"""
+
+from __future__ import annotations
+
+import argparse
+import fcntl
+import hashlib
+import importlib.util
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from types import ModuleType
+from typing import Iterator
+
+import change_log
+import metrics
+import precompress
+import profiling
+import public_db
+import range_layout
+from generate_photo_pages import load_template, page_signature, republish_photo_page, sitemap_signature
+from snapshot import Snapshot
+
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+# Shared with feed-rss.py, which writes the same files.
+LOCK_NAME = ".feed-rss.lock"
+# Left by a run that found the lock busy; the next publish() takes it.
+REQUEST_NAME = ".publish-request"
+TAG_CACHES = ("tags-cache.json", "ai-tags-cache.json")
+TAG_DIRECTORIES = ("tags", "ai-tags", "autocomplete")
+# Generators whose files republish() brings up to date.
+REPUBLISHED = ("feed-rss", "photo-pages", "sitemap")
+
+_scripts: dict[str, ModuleType] = {}
+
+
+def load_script(name: str) -> ModuleType:
+    """Import a script whose file name is not a valid module name."""
+    if name not in _scripts:
+        spec = importlib.util.spec_from_file_location(
+            name.removesuffix(".py").replace("-", "_"), SCRIPTS_DIR / name
+        )
+        module = importlib.util.module_from_spec(spec)
+        assert spec.loader is not None
+        spec.loader.exec_module(module)
+        _scripts[name] = module
+    return _scripts[name]
+
+
+@contextmanager
+def generation_lock(project_root: Path, wait: bool = False) -> Iterator[bool]:
+    """Hold the generation lock; yields False if another run holds it."""
+    with (Path(project_root) / LOCK_NAME).open("a+", encoding="utf-8") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+
+
+def request_publish(project_root: Path) -> None:
+    """Ask for a full publish from whichever run holds the generation lock.
+
+    ``feed-rss.py`` only writes the feed and the pages, so a change that
+    also affects the tag caches would otherwise wait for the next full
+    publish.
+    """
+    (Path(project_root) / REQUEST_NAME).touch()
+
+
+def publish_requested(project_root: Path) -> bool:
+    return (Path(project_root) / REQUEST_NAME).is_file()
+
+
+def public_copies_signature(connection: sqlite3.Connection) -> str:
+    """What the public copies hold besides the rows the change log covers.
+
+    Interaction counts are refreshed without going through the change log,
+    so their number and newest ``last_updated`` are part of the signature,
+    as are the copied schema and the code that writes the copies.
+    """
+    try:
+        interactions = connection.execute(
+            "SELECT COUNT(*), MAX(last_updated) FROM bluesky_interactions_cache"
+        ).fetchone()
+    except sqlite3.OperationalError:
+        interactions = None
+    return hashlib.sha256(
+        repr(interactions).encode("utf-8")
+        + public_db.copy_script(connection).encode("utf-8")
+        + Path(public_db.__file__).read_bytes()
+        + Path(range_layout.__file__).read_bytes()
+        + "".join(precompress.sibling_suffixes()).encode("ascii")
+    ).hexdigest()
+
+
+def write_public_copies(project_root: Path, ranges: bool) -> None:
+    """Rebuild ``fotos-public.db`` and, with ``ranges``, its range layout.
+
+    Each one copies the whole of fotos.db, so it is only rebuilt when the
+    change log moved or ``public_copies_signature()`` changed since it was
+    last written, or when it is missing.
+    """
+    # Generator name: (file it writes, how the messages call it).
+    outputs = {"public-db": (project_root / public_db.NAME, public_db.NAME)}
+    if ranges:
+        outputs["range-layout"] = (
+            project_root / range_layout.DIRECTORY / range_layout.CONFIG_NAME, f"{range_layout.DIRECTORY}/"
+        )
+    db_path = project_root / "fotos.db"
+    with sqlite3.connect(db_path) as connection:
+        change_log.install(connection)
+        signature = public_copies_signature(connection)
+        states = {name: change_log.pending(connection, name) for name in outputs}
+
+    for name, (output, label) in outputs.items():
+        head, last_seq, stored = states[name]
+        if (last_seq, stored) == (head, signature) and output.is_file():
+            print(f"{label}: sin cambios")
+            continue
+        if name == "public-db":
+            size, full_size, changed = public_db.write_public_db(project_root)
+            print(
+                f"{public_db.NAME}: {size / 1024 / 1024:.2f} MB, "
+                f"{(full_size - size) / 1024 / 1024:.2f} MB menos que fotos.db"
+                + ("" if changed else " (sin cambios)")
+            )
+        else:
+            size, chunks, written = range_layout.write_layout(project_root)
+            print(f"{range_layout.DIRECTORY}/: {written} de {chunks} fragmentos actualizados")
+        # Rows committed after ``head`` may be in the copy already; the
+        # next run copies them again.
+        with sqlite3.connect(db_path) as connection:
+            change_log.mark(connection, name, head, signature)
+
+
+def publish(
+    project_root: Path | None = None,
+    jobs: int = 1,
+    legacy_json: bool = True,
+    warm=None,
+    snapshot: Snapshot | None = None,
+    ranges: bool | None = None,
+) -> Snapshot:
+    """Regenerate the public files and return the snapshot they were built from.
+
+    ``ranges`` also writes the range layout of ``range_layout``; by default
+    it is kept up to date only if it was already published.
+    """
+    project_root = Path(project_root) if project_root else SCRIPTS_DIR.parent
+    snapshot = snapshot or Snapshot(project_root / "fotos.db")
+    # Taken before anything is read, so the requested change is published.
+    requested = publish_requested(project_root)
+    (project_root / REQUEST_NAME).unlink(missing_ok=True)
+
+    # Also writes the photo pages, the sitemap and the editorial collections.
+    load_script("feed-rss.py").generate_rss(
+        project_root, jobs=jobs, legacy_json=legacy_json, warm=warm, snapshot=snapshot
+    )
+
+    # The feed only loads the snapshot when a photo changed, and the tag
+    # caches, their per-tag shards and the autocomplete index have nothing to
+    # update otherwise, unless a run that found the lock busy asked for them.
+    if (
+        snapshot.loaded
+        or requested
+        or not all((project_root / name).is_file() for name in TAG_CACHES)
+        or not all((project_root / name).is_dir() for name in TAG_DIRECTORIES)
+    ):
+        with metrics.stage("tags"):
+            load_script("update-tags.py").update_tags_cache(project_root)
+            load_script("update-ai-tags.py").update_ai_tags_cache(project_root)
+    else:
+        print("Cachés de etiquetas: sin cambios")
+
+    # Keeps its own queue of changed photos; an idle run reads one row.
+    with metrics.stage("search"):
+        load_script("update-search-index.py").update_search_index(project_root)
+
+    if ranges is None:
+        ranges = (project_root / range_layout.DIRECTORY / range_layout.CONFIG_NAME).is_file()
+    write_public_copies(project_root, ranges)
+    return snapshot
+
+
+def republish(project_root: Path | None, image_id: int, since: int) -> bool:
+    """Publish the change of one photo without rebuilding the whole library.
+
+    ``since`` is the change log position right before the caller changed
+    the photo. If every generator had published everything up to it and
+    the photo is the only one changed since, only the photo's page, the
+    sitemap shards, JSON pages and feed items from its position on, its
+    data.json entry, the change feed, the buckets of its tags in both
+    tag caches and the search terms of its text are updated, and
+    fotos-public.db and its range layout, if published, are rebuilt.
+    The photo must keep its date, as it does when it is approved or
+    rejected. Otherwise, or if a file is missing, this falls back to
+    ``publish()``. Returns True when the targeted update was used.
+    """
+    project_root = Path(project_root) if project_root else SCRIPTS_DIR.parent
+    db_path = project_root / "fotos.db"
+    snapshot = Snapshot(db_path, image_ids=[image_id])
+    with sqlite3.connect(db_path) as connection:
+        change_log.install(connection)
+        states = {name: change_log.pending(connection, name)[1:] for name in REPUBLISHED}
+        # The snapshot's head is the position its rows are consistent with.
+        changes = change_log.changes_since(connection, since, snapshot.head)
+
+    feed_rss = load_script("feed-rss.py")
+    signatures = {
+        "feed-rss": feed_rss.script_signature(),
+        "photo-pages": page_signature(load_template(project_root)[0]),
+        "sitemap": sitemap_signature(project_root),
+    }
+    photo = snapshot.requested(image_id)
+    paths = [path for _, path in changes if path]
+    targeted = (
+        photo is not None
+        and bool(paths)
+        and {changed_id for changed_id, _ in changes} == {image_id}
+        and all(states[name] == (since, signatures[name]) for name in REPUBLISHED)
+        and all((project_root / name).is_file() for name in TAG_CACHES)
+    )
+    if targeted:
+        try:
+            feed_rss.republish_photo(project_root, snapshot, image_id, paths[0])
+            republish_photo_page(project_root, snapshot, image_id, changes)
+            with metrics.stage("tags"):
+                load_script("update-tags.py").update_tag_buckets(project_root, photo.description)
+                load_script("update-ai-tags.py").update_tag_buckets(project_root, photo.ai_tags)
+            with metrics.stage("search"):
+                load_script("update-search-index.py").update_search_index(project_root)
+            write_public_copies(
+                project_root, (project_root / range_layout.DIRECTORY / range_layout.CONFIG_NAME).is_file()
+            )
+        except (ValueError, KeyError) as error:
+            print(f"No se pudo publicar solo la foto {image_id} ({error}); se publica todo.")
+            targeted = False
+    if not targeted:
+        # Keep the format the site already publishes.
+        publish(project_root, legacy_json=(project_root / "data.json").is_file())
+        return False
+
+    with sqlite3.connect(db_path) as connection:
+        for name in REPUBLISHED:
+            change_log.mark(connection, name, snapshot.head, signatures[name])
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        metavar="N",
+        help="procesos para regenerar las páginas estáticas (por defecto, 1)",
+    )
+    parser.add_argument(
+        "--legacy-json",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="genera también data.json con todas las fotos",
+    )
+    parser.add_argument(
+        "--ranges",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="genera fotos-public/ para leer la base de datos por rangos HTTP "
+        "(por defecto, solo si ya existe)",
+    )
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs debe ser 1 o mayor")
+
+    project_root = SCRIPTS_DIR.parent
+    with generation_lock(project_root) as acquired:
+        if not acquired:
+            print("Otra generación sigue activa; se omite esta ejecución.")
+            return
+        with metrics.run("publish"), profiling.session("publish", args):
+            publish(project_root, jobs=args.jobs, legacy_json=args.legacy_json, ranges=args.ranges)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Layout of the public database for clients that fetch it by ranges.
+
+Even ``fotos-public.db`` has to be downloaded in full before sql.js runs a
+query. An HTTP-range VFS in the browser (such as sql.js-httpvfs) instead
+reads only the pages a query touches. For it, ``write_layout()`` builds
+the same public copy with a tuned ``page_size``, the photos clustered in
+date order (a ``WITHOUT ROWID`` table keyed by ``(date, id)``, so the
+gallery's ``ORDER BY i.date DESC`` reads consecutive pages) and the covering
+indexes of ``public_db``, and splits it into ``CHUNK_SIZE`` files under
+``fotos-public/``:
+
+- ``db.0000``, ``db.0001``…: the database bytes, served as they are, since
+  range requests and ``Content-Encoding`` do not mix;
+- ``config.json``: the manifest in the format of sql.js-httpvfs's
+  ``"chunked"`` server mode, with the request size set to the page size.
+
+Chunks are only rewritten when their bytes change.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+import metrics
+import public_db
+from generate_photo_pages import write_text_if_changed
+
+
+DIRECTORY = "fotos-public"
+CONFIG_NAME = "config.json"
+CHUNK_PREFIX = "db."
+SUFFIX_LENGTH = 4
+# 1024 halves what a lookup fetches but quadruples the requests of the
+# gallery's scan; see benchmarks/range_requests.py.
+PAGE_SIZE = 4096
+CHUNK_SIZE = 1024 * 1024
+
+
+def chunk_name(number: int) -> str:
+    return f"{CHUNK_PREFIX}{number:0{SUFFIX_LENGTH}d}"
+
+
+def write_bytes_if_changed(path: Path, data: bytes) -> bool:
+    """Atomically write ``data`` unless the file already holds it."""
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    temporary = path.with_name(f".{path.name}.tmp")
+    temporary.write_bytes(data)
+    temporary.chmod(0o644)
+    temporary.replace(path)
+    metrics.increment("files_written")
+    return True
+
+
+def write_layout(
+    project_root: Path,
+    page_size: int = PAGE_SIZE,
+    chunk_size: int = CHUNK_SIZE,
+) -> tuple[int, int, int]:
+    """Build the range layout and write the chunks that changed.
+
+    Returns the database size, the number of chunks and how many of them
+    were written.
+    """
+    if chunk_size % page_size:
+        raise ValueError("El tamaño de fragmento debe ser múltiplo del tamaño de página")
+    project_root = Path(project_root)
+    directory = project_root / DIRECTORY
+    directory.mkdir(parents=True, exist_ok=True)
+    temporary = directory / ".database.tmp"
+    with metrics.stage("range_layout"):
+        try:
+            public_db.build(project_root / "fotos.db", temporary, page_size=page_size, clustered=True)
+            data = temporary.read_bytes()
+        finally:
+            temporary.unlink(missing_ok=True)
+
+        count = max(1, -(-len(data) // chunk_size))
+        written = sum(
+            write_bytes_if_changed(
+                directory / chunk_name(number), data[number * chunk_size:(number + 1) * chunk_size]
+            )
+            for number in range(count)
+        )
+        current = {chunk_name(number) for number in range(count)}
+        for entry in os.scandir(directory):
+            if entry.name.startswith(CHUNK_PREFIX) and entry.name not in current:
+                os.unlink(entry.path)
+
+        config = {
+            "serverMode": "chunked",
+            "requestChunkSize": page_size,
+            "databaseLengthBytes": len(data),
+            "serverChunkSize": chunk_size,
+            "urlPrefix": CHUNK_PREFIX,
+            "suffixLength": SUFFIX_LENGTH,
+        }
+        write_text_if_changed(directory / CONFIG_NAME, json.dumps(config, indent=2) + "\n", compress=False)
+    return len(data), count, written
@@ -14,11 +14,15 @@ import shutil
 import sqlite3
 import sys
 import time
+import urllib.error
 import urllib.parse
 import urllib.request
 from datetime import datetime
 from pathlib import Path
 
+import metrics
+import profiling
+
 
 ROOT = Path(__file__).resolve().parents[1]
 DATABASE = ROOT / "fotos.db"
@@ -65,8 +69,15 @@ def fetch_photo_posts() -> tuple[dict[str, str], list[str]]:
             f"{FEED_URL}?{urllib.parse.urlencode(params)}",
             headers={"User-Agent": "AldeaPucela-BlueSky-Reassign/1.0"},
         )
-        with urllib.request.urlopen(request, timeout=20) as response:
-            payload = json.load(response)
+        try:
+            with metrics.stage("bluesky_api"), urllib.request.urlopen(request, timeout=20) as response:
+                payload = json.load(response)
+        except urllib.error.HTTPError as error:
+            metrics.increment("http_errors", status=error.code)
+            raise
+        except urllib.error.URLError as error:
+            metrics.increment("http_errors", status=type(error.reason).__name__)
+            raise
         for entry in payload.get("feed", []):
             post_id = entry.get("post", {}).get("uri", "").rsplit("/", 1)[-1]
             photo_id = linked_photo_id(entry)
@@ -105,13 +116,15 @@ def proposed_changes(connection: sqlite3.Connection, mappings: dict[str, str]) -
 def main() -> int:
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("--apply", action="store_true", help="aplica los cambios propuestos a fotos.db")
+    profiling.add_arguments(parser)
     args = parser.parse_args()
     if not DATABASE.exists():
         print(f"No existe {DATABASE}", file=sys.stderr)
         return 1
 
     print(f"Consultando el feed público de @{ACTOR}…")
-    mappings, conflicts = fetch_photo_posts()
+    with profiling.session("reassign_bluesky_posts", args):
+        mappings, conflicts = fetch_photo_posts()
     connection = sqlite3.connect(DATABASE)
     try:
         changes = proposed_changes(connection, mappings)
@@ -149,4 +162,5 @@ def main() -> int:
 
 
 if __name__ == "__main__":
-    raise SystemExit(main())
+    with metrics.run("reassign_bluesky_posts"):
+        raise SystemExit(main())
@@ -0,0 +1,25 @@
+"""Checks on the tables, indexes and triggers the scripts keep in fotos.db."""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+
+
+def installed(connection: sqlite3.Connection, script: str) -> bool:
+    """Whether every object ``script`` creates exists, its triggers as written.
+
+    SQLite keeps the text of each ``CREATE TRIGGER`` in ``sqlite_master``
+    without ``IF NOT EXISTS`` and the final semicolon, so a trigger whose
+    definition changed no longer matches. Checking only reads the schema:
+    callers skip the write transaction, and the schema change that
+    invalidates every reader's prepared statements, when nothing changed.
+    """
+    existing = dict(connection.execute("SELECT name, sql FROM sqlite_master"))
+    for name in re.findall(r"CREATE (?:VIRTUAL TABLE|TABLE|INDEX) IF NOT EXISTS (\w+)", script):
+        if name not in existing:
+            return False
+    for name, body in re.findall(r"CREATE TRIGGER IF NOT EXISTS (\w+)(.*?\bEND);", script, re.DOTALL):
+        if existing.get(name) != f"CREATE TRIGGER {name}{body}":
+            return False
+    return True
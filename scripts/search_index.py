@@ -0,0 +1,244 @@
+"""Full-text search over the photos, and its static export under search/.
+
+``photo_search`` is an FTS5 table with the description, the AI description
+and the AI tags of every photo, its rowid being the photo id. The
+``unicode61`` tokenizer with ``remove_diacritics 2`` folds case and
+accents, so "Río", "rio" and "RÍO" are the same term. Triggers on
+``imagenes`` and ``image_analysis`` replace the row of every photo they
+touch and keep its previous text in ``photo_search_changes``.
+
+``write_index()`` exports one posting list per term, ``search/{term}.json``,
+with the public photos that contain it, newest first. A query is resolved
+by fetching the file of each of its terms and intersecting the lists. Only
+the terms of the photos changed since the last export are rewritten: the
+old and new texts of those photos are tokenised again in a temporary FTS5
+table to find them. Very common Spanish words are not exported; clients
+drop the ``stopwords`` listed in ``search/index.json`` from their queries.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+from pathlib import Path
+
+import precompress
+import schema
+from generate_photo_pages import write_text_if_changed
+from snapshot import PUBLIC_PHOTOS
+from tag_shards import shard_name
+
+
+DIRECTORY = "search"
+INDEX_NAME = "index.json"
+VERSION = 1
+TOKENIZER = "unicode61 remove_diacritics 2"
+
+# Folded like the tokenizer folds them.
+STOPWORDS = frozenset("""
+    a al algo algunas algunos ante antes como con contra cual cuando de del
+    desde donde durante e el ella ellas ellos en entre era es esa esas ese eso
+    esos esta estaba estan estas este esto estos fue ha hay hasta la las le les
+    lo los mas me mi muy nada ni no nos o os otra otras otro otros para pero poco
+    por porque que quien se sea ser si sin sobre son su sus tambien te tiene
+    todo todos tu u un una uno unos y ya yo
+""".split())
+
+SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS photo_search USING fts5(
+    description, ai_description, ai_tags, tokenize = '{TOKENIZER}'
+);
+CREATE TABLE IF NOT EXISTS photo_search_changes (
+    image_id INTEGER NOT NULL,
+    description TEXT,
+    ai_description TEXT,
+    ai_tags TEXT
+);
+"""
+
+# Rows of the photos selected by {where}.
+ROWS = """
+    SELECT i.id, i.description, ia.description, (
+        SELECT group_concat(tag.value, ' ')
+        FROM json_each(CASE WHEN json_valid(ia.tags) AND json_type(ia.tags) = 'array'
+                       THEN ia.tags ELSE '[]' END) AS tag
+    )
+    FROM imagenes i
+    LEFT JOIN image_analysis ia ON ia.image_id = i.id
+    WHERE {where}
+"""
+
+# Replace the row of photo {id}, keeping the old text, when {when} holds.
+REFRESH = f"""
+    INSERT INTO photo_search_changes (image_id, description, ai_description, ai_tags)
+    SELECT {{id}}, s.description, s.ai_description, s.ai_tags
+    FROM (SELECT 1) LEFT JOIN photo_search s ON s.rowid = {{id}}
+    WHERE {{when}};
+    DELETE FROM photo_search WHERE rowid = {{id}} AND {{when}};
+    INSERT INTO photo_search (rowid, description, ai_description, ai_tags)
+    {ROWS.format(where="i.id = {id} AND {when}")};
+"""
+
+
+def refresh(photo_id: str, when: str = "1") -> str:
+    return REFRESH.format(id=photo_id, when=when)
+
+
+TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS photo_search_imagenes_insert
+AFTER INSERT ON imagenes BEGIN {refresh("NEW.id")} END;
+CREATE TRIGGER IF NOT EXISTS photo_search_imagenes_update
+AFTER UPDATE OF id, path, date, description ON imagenes BEGIN
+    {refresh("OLD.id", "OLD.id IS NOT NEW.id")}
+    {refresh("NEW.id")}
+END;
+CREATE TRIGGER IF NOT EXISTS photo_search_imagenes_delete
+AFTER DELETE ON imagenes BEGIN {refresh("OLD.id")} END;
+CREATE TRIGGER IF NOT EXISTS photo_search_analysis_insert
+AFTER INSERT ON image_analysis BEGIN {refresh("NEW.image_id")} END;
+CREATE TRIGGER IF NOT EXISTS photo_search_analysis_update
+AFTER UPDATE OF image_id, description, tags, is_appropriate ON image_analysis BEGIN
+    {refresh("OLD.image_id", "OLD.image_id IS NOT NEW.image_id")}
+    {refresh("NEW.image_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS photo_search_analysis_delete
+AFTER DELETE ON image_analysis BEGIN {refresh("OLD.image_id")} END;
+"""
+
+# Recreated when their stored text differs, so a new definition replaces the old one.
+DROP_TRIGGERS = "".join(
+    f"DROP TRIGGER IF EXISTS {name};"
+    for name in re.findall(r"CREATE TRIGGER IF NOT EXISTS (\w+)", TRIGGERS)
+)
+
+POSTINGS = (
+    "SELECT i.path" + PUBLIC_PHOTOS
+    + " AND i.id IN (SELECT rowid FROM photo_search WHERE photo_search MATCH ?)"
+    + " ORDER BY COALESCE(i.date, '') DESC, i.id"
+)
+
+
+def install(connection: sqlite3.Connection) -> bool:
+    """Create the search table and its triggers; False without FTS5 or tables."""
+    tables = {
+        name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+    if not {"imagenes", "image_analysis"} <= tables:
+        return False
+    if schema.installed(connection, SCHEMA + TRIGGERS):
+        try:
+            connection.execute("SELECT 1 FROM photo_search LIMIT 0")
+        except sqlite3.OperationalError as error:
+            if "fts5" in str(error):
+                return False
+            raise
+        return True
+    created = "photo_search" not in tables
+    try:
+        connection.executescript(
+            "BEGIN IMMEDIATE;" + SCHEMA + DROP_TRIGGERS + TRIGGERS
+            + (f"INSERT INTO photo_search (rowid, description, ai_description, ai_tags) {ROWS.format(where='1')};"
+               if created else "")
+            + "COMMIT;"
+        )
+    except sqlite3.OperationalError as error:
+        connection.rollback()
+        if "fts5" in str(error):
+            return False
+        raise
+    return True
+
+
+def terms(connection: sqlite3.Connection, table: str) -> list[str]:
+    """Every term of an FTS5 table in the ``temp`` or ``main`` schema."""
+    schema, name = table.split(".")
+    connection.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS temp.{name}_vocab USING fts5vocab({schema}, {name}, row)"
+    )
+    try:
+        return [term for (term,) in connection.execute(f"SELECT term FROM temp.{name}_vocab")]
+    finally:
+        connection.execute(f"DROP TABLE temp.{name}_vocab")
+
+
+def changed_terms(connection: sqlite3.Connection, last: int) -> list[str]:
+    """Terms of the changed photos, before and after their changes."""
+    connection.executescript(
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS temp.photo_search_changed
+            USING fts5(description, ai_description, ai_tags, tokenize = '{TOKENIZER}');
+        DELETE FROM temp.photo_search_changed;
+        """
+    )
+    connection.execute(
+        """
+        INSERT INTO temp.photo_search_changed (description, ai_description, ai_tags)
+        SELECT description, ai_description, ai_tags FROM photo_search_changes WHERE rowid <= ?
+        UNION ALL
+        SELECT description, ai_description, ai_tags FROM photo_search
+        WHERE rowid IN (SELECT image_id FROM photo_search_changes WHERE rowid <= ?)
+        """,
+        (last, last),
+    )
+    try:
+        return terms(connection, "temp.photo_search_changed")
+    finally:
+        connection.execute("DROP TABLE temp.photo_search_changed")
+
+
+def remove(path: Path) -> None:
+    path.unlink(missing_ok=True)
+    precompress.remove_siblings(path)
+
+
+def write_index(project_root: Path, connection: sqlite3.Connection) -> tuple[int, int] | None:
+    """Export the posting lists of the changed terms, or of every term.
+
+    Returns the number of terms looked at and of files that changed, or
+    None when SQLite has no FTS5.
+    """
+    if not install(connection):
+        return None
+    directory = Path(project_root) / DIRECTORY
+    index_path = directory / INDEX_NAME
+    index = {"version": VERSION, "tokenizer": TOKENIZER, "stopwords": sorted(STOPWORDS)}
+    try:
+        rebuild = json.loads(index_path.read_text(encoding="utf-8")) != index
+    except (FileNotFoundError, ValueError):
+        rebuild = True
+
+    last = connection.execute("SELECT COALESCE(MAX(rowid), 0) FROM photo_search_changes").fetchone()[0]
+    if rebuild:
+        selected = terms(connection, "main.photo_search")
+    elif last:
+        selected = changed_terms(connection, last)
+    else:
+        return 0, 0
+
+    changed = 0
+    names = set()
+    for term in selected:
+        name = shard_name(term)
+        if name is None or term in STOPWORDS:
+            continue
+        names.add(f"{name}.json")
+        path = directory / f"{name}.json"
+        photos = [row[0] for row in connection.execute(POSTINGS, ('"' + term.replace('"', '""') + '"',))]
+        if photos:
+            document = {"term": term, "count": len(photos), "photos": photos}
+            changed += write_text_if_changed(
+                path, json.dumps(document, ensure_ascii=False, separators=(",", ":")) + "\n"
+            )
+        elif path.exists():
+            remove(path)
+            changed += 1
+    if rebuild:
+        for path in directory.glob("*.json"):
+            if path.name not in names and path.name != INDEX_NAME:
+                remove(path)
+        write_text_if_changed(index_path, json.dumps(index, ensure_ascii=False, indent=2) + "\n")
+
+    with connection:
+        connection.execute("DELETE FROM photo_search_changes WHERE rowid <= ?", (last,))
+    return len(selected), changed
@@ -0,0 +1,159 @@
+"""Sitemap index with fixed-size, date-ordered shards written as streams."""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from html import escape, unescape
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import metrics
+import precompress
+
+
+NAMESPACE = "http://www.sitemaps.org/schemas/sitemap/0.9"
+INDEX_NAMES = ("sitemap-index.xml", "sitemap.xml")
+SHARDS_DIR = "sitemaps"
+PAGES_SHARD = "pages.xml"
+# Well below the protocol limit of 50,000 URLs and 50 MB per file.
+SHARD_SIZE = 10000
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+INDEX_ENTRY_RE = re.compile(
+    r"<sitemap>\n    <loc>[^<]*/([^/<]+)</loc>\n(?:    <lastmod>([^<]*)</lastmod>\n)?  </sitemap>"
+)
+
+
+def url_entry(location: str, lastmod: str | None = None) -> str:
+    entry = f"  <url>\n    <loc>{escape(location, quote=False)}</loc>\n"
+    if lastmod:
+        entry += f"    <lastmod>{escape(lastmod, quote=False)}</lastmod>\n"
+    return entry + "  </url>\n"
+
+
+def write_stream(path: Path, chunks: Iterable[str], mode: int = 0o644) -> None:
+    """Write ``chunks`` to a temporary file, move it into place and compress it."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f".{path.name}.tmp")
+    with temporary.open("w", encoding="utf-8") as output:
+        output.writelines(chunks)
+    temporary.chmod(mode)
+    temporary.replace(path)
+    precompress.compress_file(path, mode)
+    metrics.increment("files_written")
+
+
+def urlset(entries: Iterable[str]) -> Iterator[str]:
+    yield XML_DECLARATION
+    yield f'<urlset xmlns="{NAMESPACE}">\n'
+    yield from entries
+    yield "</urlset>\n"
+
+
+def shard_name(number: int) -> str:
+    return f"photos-{number:04d}.xml"
+
+
+def read_index(project_root: Path) -> list[tuple[str, str | None]]:
+    """Return the ``(shard, lastmod)`` entries of the current sitemap index."""
+    try:
+        content = (project_root / INDEX_NAMES[0]).read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return []
+    return [
+        (unescape(name), unescape(lastmod) if lastmod else None)
+        for name, lastmod in INDEX_ENTRY_RE.findall(content)
+    ]
+
+
+def photo_shards(
+    photos: Iterable[tuple[str, str | None]],
+    size: int,
+    first: int = 1,
+) -> Iterator[tuple[str, list[str], str | None]]:
+    """Group ``(location, lastmod)`` rows, oldest first, into numbered shards."""
+    entries: list[str] = []
+    newest = None
+    number = first
+    for location, lastmod in photos:
+        entries.append(url_entry(location, lastmod))
+        if lastmod and (newest is None or lastmod > newest):
+            newest = lastmod
+        if len(entries) == size:
+            yield shard_name(number), entries, newest
+            entries, newest = [], None
+            number += 1
+    if entries:
+        yield shard_name(number), entries, newest
+
+
+def write_sitemaps(
+    project_root: Path,
+    base_url: str,
+    locations: Iterable[str],
+    photos: Iterable[tuple[str, str | None]],
+    previous_digests: dict[str, str],
+    shard_size: int = SHARD_SIZE,
+    first_shard: int = 1,
+) -> tuple[dict[str, str], list[str]]:
+    """Write the shards whose URLs changed and the index that lists them.
+
+    ``photos`` must be ordered oldest first, so new photos only touch the
+    last shard. With ``first_shard``, ``photos`` start at that shard and the
+    shards before it are kept as they are. Returns the digest of every shard
+    and the files written.
+    """
+    shards_dir = project_root / SHARDS_DIR
+    digests: dict[str, str] = {}
+    written: list[str] = []
+    index: list[tuple[str, str | None]] = []
+    kept = [shard_name(number) for number in range(1, first_shard)]
+    if kept:
+        lastmods = dict(read_index(project_root))
+        if any(name not in lastmods or name not in previous_digests for name in kept):
+            raise ValueError(f"El sitemap no tiene los fragmentos anteriores al {first_shard}")
+
+    def write_shard(name: str, entries: list[str], lastmod: str | None) -> None:
+        digest = hashlib.sha256("".join(entries).encode("utf-8")).hexdigest()
+        digests[name] = digest
+        index.append((name, lastmod))
+        path = shards_dir / name
+        if previous_digests.get(name) != digest or not path.is_file():
+            write_stream(path, urlset(entries))
+            written.append(f"{SHARDS_DIR}/{name}")
+        else:
+            precompress.ensure_siblings(path)
+
+    write_shard(PAGES_SHARD, [url_entry(location) for location in locations], None)
+    for name in kept:
+        digests[name] = previous_digests[name]
+        index.append((name, lastmods[name]))
+    for name, entries, lastmod in photo_shards(photos, shard_size, first_shard):
+        write_shard(name, entries, lastmod)
+
+    if shards_dir.is_dir():
+        for path in shards_dir.glob("photos-*.xml"):
+            if path.name not in digests:
+                path.unlink()
+                precompress.remove_siblings(path)
+                written.append(f"{SHARDS_DIR}/{path.name}")
+
+    content = XML_DECLARATION + f'<sitemapindex xmlns="{NAMESPACE}">\n'
+    for name, lastmod in index:
+        location = escape(f"{base_url}/{SHARDS_DIR}/{name}", quote=False)
+        content += f"  <sitemap>\n    <loc>{location}</loc>\n"
+        if lastmod:
+            content += f"    <lastmod>{escape(lastmod, quote=False)}</lastmod>\n"
+        content += "  </sitemap>\n"
+    content += "</sitemapindex>\n"
+    for index_name in INDEX_NAMES:
+        path = project_root / index_name
+        try:
+            if path.read_text(encoding="utf-8") == content:
+                precompress.ensure_siblings(path)
+                continue
+        except FileNotFoundError:
+            pass
+        write_stream(path, [content])
+        written.append(index_name)
+    return digests, written
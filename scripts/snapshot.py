@@ -0,0 +1,250 @@
+"""One view of the public photos shared by every generator.
+
+The feed, the JSON API, the change feed, the photo pages, the sitemap and
+both tag caches used to scan ``imagenes`` joined with ``image_analysis`` on
+their own. ``publish.py`` now creates a ``Snapshot`` once and hands it to
+the feed, the JSON API, the change feed, the pages and the sitemap; the
+tag caches read the tables their triggers keep instead. When the first
+consumer asks for photos, the snapshot copies the public ones, their AI
+tags and their Bluesky interaction counts into a private temporary
+database, in the same read transaction that reads the head of the change
+log. Every consumer then streams its rows from that copy in the order it
+needs, so all of them see the library exactly as of that head, and
+marking it as processed is exact. The copy lives on disk, so memory stays
+bounded, and fotos.db is only locked while it is made: a long run does
+not keep writers waiting. Nothing is read until a consumer asks: a run
+with nothing to do never opens the photos.
+
+A snapshot limited to a few ``image_ids`` is used by the targeted
+``publish.republish()``; it only copies those photos and also records
+where each of them sits among the public ones, so that only the files
+from that point on are rewritten.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple
+
+import change_log
+import metrics
+
+
+PUBLIC_PHOTOS = """
+    FROM imagenes i
+    LEFT JOIN image_analysis ia ON ia.image_id = i.id
+    WHERE (ia.is_appropriate = 1 OR ia.is_appropriate IS NULL)
+"""
+OLDEST_FIRST = "i.date, i.id"
+# Photos with the same date keep their id order; photos without one go last.
+NEWEST_FIRST = "COALESCE(i.date, '') DESC, i.id"
+# Photos that sort before (date, id) in OLDEST_FIRST.
+OLDER = "((i.date IS NULL AND (? IS NOT NULL OR i.id < ?)) OR i.date < ? OR (i.date = ? AND i.id < ?))"
+# Photos that sort before (date, id) in NEWEST_FIRST.
+NEWER = "(COALESCE(i.date, '') > ? OR (COALESCE(i.date, '') = ? AND i.id < ?))"
+# Bluesky interaction counts copied with each photo, when fotos.db has them.
+INTERACTIONS = ("like_count", "comment_count", "repost_count")
+# Columns without a type keep the values of fotos.db as they are.
+COPY_SCHEMA = """
+CREATE TABLE photos (
+    id INTEGER PRIMARY KEY, path, date, author, description, is_appropriate, ai_tags,
+    like_count, comment_count, repost_count
+);
+"""
+# Built after the copy; they match OLDEST_FIRST and NEWEST_FIRST.
+COPY_INDEXES = """
+CREATE INDEX photos_oldest_first ON photos (date, id);
+CREATE INDEX photos_newest_first ON photos (COALESCE(date, '') DESC, id);
+"""
+
+
+class Photo(NamedTuple):
+    id: int
+    path: str
+    date: str | None
+    author: str | None
+    description: str | None
+    # 1 for approved photos, None for photos that were not analysed yet.
+    is_appropriate: int | None
+    ai_tags: str | None
+    like_count: int | None = None
+    comment_count: int | None = None
+    repost_count: int | None = None
+
+
+class Position(NamedTuple):
+    """Number of other public photos before a photo, in each output order."""
+    oldest_first: int
+    described_oldest_first: int
+    described_newest_first: int
+
+
+class Snapshot:
+    """Public photos, oldest first, with their AI tags and interaction counts."""
+
+    def __init__(self, db_path: Path, image_ids: Iterable[int] | None = None):
+        self.db_path = Path(db_path)
+        self.image_ids = None if image_ids is None else sorted(set(image_ids))
+        self._positions: dict[int, Position] = {}
+        self._requested: dict[int, Photo] = {}
+        self._head: int | None = None
+        self._copy: sqlite3.Connection | None = None
+
+    @property
+    def loaded(self) -> bool:
+        """Whether a consumer has asked for the photos in this run."""
+        return self._head is not None
+
+    def load(self) -> None:
+        """Copy the public photos and read the head in one read transaction."""
+        with metrics.stage("snapshot"):
+            # An empty name is a temporary database on disk, removed on close.
+            connection = sqlite3.connect("", isolation_level=None)
+            try:
+                connection.executescript(COPY_SCHEMA)
+                connection.execute("ATTACH DATABASE ? AS source", (str(self.db_path),))
+                connection.execute("BEGIN")
+                head = change_log.head(connection)
+                count = self.copy_photos(connection)
+                if self.image_ids is not None:
+                    self.load_requested(connection)
+                connection.execute("COMMIT")
+                connection.execute("DETACH DATABASE source")
+                connection.executescript(COPY_INDEXES)
+            except BaseException:
+                connection.close()
+                raise
+        metrics.increment("snapshot_copied", count)
+        self._copy = connection
+        self._head = head
+
+    def columns(self, connection: sqlite3.Connection) -> str:
+        """The ``Photo`` fields as read from fotos.db, attached as ``source``."""
+        analysis = {row[1] for row in connection.execute("PRAGMA source.table_info(image_analysis)")}
+        interactions = {
+            row[1] for row in connection.execute("PRAGMA source.table_info(bluesky_interactions_cache)")
+        }
+        counts = [
+            f"(SELECT {column} FROM source.bluesky_interactions_cache WHERE image_id = i.id)"
+            if column in interactions and "image_id" in interactions else "NULL"
+            for column in INTERACTIONS
+        ]
+        return ", ".join([
+            "i.id, i.path, i.date, i.author, i.description, ia.is_appropriate",
+            "ia.tags" if "tags" in analysis else "NULL",
+            *counts,
+        ])
+
+    def copy_photos(self, connection: sqlite3.Connection) -> int:
+        """Copy the public photos, or the public ones among ``image_ids``."""
+        query = f"INSERT INTO main.photos SELECT {self.columns(connection)} {PUBLIC_PHOTOS}"
+        parameters: list[str] = []
+        if self.image_ids is not None:
+            query += " AND i.id IN (SELECT value FROM json_each(?))"
+            parameters.append(json.dumps(self.image_ids))
+        return connection.execute(query, parameters).rowcount
+
+    def load_requested(self, connection: sqlite3.Connection) -> None:
+        """Read the requested photos, public or not, and their positions."""
+        described = PUBLIC_PHOTOS + " AND i.description IS NOT NULL"
+        for row in connection.execute(
+            f"""
+            SELECT {self.columns(connection)}
+            FROM imagenes i
+            LEFT JOIN image_analysis ia ON ia.image_id = i.id
+            WHERE i.id IN (SELECT value FROM json_each(?))
+            """,
+            (json.dumps(self.image_ids),),
+        ).fetchall():
+            photo = Photo(*row)
+            older = (photo.date, photo.id, photo.date, photo.date, photo.id)
+            newer = (photo.date or "", photo.date or "", photo.id)
+            self._requested[photo.id] = photo
+            self._positions[photo.id] = Position(
+                connection.execute(f"SELECT COUNT(*) {PUBLIC_PHOTOS} AND {OLDER}", older).fetchone()[0],
+                connection.execute(f"SELECT COUNT(*) {described} AND {OLDER}", older).fetchone()[0],
+                connection.execute(f"SELECT COUNT(*) {described} AND {NEWER}", newer).fetchone()[0],
+            )
+
+    def select(
+        self,
+        order: str = OLDEST_FIRST,
+        described: bool = False,
+        image_ids: Iterable[int] | None = None,
+    ) -> Iterator[Photo]:
+        """Stream the copied photos in ``order``.
+
+        ``described`` keeps the photos with a description, and ``image_ids``
+        only selects those photos.
+        """
+        if self._head is None:
+            self.load()
+        query = """
+            SELECT id, path, date, author, description, is_appropriate, ai_tags,
+                like_count, comment_count, repost_count
+            FROM photos i
+        """
+        conditions = []
+        parameters: list[str] = []
+        if described:
+            conditions.append("i.description IS NOT NULL")
+        if image_ids is not None:
+            conditions.append("i.id IN (SELECT value FROM json_each(?))")
+            parameters.append(json.dumps(sorted(image_ids)))
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        count = 0
+        try:
+            for row in self._copy.execute(f"{query} ORDER BY {order}", parameters):
+                count += 1
+                yield Photo(*row)
+        finally:
+            metrics.increment("snapshot_photos", count)
+
+    def requested(self, image_id: int) -> Photo | None:
+        """One of the ``image_ids`` of a limited snapshot, even if it is not public."""
+        if self._head is None:
+            self.load()
+        return self._requested.get(image_id)
+
+    def position(self, image_id: int) -> Position | None:
+        """Where ``image_id`` sits, or would sit, among the public photos.
+
+        Only known for the ``image_ids`` of a limited snapshot that still
+        exist in ``imagenes``.
+        """
+        if self._head is None:
+            self.load()
+        return self._positions.get(image_id)
+
+    @property
+    def photos(self) -> Iterator[Photo]:
+        return self.select()
+
+    @property
+    def head(self) -> int:
+        """Change log sequence number the copied photos are consistent with."""
+        if self._head is None:
+            self.load()
+        return self._head
+
+    def get(self, image_id: int) -> Photo | None:
+        photos = self.changed([image_id])
+        return photos[0] if photos else None
+
+    def changed(self, image_ids: Iterable[int]) -> list[Photo]:
+        """The public photos among ``image_ids``, in id order."""
+        image_ids = set(image_ids)
+        if not image_ids:
+            return []
+        return list(self.select(order="i.id", image_ids=image_ids))
+
+    def newest_first(self) -> Iterator[Photo]:
+        """Newest photos first; photos with the same date keep their id order."""
+        return self.select(order=NEWEST_FIRST)
+
+    def described(self, newest_first: bool = False, image_ids: Iterable[int] | None = None) -> Iterator[Photo]:
+        """Photos with a description, the ones the feeds publish."""
+        return self.select(NEWEST_FIRST if newest_first else OLDEST_FIRST, True, image_ids)
@@ -0,0 +1,64 @@
+"""Writers shared by ``update-tags.py`` and ``update-ai-tags.py``.
+
+Both caches have the same format, a ``lastUpdate`` and the ``tags``
+entries sorted by frequency, and feed the same autocomplete index; they
+only differ in their file, the key their entries are sorted by and the
+kind of their per-tag shards.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+import autocomplete
+import metrics
+import precompress
+import tag_shards
+from generate_photo_pages import write_text_if_changed
+
+
+# Shard kind: how the messages call it.
+SHARD_LABELS = {"tags": "Tags shards", "ai-tags": "AI tags shards"}
+
+
+def write_cache(project_root: Path, name: str, entries: list[dict], key: str) -> bool:
+    """Write the cache ``name`` only when its tags changed.
+
+    Tags are sorted by frequency, then by ``key``. ``lastUpdate`` is the
+    time the tags last changed, so an unchanged cache keeps its bytes, its
+    compressed siblings and its HTTP validators.
+    """
+    sorted_tags = sorted(entries, key=lambda entry: (-entry["count"], entry[key]))
+    output_path = project_root / name
+    try:
+        previous = json.loads(output_path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        previous = {}
+    if previous.get("tags") == sorted_tags and "lastUpdate" in previous:
+        precompress.ensure_siblings(output_path)
+        return False
+
+    cache_data = {
+        "lastUpdate": datetime.now().isoformat(),
+        "tags": sorted_tags,
+    }
+    with metrics.stage("write"):
+        write_text_if_changed(output_path, json.dumps(cache_data, ensure_ascii=False, indent=2))
+    metrics.increment("tags", len(sorted_tags))
+    return True
+
+
+def write_autocomplete(project_root: Path) -> None:
+    """Rebuild the prefix buckets of both tag vocabularies."""
+    buckets, written = autocomplete.write_index(project_root)
+    print(f"Autocompletado: {written} de {buckets} prefijos actualizados")
+
+
+def write_shards(project_root: Path, connection: sqlite3.Connection, kind: str) -> None:
+    """Rewrite the ``kind`` shards of the tags whose photos changed."""
+    with metrics.stage("shards"):
+        checked, changed = tag_shards.write_shards(project_root, connection, kind)
+    print(f"{SHARD_LABELS[kind]}: {changed} de {checked} etiquetas actualizadas")
@@ -0,0 +1,219 @@
+"""Per-tag photo lists, so a tag page does not need the whole database.
+
+``tags/{tag}.json`` lists the public photos with a hashtag (``tag`` is the
+normalised hashtag without ``#``) and ``ai-tags/{tag}.json`` the approved
+photos with an AI tag, newest first, with the fields a photo card needs.
+``{tag}.json`` holds the newest photos, at most ``PAGE_SIZE``, and the
+number of older pages; ``{tag}/page-0001.json`` holds the oldest
+``PAGE_SIZE`` photos, ``page-0002.json`` the next ones, and so on, so a
+new photo only rewrites ``{tag}.json`` and, once it is full, adds a page.
+Characters that cannot appear in a file name (``/``, ``\\``, ``%``,
+control characters and a leading ``.``) are written as ``%XX``; clients
+apply the same rule and then URL-encode the name as usual.
+
+Triggers on ``photo_hashtags`` and ``image_ai_tags`` queue every tag whose
+rows change in ``tag_shards_pending``, so a run only rewrites the shards of
+those tags. A missing directory rebuilds every shard of its kind.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import shutil
+import sqlite3
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+import precompress
+from generate_photo_pages import photo_id_from_path, write_text_if_changed
+from snapshot import PUBLIC_PHOTOS
+
+
+PAGE_SIZE = 500
+VERSION = 1
+UNSAFE_RE = re.compile(r"^\.|[%/\\\x00-\x1f\x7f]")
+# Longer names are skipped: most file systems stop at 255 bytes.
+MAX_NAME_BYTES = 200
+
+ORDER = " ORDER BY COALESCE(i.date, '') DESC, i.id"
+
+
+class Kind(NamedTuple):
+    directory: str
+    table: str
+    column: str
+    # Dropped from the tag to name its file.
+    prefix: str
+    # Public photos carrying the tag, newest first.
+    photos: str
+
+
+KINDS = {
+    "tags": Kind(
+        "tags",
+        "photo_hashtags",
+        "normalized_tag",
+        "#",
+        "SELECT i.id, i.path, i.date, i.author" + PUBLIC_PHOTOS
+        + " AND i.id IN (SELECT image_id FROM photo_hashtags WHERE normalized_tag = ?)" + ORDER,
+    ),
+    "ai-tags": Kind(
+        "ai-tags",
+        "image_ai_tags",
+        "tag",
+        "",
+        "SELECT i.id, i.path, i.date, i.author FROM imagenes i"
+        " WHERE i.id IN (SELECT image_id FROM image_ai_tags WHERE tag = ? AND is_appropriate = 1)" + ORDER,
+    ),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tag_shards_pending (
+    kind TEXT NOT NULL,
+    tag NOT NULL,
+    PRIMARY KEY (kind, tag)
+);
+"""
+
+# OR REPLACE gives a re-queued tag a new rowid, so a change made while its
+# shard is being written is not cleared with the older entry.
+TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS tag_shards_{table}_insert
+AFTER INSERT ON {table} BEGIN
+    INSERT OR REPLACE INTO tag_shards_pending (kind, tag) VALUES ('{kind}', NEW.{column});
+END;
+CREATE TRIGGER IF NOT EXISTS tag_shards_{table}_delete
+AFTER DELETE ON {table} BEGIN
+    INSERT OR REPLACE INTO tag_shards_pending (kind, tag) VALUES ('{kind}', OLD.{column});
+END;
+"""
+
+
+def shard_name(tag) -> str | None:
+    """Return the file name (without ``.json``) of a tag, or None if it has none."""
+    name = UNSAFE_RE.sub(
+        lambda match: "".join(f"%{byte:02X}" for byte in match.group().encode("utf-8")), str(tag)
+    )
+    if not name or len(name.encode("utf-8")) > MAX_NAME_BYTES:
+        return None
+    return name
+
+
+def page_name(number: int) -> str:
+    return f"page-{number:04d}.json"
+
+
+def install(connection: sqlite3.Connection, kind: str) -> None:
+    """Queue the changes of ``kind``'s table; the table must exist."""
+    spec = KINDS[kind]
+    connection.executescript(
+        SCHEMA + TRIGGERS.format(table=spec.table, kind=kind, column=spec.column)
+    )
+
+
+def pages(tag, photos: list[dict], page_size: int) -> Iterator[tuple[int, str]]:
+    """Yield ``(page number, content)``, 0 being ``{tag}.json``.
+
+    ``photos`` are newest first. Full pages are numbered from the oldest
+    photos, like the JSON API in ``data/``, so a new photo only changes
+    ``{tag}.json`` until it holds ``page_size`` photos.
+    """
+    older = (len(photos) - 1) // page_size
+    newest = len(photos) - older * page_size
+    for number in range(older + 1):
+        if number == 0:
+            selected = photos[:newest]
+        else:
+            end = len(photos) - (number - 1) * page_size
+            selected = photos[end - page_size:end]
+        if number == 0:
+            document = {"version": VERSION, "tag": tag, "count": len(photos), "pages": older}
+        else:
+            # No totals here, so that the page stays as it is.
+            document = {"version": VERSION, "tag": tag, "page": number}
+        document["photos"] = selected
+        yield number, json.dumps(document, ensure_ascii=False, indent=2) + "\n"
+
+
+def remove(path: Path) -> None:
+    path.unlink(missing_ok=True)
+    precompress.remove_siblings(path)
+
+
+def write_shard(directory: Path, name: str, tag, photos: list[dict], page_size: int) -> bool:
+    """Write or remove the files of one tag; True if any file changed."""
+    first = directory / f"{name}.json"
+    more = directory / name
+    if not photos:
+        existed = first.exists()
+        remove(first)
+        shutil.rmtree(more, ignore_errors=True)
+        return existed
+
+    changed = False
+    current = set()
+    for number, content in pages(tag, photos, page_size):
+        path = first if number == 0 else more / page_name(number)
+        current.add(path.name)
+        changed |= write_text_if_changed(path, content)
+    if more.is_dir():
+        for path in more.glob("page-*.json"):
+            if path.name not in current:
+                remove(path)
+                changed = True
+        if not any(more.iterdir()):
+            more.rmdir()
+    return changed
+
+
+def write_shards(
+    project_root: Path,
+    connection: sqlite3.Connection,
+    kind: str,
+    page_size: int = PAGE_SIZE,
+) -> tuple[int, int]:
+    """Rewrite the shards of the queued tags, or all of them for a new directory.
+
+    Returns the number of tags looked at and of shards that changed.
+    """
+    spec = KINDS[kind]
+    install(connection, kind)
+    directory = Path(project_root) / spec.directory
+    rebuild = not directory.is_dir()
+    last = connection.execute(
+        "SELECT COALESCE(MAX(rowid), 0) FROM tag_shards_pending WHERE kind = ?", (kind,)
+    ).fetchone()[0]
+    if rebuild:
+        tags = [tag for (tag,) in connection.execute(f"SELECT DISTINCT {spec.column} FROM {spec.table}")]
+    else:
+        tags = [
+            tag for (tag,) in connection.execute(
+                "SELECT tag FROM tag_shards_pending WHERE kind = ? AND rowid <= ?", (kind, last)
+            )
+        ]
+
+    changed = 0
+    names = set()
+    for tag in tags:
+        name = shard_name(str(tag).removeprefix(spec.prefix))
+        if name is None:
+            continue
+        names.add(f"{name}.json")
+        photos = [
+            {"id": photo_id_from_path(path), "path": path, "date": date, "author": author}
+            for _, path, date, author in connection.execute(spec.photos, (tag,))
+        ]
+        changed += write_shard(directory, name, tag, photos, page_size)
+    if rebuild:
+        directory.mkdir(parents=True, exist_ok=True)
+        for path in directory.glob("*.json"):
+            if path.name not in names:
+                remove(path)
+                shutil.rmtree(directory / path.stem, ignore_errors=True)
+
+    with connection:
+        connection.execute(
+            "DELETE FROM tag_shards_pending WHERE kind = ? AND rowid <= ?", (kind, last)
+        )
+    return len(tags), changed
@@ -1,72 +1,69 @@
 #!/usr/bin/env python3
+import argparse
 import sqlite3
 import json
-from datetime import datetime
-import os
+from contextlib import closing
+from pathlib import Path
 
-def update_ai_tags_cache():
+import ai_tag_index
+import autocomplete
+import metrics
+import profiling
+import tag_cache
+
+def update_ai_tags_cache(project_root=None):
     try:
         # Get the project root directory (parent of scripts directory)
-        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        conn = sqlite3.connect(os.path.join(project_root, 'fotos.db'))
-        cursor = conn.cursor()
-        
-        # Get all AI tags from the database
-        cursor.execute("""
-            SELECT i.path, ia.tags 
-            FROM image_analysis ia
-            JOIN imagenes i ON i.id = ia.image_id
-            WHERE ia.tags IS NOT NULL 
-            AND ia.is_appropriate = 1
-            ORDER BY i.date DESC
-        """)
-        photos = cursor.fetchall()
-        
-        # Count tags and track latest photos
-        tags_data = {}
-        for path, tags_json in photos:
-            if tags_json:
-                try:
-                    tags = json.loads(tags_json)
-                    for tag in tags:
-                        if tag not in tags_data:
-                            tags_data[tag] = {
-                                "count": 0,
-                                "latest_photos": []
-                            }
-                        tags_data[tag]["count"] += 1
-                        
-                        # Keep only the 4 most recent photos for each tag
-                        if len(tags_data[tag]["latest_photos"]) < 4:
-                            tags_data[tag]["latest_photos"].append(path)
-                except json.JSONDecodeError:
-                    continue
-        
-        # Sort tags by frequency
-        sorted_tags = [
-            {
-                "tag": tag,
-                "count": data["count"],
-                "latest_photos": data["latest_photos"]
-            }
-            for tag, data in sorted(tags_data.items(), key=lambda x: (-x[1]["count"], x[0]))
-        ]
-        
-        # Create cache data
-        cache_data = {
-            "lastUpdate": datetime.now().isoformat(),
-            "tags": sorted_tags
-        }
-        
-        # Write to JSON file
-        with open(os.path.join(project_root, 'ai-tags-cache.json'), 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, ensure_ascii=False, indent=2)
-            
-        print("AI tags cache updated successfully")
-        conn.close()
-        
+        project_root = Path(project_root) if project_root else Path(__file__).resolve().parent.parent
+
+        # Counts and newest photos of the approved photos' AI tags
+        with closing(sqlite3.connect(project_root / 'fotos.db')) as conn:
+            with metrics.stage('db_query'):
+                installed = ai_tag_index.install(conn)
+                entries = ai_tag_index.tag_counts(conn) if installed else []
+
+            changed = tag_cache.write_cache(project_root, 'ai-tags-cache.json', entries, 'tag')
+            if changed:
+                print("AI tags cache updated successfully")
+            else:
+                print("AI tags cache: sin cambios")
+            if changed or not (project_root / autocomplete.DIRECTORY).is_dir():
+                tag_cache.write_autocomplete(project_root)
+            if installed:
+                tag_cache.write_shards(project_root, conn, 'ai-tags')
+
     except Exception as e:
         print(f"Error updating AI tags cache: {e}")
+        raise
+
+def update_tag_buckets(project_root, tags_json):
+    """Recount, in ai-tags-cache.json, only the tags in ``tags_json``.
+
+    Used after a single photo was approved or rejected; the rest of the
+    cache is kept as it is.
+    """
+    project_root = Path(project_root)
+    try:
+        tags = json.loads(tags_json or '[]')
+    except json.JSONDecodeError:
+        return
+    if not isinstance(tags, list) or not tags:
+        return
+    with closing(sqlite3.connect(project_root / 'fotos.db')) as conn:
+        with metrics.stage('db_query'):
+            ai_tag_index.install(conn)
+            updated = ai_tag_index.tag_counts(conn, tags)
+
+        cache = json.loads((project_root / 'ai-tags-cache.json').read_text(encoding='utf-8'))
+        entries = [entry for entry in cache['tags'] if entry['tag'] not in tags]
+        if tag_cache.write_cache(project_root, 'ai-tags-cache.json', entries + updated, 'tag'):
+            tag_cache.write_autocomplete(project_root)
+        print(f"AI tags cache: {len(set(tags))} etiquetas actualizadas")
+        tag_cache.write_shards(project_root, conn, 'ai-tags')
 
 if __name__ == "__main__":
-    update_ai_tags_cache()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Regenera ai-tags-cache.json con las etiquetas de IA')
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    with metrics.run('update_ai_tags'), profiling.session('update_ai_tags', args):
+        update_ai_tags_cache()
\ No newline at end of file
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+import argparse
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import metrics
+import profiling
+import search_index
+
+def update_search_index(project_root=None):
+    """Export search/{term}.json for the terms of the photos that changed."""
+    try:
+        # Get the project root directory (parent of scripts directory)
+        project_root = Path(project_root) if project_root else Path(__file__).resolve().parent.parent
+
+        with closing(sqlite3.connect(project_root / 'fotos.db')) as conn:
+            with metrics.stage('search_index'):
+                result = search_index.write_index(project_root, conn)
+        if result is None:
+            print("Índice de búsqueda: SQLite sin FTS5, se omite")
+            return
+        checked, changed = result
+        metrics.increment('terms', checked)
+        if not checked:
+            print("Índice de búsqueda: sin cambios")
+            return
+        print(f"Índice de búsqueda: {changed} de {checked} términos actualizados")
+
+    except Exception as e:
+        print(f"Error updating search index: {e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Actualiza el índice de búsqueda estático en search/')
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    with metrics.run('update_search_index'), profiling.session('update_search_index', args):
+        update_search_index()
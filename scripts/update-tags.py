@@ -1,79 +1,64 @@
 #!/usr/bin/env python3
+import argparse
 import sqlite3
 import json
-from datetime import datetime
-import re
-import unicodedata
+from contextlib import closing
+from pathlib import Path
 
-def normalize_tag(tag):
-    """Remove accents from a tag while keeping the # symbol."""
-    return '#' + ''.join(c for c in unicodedata.normalize('NFD', tag[1:])
-                        if unicodedata.category(c) != 'Mn')
+import hashtag_index
+import autocomplete
+import metrics
+import profiling
+import tag_cache
 
-def update_tags_cache():
+def update_tags_cache(project_root=None):
     try:
-        # Connect to SQLite database
-        conn = sqlite3.connect('../fotos.db')
-        cursor = conn.cursor()
-        
-        # Get all descriptions with their corresponding paths and dates
-        cursor.execute("""
-            SELECT description, path, date 
-            FROM imagenes 
-            WHERE description IS NOT NULL 
-            ORDER BY date DESC
-        """)
-        photos = cursor.fetchall()
-        
-        # Count tags and track latest photos
-        tags_data = {}
-        for description, path, date in photos:
-            if description:
-                # Updated regex to include accented characters and ñ
-                matches = re.finditer(r'#([a-záéíóúüñA-ZÁÉÍÓÚÜÑ0-9_]+)', description.lower())
-                for match in matches:
-                    tag = match.group(0)  # includes the # symbol
-                    normalized_tag = normalize_tag(tag)
-                    
-                    # Use normalized tag as key but keep original tag for display
-                    if normalized_tag not in tags_data:
-                        tags_data[normalized_tag] = {
-                            "count": 0,
-                            "latest_photos": [],
-                            "original_tag": tag  # Keep the original tag with accents
-                        }
-                    tags_data[normalized_tag]["count"] += 1
-                    
-                    # Keep only the 4 most recent photos for each tag
-                    if len(tags_data[normalized_tag]["latest_photos"]) < 4:
-                        tags_data[normalized_tag]["latest_photos"].append(path)
-        
-        # Sort tags by frequency
-        sorted_tags = [
-            {
-                "tag": data["original_tag"],  # Use original tag with accents for display
-                "normalized_tag": tag,  # Add normalized version for linking
-                "count": data["count"],
-                "latest_photos": data["latest_photos"]
-            }
-            for tag, data in sorted(tags_data.items(), key=lambda x: (-x[1]["count"], x[0]))
-        ]
-        
-        # Create cache data
-        cache_data = {
-            "lastUpdate": datetime.now().isoformat(),
-            "tags": sorted_tags
-        }
-        
-        # Write to JSON file
-        with open('../tags-cache.json', 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, ensure_ascii=False, indent=2)
-            
-        print("Tags cache updated successfully")
-        conn.close()
-        
+        # Get the project root directory (parent of scripts directory)
+        project_root = Path(project_root) if project_root else Path(__file__).resolve().parent.parent
+
+        with closing(sqlite3.connect(project_root / 'fotos.db')) as conn:
+            with metrics.stage('db_query'):
+                hashtag_index.sync(conn)
+                entries = hashtag_index.tag_counts(conn)
+
+            changed = tag_cache.write_cache(project_root, 'tags-cache.json', entries, 'normalized_tag')
+            if changed:
+                print("Tags cache updated successfully")
+            else:
+                print("Tags cache: sin cambios")
+            if changed or not (project_root / autocomplete.DIRECTORY).is_dir():
+                tag_cache.write_autocomplete(project_root)
+            tag_cache.write_shards(project_root, conn, 'tags')
+
     except Exception as e:
         print(f"Error updating tags cache: {e}")
+        raise
+
+def update_tag_buckets(project_root, description):
+    """Recount, in tags-cache.json, only the hashtags that appear in ``description``.
+
+    Used after a single photo was published or retired; the rest of the
+    cache is kept as it is.
+    """
+    project_root = Path(project_root)
+    tags = {normalized for normalized, _ in hashtag_index.extract(description)}
+    if not tags:
+        return
+    with closing(sqlite3.connect(project_root / 'fotos.db')) as conn:
+        with metrics.stage('db_query'):
+            hashtag_index.sync(conn)
+            updated = hashtag_index.tag_counts(conn, tags)
+
+        cache = json.loads((project_root / 'tags-cache.json').read_text(encoding='utf-8'))
+        entries = [entry for entry in cache['tags'] if entry['normalized_tag'] not in tags]
+        if tag_cache.write_cache(project_root, 'tags-cache.json', entries + updated, 'normalized_tag'):
+            tag_cache.write_autocomplete(project_root)
+        print(f"Tags cache: {len(tags)} etiquetas actualizadas")
+        tag_cache.write_shards(project_root, conn, 'tags')
 
 if __name__ == "__main__":
-    update_tags_cache()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Regenera tags-cache.json con los hashtags de las descripciones')
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    with metrics.run('update_tags'), profiling.session('update_tags', args):
+        update_tags_cache()
\ No newline at end of file
@@ -0,0 +1,113 @@
+"""Rebuild when ``fotos.db`` changes, for scripts that run as a daemon.
+
+``PRAGMA data_version`` changes whenever another connection commits, also
+through the WAL, so polling it costs no query on the photo tables. A change
+only triggers a rebuild when the change log has entries the generator has
+not processed yet, which also ignores the rebuild's own writes. Bursts of
+commits, such as a batch of uploads, are coalesced: the rebuild starts once
+the database has been quiet for ``debounce`` seconds, or at the latest
+after ``max_delay`` seconds.
+"""
+
+from __future__ import annotations
+
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+import change_log
+
+
+INTERVAL = 0.5
+DEBOUNCE = 2.0
+MAX_DELAY = 30.0
+# Wait before retrying a failed rebuild, so a persistent error does not spin.
+RETRY_DELAY = 60.0
+
+
+def data_version(connection: sqlite3.Connection) -> int:
+    return connection.execute("PRAGMA data_version").fetchone()[0]
+
+
+def has_pending_changes(connection: sqlite3.Connection, generator: str) -> bool:
+    try:
+        head, last_seq, _ = change_log.pending(connection, generator)
+    except sqlite3.OperationalError:
+        # The change log is created by the first rebuild.
+        return True
+    return head != last_seq
+
+
+def settle(
+    connection: sqlite3.Connection,
+    stop: threading.Event,
+    interval: float,
+    debounce: float,
+    max_delay: float,
+) -> None:
+    """Return once no commit has happened for ``debounce`` seconds."""
+    started = last_change = time.monotonic()
+    version = data_version(connection)
+    while not stop.wait(interval):
+        now = time.monotonic()
+        current = data_version(connection)
+        if current != version:
+            version = current
+            last_change = now
+        if now - last_change >= debounce or now - started >= max_delay:
+            return
+
+
+def watch(
+    db_path: Path,
+    rebuild: Callable[[], None],
+    generator: str,
+    stop: threading.Event | None = None,
+    interval: float = INTERVAL,
+    debounce: float = DEBOUNCE,
+    max_delay: float = MAX_DELAY,
+) -> None:
+    """Run ``rebuild`` now and after every change until ``stop`` is set.
+
+    Without ``stop``, SIGTERM and SIGINT end the loop after the current
+    rebuild. Errors in ``rebuild`` are printed and retried later.
+    """
+    if stop is None:
+        stop = threading.Event()
+        for signal_number in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signal_number, lambda *_: stop.set())
+
+    connection = sqlite3.connect(db_path)
+    try:
+        # The first rebuild is unconditional, like a cron run, so it also
+        # picks up a new version of the scripts or the template.
+        first = True
+        check = False
+        version = data_version(connection)
+        while not stop.is_set():
+            if first or (check and has_pending_changes(connection, generator)):
+                if not first:
+                    settle(connection, stop, interval, debounce, max_delay)
+                    if stop.is_set():
+                        break
+                first = False
+                check = True
+                try:
+                    rebuild()
+                except Exception as error:
+                    print(f"Error en la regeneración; se reintentará: {error}", file=sys.stderr)
+                    stop.wait(RETRY_DELAY)
+                # Commits made during the rebuild are still in the change
+                # log, so check it again before waiting for the next one.
+                version = data_version(connection)
+                continue
+            stop.wait(interval)
+            current = data_version(connection)
+            check = current != version
+            version = current
+    finally:
+        connection.close()
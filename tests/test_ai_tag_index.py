@@ -0,0 +1,97 @@
+import importlib.util
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+SPEC = importlib.util.spec_from_file_location("ai_tag_index", SCRIPTS_DIR / "ai_tag_index.py")
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+
+class AiTagIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        self.connection.executescript(
+            """
+            CREATE TABLE imagenes (id INTEGER PRIMARY KEY, path TEXT, date TEXT);
+            CREATE TABLE image_analysis (
+                image_id INTEGER UNIQUE, tags TEXT, is_appropriate INTEGER NOT NULL
+            );
+            INSERT INTO imagenes VALUES
+                (1, '1.jpg', '2026-07-01'), (2, '2.jpg', '2026-07-03'), (3, '3.jpg', '2026-07-02');
+            INSERT INTO image_analysis VALUES
+                (1, '["río", "puente"]', 1), (2, '["río"]', 1), (3, 'no es JSON', 1);
+            """
+        )
+
+    def tearDown(self):
+        self.connection.close()
+
+    def counts(self, tags=None):
+        return {
+            entry["tag"]: (entry["count"], entry["latest_photos"])
+            for entry in MODULE.tag_counts(self.connection, tags)
+        }
+
+    def test_backfills_existing_analyses(self):
+        self.assertTrue(MODULE.install(self.connection))
+
+        self.assertEqual(
+            self.counts(),
+            {"río": (2, ["2.jpg", "1.jpg"]), "puente": (1, ["1.jpg"])},
+        )
+        self.assertEqual(list(self.counts(["puente"])), ["puente"])
+
+    def test_triggers_follow_moderation_dates_and_deletions(self):
+        MODULE.install(self.connection)
+        self.connection.executescript(
+            """
+            UPDATE image_analysis SET is_appropriate = 0 WHERE image_id = 2;
+            UPDATE image_analysis SET tags = '["puente"]' WHERE image_id = 3;
+            UPDATE imagenes SET date = '2026-07-09' WHERE id = 1;
+            INSERT INTO imagenes VALUES (4, '4.jpg', '2026-07-05');
+            INSERT INTO image_analysis VALUES (4, '["puente", "puente"]', 1);
+            DELETE FROM imagenes WHERE id = 3;
+            """
+        )
+
+        self.assertEqual(
+            self.counts(),
+            {"río": (1, ["1.jpg"]), "puente": (3, ["1.jpg", "4.jpg", "4.jpg"])},
+        )
+        MODULE.install(self.connection)
+        self.assertEqual(
+            self.connection.execute("SELECT COUNT(*) FROM image_ai_tags").fetchone()[0], 5
+        )
+
+    def test_database_without_ai_tags_is_left_alone(self):
+        self.connection.executescript("DROP TABLE image_analysis")
+
+        self.assertFalse(MODULE.install(self.connection))
+
+    def test_install_only_writes_the_schema_when_a_trigger_changed(self):
+        MODULE.install(self.connection)
+        cookie = self.connection.execute("PRAGMA schema_version").fetchone()[0]
+
+        self.assertTrue(MODULE.install(self.connection))
+        self.assertEqual(cookie, self.connection.execute("PRAGMA schema_version").fetchone()[0])
+
+        # An older definition of a trigger is replaced.
+        self.connection.executescript(
+            """
+            DROP TRIGGER image_ai_tags_analysis_delete;
+            CREATE TRIGGER image_ai_tags_analysis_delete AFTER DELETE ON image_analysis BEGIN SELECT 1; END;
+            """
+        )
+        MODULE.install(self.connection)
+        self.connection.execute("DELETE FROM image_analysis WHERE image_id = 2")
+        self.assertNotIn(2, [row[0] for row in self.connection.execute("SELECT image_id FROM image_ai_tags")])
+
+
+if __name__ == "__main__":
+    unittest.main()
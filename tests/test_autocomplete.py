@@ -0,0 +1,55 @@
+import importlib.util
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+SPEC = importlib.util.spec_from_file_location("autocomplete", SCRIPTS_DIR / "autocomplete.py")
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+
+def write_caches(root, tags, ai_tags):
+    (root / "tags-cache.json").write_text(json.dumps({"tags": tags}), encoding="utf-8")
+    (root / "ai-tags-cache.json").write_text(json.dumps({"tags": ai_tags}), encoding="utf-8")
+
+
+class AutocompleteTest(unittest.TestCase):
+    def test_buckets_merge_both_vocabularies_by_accent_insensitive_prefix(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            write_caches(
+                root,
+                [{"tag": "#río", "normalized_tag": "#rio", "count": 3}],
+                [{"tag": "Ribera", "count": 5}, {"tag": "#rio", "count": 1}, {"tag": "puente", "count": 2}],
+            )
+
+            self.assertEqual(MODULE.write_index(root), (2, 2))
+
+            bucket = json.loads((root / "autocomplete" / "ri.json").read_text(encoding="utf-8"))
+            self.assertEqual(
+                bucket["entries"],
+                [["ribera", "Ribera", "ai-tags", 5], ["rio", "#rio", "ai-tags", 1], ["rio", "#río", "tags", 3]],
+            )
+            index = json.loads((root / "autocomplete" / "index.json").read_text(encoding="utf-8"))
+            self.assertEqual(index["buckets"]["pu"], {"file": "pu.json", "count": 1})
+
+    def test_only_changed_buckets_are_written_and_stale_ones_removed(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            write_caches(root, [], [{"tag": "puente", "count": 2}, {"tag": "noche", "count": 1}])
+            MODULE.write_index(root)
+
+            write_caches(root, [], [{"tag": "puente", "count": 3}])
+            self.assertEqual(MODULE.write_index(root), (1, 1))
+            self.assertFalse((root / "autocomplete" / "no.json").exists())
+            self.assertEqual(MODULE.write_index(root), (1, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
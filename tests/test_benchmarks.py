@@ -0,0 +1,51 @@
+import importlib.util
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BENCHMARKS_DIR = PROJECT_ROOT / "benchmarks"
+sys.path.insert(0, str(BENCHMARKS_DIR))
+MODULE_PATH = BENCHMARKS_DIR / "generators.py"
+SPEC = importlib.util.spec_from_file_location("benchmark_generators", MODULE_PATH)
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+
+class BenchmarkHarnessTest(unittest.TestCase):
+    def test_synthetic_project_has_every_table_the_generators_read(self):
+        with tempfile.TemporaryDirectory() as directory:
+            root = MODULE.build_synthetic_project(Path(directory) / "base", 40)
+
+            with sqlite3.connect(root / "fotos.db") as connection:
+                counts = {
+                    table: connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    for table in ("imagenes", "image_analysis", "bluesky_posts")
+                }
+            self.assertEqual(40, counts["imagenes"])
+            self.assertEqual(40, counts["image_analysis"])
+            self.assertGreater(counts["bluesky_posts"], 0)
+            self.assertEqual(40, len(list((root / "files").glob("*.jpg"))))
+            self.assertTrue((root / "scripts" / "feed-rss.py").is_file())
+
+    def test_runs_are_timed_and_count_the_files_written(self):
+        with tempfile.TemporaryDirectory() as directory:
+            workdir = Path(directory)
+            base = MODULE.build_synthetic_project(workdir / "base", 20)
+
+            results = MODULE.benchmark_generator(base, workdir, 20, "photo-pages")
+
+            self.assertEqual(list(MODULE.PHASES), [result["phase"] for result in results])
+            cold, warm, changed = results
+            self.assertTrue(all(result["returncode"] == 0 for result in results))
+            self.assertGreater(cold["files_written"], 20)
+            self.assertEqual(0, warm["files_written"])
+            self.assertGreater(changed["files_written"], 0)
+            self.assertGreater(cold["peak_rss_kib"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 import importlib.util
 import sqlite3
+import sys
 import tempfile
 import unittest
 from pathlib import Path
@@ -7,6 +8,7 @@ from unittest.mock import patch
 
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scripts"))
 SPEC = importlib.util.spec_from_file_location("bluesky_sync", ROOT / "scripts" / "bluesky-sync.py")
 bluesky_sync = importlib.util.module_from_spec(SPEC)
 SPEC.loader.exec_module(bluesky_sync)
@@ -0,0 +1,100 @@
+import importlib.util
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+SPEC = importlib.util.spec_from_file_location("borrar_foto", SCRIPTS_DIR / "borrar-foto.py")
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+
+class BorrarFotoTest(unittest.TestCase):
+    def create_project(self, root):
+        (root / "files").mkdir()
+        with sqlite3.connect(root / "fotos.db") as connection:
+            connection.executescript(
+                """
+                CREATE TABLE imagenes (id INTEGER PRIMARY KEY, path TEXT);
+                INSERT INTO imagenes VALUES (1, '1.jpg'), (2, '2.jpg'), (3, '3.jpg');
+                """
+            )
+        for name in ("1.jpg", "3.jpg"):
+            (root / "files" / name).write_bytes(b"jpg")
+
+    def remaining_ids(self, root):
+        with sqlite3.connect(root / "fotos.db") as connection:
+            return [row[0] for row in connection.execute("SELECT id FROM imagenes ORDER BY id")]
+
+    def test_deletes_several_photos_and_reports_each_id(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            self.create_project(root)
+
+            outcomes = MODULE.delete_photos([1, 2, 9, 1], root)
+
+            self.assertEqual(list(outcomes), [1, 2, 9])
+            self.assertTrue(outcomes[1].startswith("borrada"))
+            self.assertIn("no existía", outcomes[2])
+            self.assertIn("no se encontró", outcomes[9])
+            self.assertEqual(self.remaining_ids(root), [3])
+            self.assertEqual(sorted(path.name for path in (root / "files").iterdir()), ["3.jpg"])
+
+    def test_files_are_kept_when_the_transaction_fails(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            self.create_project(root)
+            with sqlite3.connect(root / "fotos.db") as connection:
+                connection.execute(
+                    "CREATE TRIGGER refuse BEFORE DELETE ON imagenes WHEN old.id = 3 "
+                    "BEGIN SELECT RAISE(ABORT, 'protegida'); END"
+                )
+
+            with self.assertRaises(sqlite3.Error):
+                MODULE.delete_photos([1, 3], root)
+
+            self.assertEqual(self.remaining_ids(root), [1, 2, 3])
+            self.assertTrue((root / "files" / "1.jpg").exists())
+
+    def test_reads_ids_from_a_file(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            path = Path(temporary) / "ids.txt"
+            path.write_text("12\n\n# spam\n13  # repetida\n", encoding="utf-8")
+
+            self.assertEqual(MODULE.read_ids(str(path)), [12, 13])
+
+            path.write_text("12\nabc\n", encoding="utf-8")
+            with self.assertRaises(ValueError):
+                MODULE.read_ids(str(path))
+
+    def test_republish_runs_once_unless_a_generation_is_running(self):
+        with tempfile.TemporaryDirectory() as temporary, \
+                patch.object(MODULE.publish, "publish") as publish:
+            root = Path(temporary)
+
+            self.assertTrue(MODULE.republish(root))
+            with MODULE.publish.generation_lock(root):
+                self.assertFalse(MODULE.republish(root))
+            self.assertTrue(MODULE.publish.publish_requested(root))
+
+        publish.assert_called_once_with(root, legacy_json=False)
+
+    def test_republish_keeps_the_published_json_format(self):
+        with tempfile.TemporaryDirectory() as temporary, \
+                patch.object(MODULE.publish, "publish") as publish:
+            root = Path(temporary)
+            (root / "data.json").write_text("{}", encoding="utf-8")
+
+            self.assertTrue(MODULE.republish(root))
+
+        publish.assert_called_once_with(root, legacy_json=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import importlib.util
+import json
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+SPEC = importlib.util.spec_from_file_location("change_feed", SCRIPTS_DIR / "change_feed.py")
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+NOW = datetime(2026, 7, 14, 10, 0, tzinfo=timezone.utc)
+
+
+def photo(image_id, title=None):
+    return (image_id, str(image_id), {"title": title or f"Foto {image_id}"})
+
+
+def read(path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+class ChangeFeedTest(unittest.TestCase):
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory()
+        self.root = Path(self.temporary.name)
+        self.directory = self.root / MODULE.CHANGES_DIR
+        self.state = self.root / MODULE.STATE_NAME
+
+    def tearDown(self):
+        self.temporary.cleanup()
+
+    def feed(self):
+        return MODULE.ChangeFeed(self.state, self.directory)
+
+    def events(self, cursor):
+        return [
+            (event["cursor"], event["type"], event["id"])
+            for event in read(self.directory / f"{cursor}.json")["events"]
+        ]
+
+    def test_first_run_records_the_baseline_without_events(self):
+        with self.feed() as feed:
+            self.assertEqual(0, feed.record([photo(1), photo(2)], None, NOW))
+
+        self.assertEqual(
+            {"version": 1, "cursor": 0, "oldest": 0, "segments": []},
+            read(self.directory / MODULE.LATEST_NAME),
+        )
+
+    def test_changes_are_appended_as_segments(self):
+        with self.feed() as feed:
+            feed.record([photo(1), photo(2), photo(3)], None, NOW)
+            self.assertEqual(3, feed.record([photo(2, "Nuevo título"), photo(4)], [2, 3, 4], NOW))
+            # Unchanged photos in the change log produce no events.
+            self.assertEqual(0, feed.record([photo(1)], [1], NOW))
+            self.assertEqual(1, feed.record([photo(1), photo(2, "Nuevo título")], None, NOW))
+
+        self.assertEqual([(1, "updated", "2"), (2, "added", "4"), (3, "removed", "3")], self.events(0))
+        self.assertEqual([(4, "removed", "4")], self.events(3))
+        segment = read(self.directory / "0.json")
+        self.assertEqual({"title": "Nuevo título"}, segment["events"][0]["item"])
+        self.assertNotIn("item", segment["events"][2])
+        latest = read(self.directory / MODULE.LATEST_NAME)
+        self.assertEqual(4, latest["cursor"])
+        self.assertEqual([(0, 3), (3, 4)], [(s["cursor"], s["next"]) for s in latest["segments"]])
+
+    def test_old_segments_are_merged_and_expired(self):
+        with patch.object(MODULE, "MAX_SEGMENTS", 4), self.feed() as feed:
+            feed.record([photo(1)], None, NOW)
+            for version in range(1, 6):
+                feed.record([photo(1, f"v{version}"), photo(version + 1)], [1, version + 1], NOW)
+
+            latest = read(self.directory / MODULE.LATEST_NAME)
+            self.assertEqual([(0, 8), (8, 10)], [(s["cursor"], s["next"]) for s in latest["segments"]])
+            self.assertFalse((self.directory / "2.json").exists())
+            # Only the newest event of photo 1 survives the merge.
+            self.assertEqual(
+                [(2, "added", "2"), (4, "added", "3"), (6, "added", "4"), (7, "updated", "1"), (8, "added", "5")],
+                self.events(0),
+            )
+
+            feed.record([photo(9)], [9], NOW + timedelta(days=MODULE.RETENTION_DAYS + 1))
+
+        latest = read(self.directory / MODULE.LATEST_NAME)
+        self.assertEqual(11, latest["cursor"])
+        self.assertEqual(10, latest["oldest"])
+        self.assertEqual(["10.json", "latest.json"], sorted(path.name for path in self.directory.glob("*.json")))
+
+    def test_lost_state_keeps_the_cursor_and_drops_old_segments(self):
+        with self.feed() as feed:
+            feed.record([photo(1)], None, NOW)
+            feed.record([photo(1), photo(2)], None, NOW)
+        self.state.unlink()
+
+        with self.feed() as feed:
+            self.assertEqual(0, feed.record([photo(1), photo(2)], None, NOW))
+            self.assertEqual(1, feed.record([photo(3)], [3], NOW))
+
+        self.assertFalse((self.directory / "0.json").exists())
+        self.assertEqual([(2, "added", "3")], self.events(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import importlib.util
+import sqlite3
+import sys
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MODULE_PATH = PROJECT_ROOT / "scripts" / "change_log.py"
+SPEC = importlib.util.spec_from_file_location("change_log", MODULE_PATH)
+MODULE = importlib.util.module_from_spec(SPEC)
+sys.modules[SPEC.name] = MODULE
+SPEC.loader.exec_module(MODULE)
+
+
+class ChangeLogTest(unittest.TestCase):
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        self.connection.executescript(
+            """
+            CREATE TABLE imagenes (
+                id INTEGER PRIMARY KEY, path TEXT, date TEXT, author TEXT, description TEXT
+            );
+            CREATE TABLE image_analysis (image_id INTEGER UNIQUE, is_appropriate INTEGER);
+            INSERT INTO imagenes VALUES (1, '1.jpg', '2026-07-14', 'Ana', 'Antes');
+            """
+        )
+        MODULE.install(self.connection)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_triggers_record_every_affected_photo_and_its_path(self):
+        self.connection.executescript(
+            """
+            INSERT INTO imagenes VALUES (2, '2.jpg', '2026-07-15', 'Luis', 'Nueva');
+            INSERT INTO image_analysis VALUES (1, 0);
+            UPDATE imagenes SET path = '1b.jpg' WHERE id = 1;
+            DELETE FROM imagenes WHERE id = 2;
+            """
+        )
+        head, last_seq, signature = MODULE.pending(self.connection, "pages")
+        self.assertIsNone(last_seq)
+        self.assertIsNone(signature)
+        self.assertEqual(
+            set(MODULE.changes_since(self.connection, 0, head)),
+            {(2, "2.jpg"), (1, "1.jpg"), (1, "1b.jpg")},
+        )
+
+    def test_mark_stores_high_water_mark_and_compacts_seen_entries(self):
+        self.connection.execute("UPDATE imagenes SET description = 'Después' WHERE id = 1")
+        head, _, _ = MODULE.pending(self.connection, "pages")
+        MODULE.mark(self.connection, "pages", head, "v1")
+
+        self.assertEqual(MODULE.pending(self.connection, "pages"), (head, head, "v1"))
+        self.assertEqual(MODULE.changes_since(self.connection, head, head), [])
+        self.assertEqual(
+            self.connection.execute("SELECT COUNT(*) FROM photo_changes").fetchone()[0], 0
+        )
+
+        self.connection.execute("INSERT INTO image_analysis VALUES (1, 1)")
+        newer, last_seq, _ = MODULE.pending(self.connection, "pages")
+        self.assertGreater(newer, last_seq)
+        self.assertEqual(MODULE.changes_since(self.connection, last_seq, newer), [(1, "1.jpg")])
+
+    def test_generator_that_stopped_running_does_not_stall_compaction(self):
+        MODULE.mark(self.connection, "retired", 0, "v1")
+        self.connection.execute("UPDATE imagenes SET description = 'Después' WHERE id = 1")
+        self.connection.execute("UPDATE photo_changes SET changed_at = datetime('now', '-31 days')")
+        self.connection.execute("UPDATE imagenes SET author = 'Eva' WHERE id = 1")
+        head, _, _ = MODULE.pending(self.connection, "pages")
+        MODULE.mark(self.connection, "pages", head, "v1")
+
+        self.assertEqual(MODULE.pending(self.connection, "retired"), (head, None, None))
+        self.assertEqual(
+            self.connection.execute("SELECT COUNT(*) FROM photo_changes").fetchone()[0], 0
+        )
+
+    def test_recent_pending_changes_keep_the_generator_state(self):
+        MODULE.mark(self.connection, "feed", 0, "v1")
+        self.connection.execute("UPDATE imagenes SET description = 'Después' WHERE id = 1")
+        head, _, _ = MODULE.pending(self.connection, "pages")
+        MODULE.mark(self.connection, "pages", head, "v1")
+
+        self.assertEqual(MODULE.pending(self.connection, "feed"), (head, 0, "v1"))
+        self.assertEqual(MODULE.changes_since(self.connection, 0, head), [(1, "1.jpg")])
+
+
+if __name__ == "__main__":
+    unittest.main()
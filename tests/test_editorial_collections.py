@@ -1,12 +1,15 @@
 import importlib.util
 import json
 import sqlite3
+import sys
 import unittest
 from pathlib import Path
 
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
-MODULE_PATH = PROJECT_ROOT / "scripts" / "generate_editorial_collections.py"
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+MODULE_PATH = SCRIPTS_DIR / "generate_editorial_collections.py"
 SPEC = importlib.util.spec_from_file_location("generate_editorial_collections", MODULE_PATH)
 MODULE = importlib.util.module_from_spec(SPEC)
 SPEC.loader.exec_module(MODULE)
@@ -268,7 +271,7 @@ class EditorialCollectionsTest(unittest.TestCase):
             self.assertIn("bottom-navigation-four", content)
 
     def test_sitemap_exposes_editorial_routes(self):
-        sitemap = (PROJECT_ROOT / "sitemap.xml").read_text(encoding="utf-8")
+        sitemap = (PROJECT_ROOT / "sitemaps" / "pages.xml").read_text(encoding="utf-8")
         self.assertIn("https://fotos.aldeapucela.org/miradas/", sitemap)
         for collection in self.collections:
             self.assertIn(
@@ -1,4 +1,5 @@
 import importlib.util
+import json
 import shutil
 import sqlite3
 import sys
@@ -46,6 +47,9 @@ class IncrementalFeedTest(unittest.TestCase):
             outputs = [
                 root / "feed.xml",
                 root / "data.json",
+                root / "data" / "index.json",
+                root / "data" / "page-0001.json",
+                root / "changes" / "latest.json",
                 root / "sitemap.xml",
                 root / "f" / "1" / "index.html",
             ]
@@ -54,6 +58,12 @@ class IncrementalFeedTest(unittest.TestCase):
             MODULE.generate_rss(root)
             self.assertEqual(mtimes, {path: path.stat().st_mtime_ns for path in outputs})
 
+            MODULE.generate_rss(root, legacy_json=False)
+            self.assertFalse((root / "data.json").exists())
+            self.assertFalse((root / "data.json.gz").exists())
+            page = json.loads((root / "data" / "page-0001.json").read_text(encoding="utf-8"))
+            self.assertEqual("Foto estable", page["items"][0]["title"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -3,15 +3,22 @@ import re
 import shutil
 import sqlite3
 import stat
+import sys
 import tempfile
+import threading
+import time
 import unittest
 from pathlib import Path
+from unittest.mock import patch
 
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
-MODULE_PATH = PROJECT_ROOT / "scripts" / "generate_photo_pages.py"
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+MODULE_PATH = SCRIPTS_DIR / "generate_photo_pages.py"
 SPEC = importlib.util.spec_from_file_location("generate_photo_pages", MODULE_PATH)
 MODULE = importlib.util.module_from_spec(SPEC)
+sys.modules[SPEC.name] = MODULE
 SPEC.loader.exec_module(MODULE)
 
 
@@ -149,8 +156,14 @@ class StaticPhotoPagesTest(unittest.TestCase):
         self.assertIn("grid-column: 1 / -1", styles)
 
     def test_sitemap_contains_photo_url(self):
-        sitemap = (PROJECT_ROOT / "sitemap.xml").read_text(encoding="utf-8")
-        self.assertIn("https://fotos.aldeapucela.org/f/184500/", sitemap)
+        index = (PROJECT_ROOT / "sitemap-index.xml").read_text(encoding="utf-8")
+        self.assertEqual(index, (PROJECT_ROOT / "sitemap.xml").read_text(encoding="utf-8"))
+        self.assertIn("https://fotos.aldeapucela.org/sitemaps/pages.xml", index)
+        shards = "".join(
+            path.read_text(encoding="utf-8")
+            for path in sorted((PROJECT_ROOT / "sitemaps").glob("photos-*.xml"))
+        )
+        self.assertIn("https://fotos.aldeapucela.org/f/184500/", shards)
 
     def test_generated_directory_is_web_server_traversable(self):
         mode = stat.S_IMODE((PROJECT_ROOT / "f").stat().st_mode)
@@ -210,6 +223,166 @@ class StaticPhotoPagesTest(unittest.TestCase):
             self.assertIn("Segunda foto modificada", second_page.read_text(encoding="utf-8"))
             self.assertFalse(first_page.parent.exists())
 
+            # Replacing the file alone leaves no entry in the change log, and
+            # only an explicit check stats the images.
+            shutil.copyfile(PROJECT_ROOT / "files" / "184500.jpg", root / "files" / "2.jpg")
+            with patch.object(MODULE, "render_photo_page") as render, \
+                    patch.object(MODULE.ImageMetadataCache, "replaced") as replaced:
+                MODULE.generate_photo_pages(root)
+            render.assert_not_called()
+            replaced.assert_not_called()
+            with patch.object(MODULE, "render_photo_page", wraps=MODULE.render_photo_page) as render:
+                MODULE.generate_photo_pages(root, check_files=True)
+            self.assertEqual(["2"], [call.args[2] for call in render.call_args_list])
+            with patch.object(MODULE, "render_photo_page") as render:
+                MODULE.generate_photo_pages(root, check_files=True)
+            render.assert_not_called()
+
+    def test_runs_only_read_the_photos_recorded_in_the_change_log(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            (root / "index.html").write_text(
+                "<html><head>\n<!-- SOCIAL_META_START -->\n"
+                "<title>Plantilla</title>\n<!-- SOCIAL_META_END -->\n"
+                "</head><body></body></html>",
+                encoding="utf-8",
+            )
+            with sqlite3.connect(root / "fotos.db") as connection:
+                connection.executescript(
+                    """
+                    CREATE TABLE imagenes (
+                        id INTEGER PRIMARY KEY, path TEXT, date TEXT,
+                        author TEXT, description TEXT
+                    );
+                    CREATE TABLE image_analysis (
+                        image_id INTEGER, is_appropriate INTEGER
+                    );
+                    INSERT INTO imagenes VALUES
+                        (1, '1.jpg', '2026-07-14T10:00:00+02:00', 'Ana', 'Primera'),
+                        (2, '2.jpg', '2026-07-14T11:00:00+02:00', 'Luis', 'Segunda');
+                    """
+                )
+            self.assertEqual(2, MODULE.generate_photo_pages(root))
+
+            with patch.object(MODULE.Snapshot, "load") as full_scan, \
+                 patch.object(MODULE, "render_photo_page") as render:
+                self.assertEqual(2, MODULE.generate_photo_pages(root))
+            full_scan.assert_not_called()
+            render.assert_not_called()
+
+            with sqlite3.connect(root / "fotos.db") as connection:
+                connection.execute("INSERT INTO image_analysis VALUES (1, 0)")
+                connection.execute("UPDATE imagenes SET description = 'Segunda editada' WHERE id = 2")
+
+            with patch.object(MODULE, "render_photo_page", wraps=MODULE.render_photo_page) as render:
+                self.assertEqual(1, MODULE.generate_photo_pages(root))
+            self.assertEqual(["2"], [call.args[2] for call in render.call_args_list])
+            self.assertFalse((root / "f" / "1").exists())
+            self.assertIn("Segunda editada", (root / "f" / "2" / "index.html").read_text(encoding="utf-8"))
+
+    def test_parallel_build_matches_sequential_build(self):
+        outputs = {}
+        with tempfile.TemporaryDirectory() as temporary:
+            for jobs in (1, 3):
+                root = Path(temporary) / f"jobs-{jobs}"
+                (root / "files").mkdir(parents=True)
+                (root / "index.html").write_text(
+                    "<html><head>\n  <!-- SOCIAL_META_START -->\n"
+                    "  <title>Plantilla</title>\n  <!-- SOCIAL_META_END -->\n"
+                    "</head><body></body></html>",
+                    encoding="utf-8",
+                )
+                shutil.copy2(PROJECT_ROOT / "files" / "184500.jpg", root / "files" / "1.jpg")
+                shutil.copy2(PROJECT_ROOT / "files" / "184440.jpg", root / "files" / "2.jpg")
+                with sqlite3.connect(root / "fotos.db") as connection:
+                    connection.executescript(
+                        """
+                        CREATE TABLE imagenes (
+                            id INTEGER PRIMARY KEY, path TEXT, date TEXT,
+                            author TEXT, description TEXT
+                        );
+                        CREATE TABLE image_analysis (
+                            image_id INTEGER, is_appropriate INTEGER
+                        );
+                        """
+                    )
+                    connection.executemany(
+                        "INSERT INTO imagenes VALUES (?, ?, ?, ?, ?)",
+                        [
+                            (
+                                photo_id,
+                                f"{photo_id}.jpg",
+                                f"2026-07-14T10:{photo_id:02d}:00+02:00",
+                                "Ana",
+                                f"Foto {photo_id} #valladolid",
+                            )
+                            for photo_id in range(1, 8)
+                        ],
+                    )
+
+                with patch.object(MODULE, "PARALLEL_CHUNK_SIZE", 2):
+                    self.assertEqual(7, MODULE.generate_photo_pages(root, jobs=jobs))
+                outputs[jobs] = {
+                    path.relative_to(root): path.read_bytes()
+                    for path in sorted(root.rglob("*"))
+                    if path.is_file()
+                    and path.parent != root / "files"
+                    and path.name not in {".image-metadata.sqlite", MODULE.MANIFEST_NAME}
+                }
+                with sqlite3.connect(root / MODULE.MANIFEST_NAME) as connection:
+                    outputs[jobs]["manifest"] = connection.execute(
+                        "SELECT * FROM pages ORDER BY photo_id"
+                    ).fetchall()
+
+        self.assertEqual(outputs[1], outputs[3])
+
+    def test_parallel_build_starts_while_a_large_file_is_compressing(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            (root / "index.html").write_text(
+                "<html><head>\n<!-- SOCIAL_META_START -->\n"
+                "<title>Plantilla</title>\n<!-- SOCIAL_META_END -->\n"
+                "</head><body></body></html>",
+                encoding="utf-8",
+            )
+            with sqlite3.connect(root / "fotos.db") as connection:
+                connection.executescript(
+                    """
+                    CREATE TABLE imagenes (
+                        id INTEGER PRIMARY KEY, path TEXT, date TEXT,
+                        author TEXT, description TEXT
+                    );
+                    CREATE TABLE image_analysis (
+                        image_id INTEGER, is_appropriate INTEGER
+                    );
+                    INSERT INTO imagenes VALUES
+                        (1, '1.jpg', '2026-07-14T10:00:00+02:00', 'Ana', 'Primera'),
+                        (2, '2.jpg', '2026-07-14T11:00:00+02:00', 'Luis', 'Segunda');
+                    """
+                )
+            # Like data.json, written by the feed right before the pages.
+            data = root / "data.json"
+            data.write_bytes(b" " * MODULE.precompress.POOL_THRESHOLD)
+            compress_stream = MODULE.precompress._compress_stream
+
+            def slow_compress_stream(path, mode):
+                time.sleep(0.5)
+                compress_stream(path, mode)
+
+            with patch.object(MODULE.precompress, "_compress_stream", slow_compress_stream):
+                MODULE.precompress.compress_file(data)
+
+            # The workers used to wait for it in a pool that was not forked.
+            result = []
+            thread = threading.Thread(
+                target=lambda: result.append(MODULE.generate_photo_pages(root, jobs=2)), daemon=True
+            )
+            thread.start()
+            thread.join(60)
+            self.assertFalse(thread.is_alive())
+            self.assertEqual([2], result)
+            self.assertTrue(data.with_name("data.json.gz").is_file())
+
 
 if __name__ == "__main__":
     unittest.main()
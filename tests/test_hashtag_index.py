@@ -0,0 +1,112 @@
+import importlib.util
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+SPEC = importlib.util.spec_from_file_location("hashtag_index", SCRIPTS_DIR / "hashtag_index.py")
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+
+class HashtagIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        self.connection.executescript(
+            """
+            CREATE TABLE imagenes (
+                id INTEGER PRIMARY KEY, path TEXT, date TEXT, author TEXT, description TEXT
+            );
+            CREATE TABLE image_analysis (image_id INTEGER UNIQUE, is_appropriate INTEGER);
+            INSERT INTO imagenes VALUES
+                (1, '1.jpg', '2026-07-01', 'Ana', 'Orillas del #Pisuerga'),
+                (2, '2.jpg', '2026-07-03', 'Luis', 'El #pisuerga y el #Río #rio'),
+                (3, '3.jpg', '2026-07-02', 'Eva', 'Sin etiquetas'),
+                (4, '4.jpg', '2026-07-04', 'Ana', 'Oculta #pisuerga');
+            INSERT INTO image_analysis VALUES (4, 0);
+            """
+        )
+
+    def tearDown(self):
+        self.connection.close()
+
+    def counts(self, tags=None):
+        return {
+            entry["normalized_tag"]: (entry["tag"], entry["count"], entry["latest_photos"])
+            for entry in MODULE.tag_counts(self.connection, tags)
+        }
+
+    def test_counts_public_hashtags_newest_first(self):
+        self.assertEqual(MODULE.sync(self.connection), 3)
+
+        self.assertEqual(
+            self.counts(),
+            {
+                "#pisuerga": ("#pisuerga", 2, ["2.jpg", "1.jpg"]),
+                "#rio": ("#río", 2, ["2.jpg", "2.jpg"]),
+            },
+        )
+        self.assertEqual(list(self.counts(["#rio"])), ["#rio"])
+
+    def test_sync_only_rescans_changed_photos(self):
+        MODULE.sync(self.connection)
+        self.assertEqual(MODULE.sync(self.connection), 0)
+
+        self.connection.executescript(
+            """
+            UPDATE imagenes SET description = 'Atardecer #Pisuerga' WHERE id = 3;
+            UPDATE image_analysis SET is_appropriate = 1 WHERE image_id = 4;
+            DELETE FROM imagenes WHERE id = 2;
+            """
+        )
+        self.assertEqual(MODULE.sync(self.connection), 2)
+
+        self.assertEqual(
+            self.counts(),
+            {"#pisuerga": ("#pisuerga", 3, ["4.jpg", "3.jpg", "1.jpg"])},
+        )
+        self.assertEqual(
+            self.connection.execute("SELECT COUNT(*) FROM photo_hashtags WHERE image_id = 2").fetchone()[0],
+            0,
+        )
+
+    def test_rejected_photos_are_not_counted(self):
+        # update-tags.py used to count every description; the cache now only
+        # shows photos that are public, like the rest of the site.
+        self.connection.execute("INSERT INTO image_analysis VALUES (1, 0)")
+        MODULE.sync(self.connection)
+
+        self.assertEqual(
+            self.counts(),
+            {
+                "#pisuerga": ("#pisuerga", 1, ["2.jpg"]),
+                "#rio": ("#río", 2, ["2.jpg", "2.jpg"]),
+            },
+        )
+
+    def test_idle_sync_does_not_take_the_write_lock(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            db_path = Path(temporary) / "fotos.db"
+            self.connection.execute("VACUUM INTO ?", (str(db_path),))
+            connection = sqlite3.connect(db_path, timeout=0)
+            writer = sqlite3.connect(db_path, isolation_level=None)
+            try:
+                self.assertEqual(MODULE.sync(connection), 3)
+                cookie = connection.execute("PRAGMA schema_version").fetchone()[0]
+
+                writer.execute("BEGIN IMMEDIATE")
+                self.assertEqual(MODULE.sync(connection), 0)
+                writer.execute("ROLLBACK")
+                self.assertEqual(cookie, connection.execute("PRAGMA schema_version").fetchone()[0])
+            finally:
+                writer.close()
+                connection.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import importlib.util
+import struct
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MODULE_PATH = PROJECT_ROOT / "scripts" / "image_metadata.py"
+SPEC = importlib.util.spec_from_file_location("image_metadata", MODULE_PATH)
+MODULE = importlib.util.module_from_spec(SPEC)
+sys.modules[SPEC.name] = MODULE
+SPEC.loader.exec_module(MODULE)
+
+
+def jpeg(width, height, orientation=None):
+    segments = b""
+    if orientation is not None:
+        tiff = b"MM" + struct.pack(">HI", 42, 8) + struct.pack(">H", 1)
+        tiff += struct.pack(">HHIHH", 0x0112, 3, 1, orientation, 0) + struct.pack(">I", 0)
+        exif = b"Exif\x00\x00" + tiff
+        segments += b"\xff\xe1" + struct.pack(">H", len(exif) + 2) + exif
+    frame = b"\x08" + struct.pack(">HH", height, width) + b"\x01\x01\x11\x00"
+    segments += b"\xff\xc0" + struct.pack(">H", len(frame) + 2) + frame
+    return b"\xff\xd8" + segments + b"\xff\xd9"
+
+
+class ImageMetadataTest(unittest.TestCase):
+    def test_jpeg_dimensions_follow_exif_orientation(self):
+        metadata = MODULE.parse_image_header(jpeg(4000, 3000, orientation=6))
+        self.assertEqual(metadata, MODULE.ImageMetadata(4000, 3000, 6, "jpeg"))
+        self.assertEqual(metadata.display_dimensions, (3000, 4000))
+        self.assertEqual(MODULE.parse_image_header(jpeg(800, 600)).display_dimensions, (800, 600))
+
+    def test_png_and_webp_headers_are_supported(self):
+        png = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", 640, 480)
+        vp8l_bits = (1199 & 0x3FFF) | ((629 & 0x3FFF) << 14)
+        webp = b"RIFF" + b"\x00" * 4 + b"WEBPVP8L" + b"\x00" * 4 + b"\x2f" + vp8l_bits.to_bytes(4, "little")
+        vp8x = (b"RIFF" + b"\x00" * 4 + b"WEBPVP8X" + b"\x00" * 8
+                + (99).to_bytes(3, "little") + (49).to_bytes(3, "little"))
+
+        self.assertEqual(MODULE.parse_image_header(png), MODULE.ImageMetadata(640, 480, 1, "png"))
+        self.assertEqual(MODULE.parse_image_header(webp), MODULE.ImageMetadata(1200, 630, 1, "webp"))
+        self.assertEqual(MODULE.parse_image_header(vp8x).mime_type, "image/webp")
+        self.assertIsNone(MODULE.parse_image_header(b"GIF89a"))
+
+    def test_cached_metadata_does_not_reopen_unchanged_images(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            image = root / "1.jpg"
+            image.write_bytes(jpeg(800, 600))
+            with MODULE.ImageMetadataCache(root / MODULE.CACHE_NAME) as cache:
+                self.assertEqual(cache.get(image).display_dimensions, (800, 600))
+                cache.flush()
+
+            with MODULE.ImageMetadataCache(root / MODULE.CACHE_NAME) as cache, \
+                 patch.object(MODULE, "read_image_metadata") as read:
+                self.assertEqual(cache.get(image).display_dimensions, (800, 600))
+            read.assert_not_called()
+
+            image.write_bytes(jpeg(1024, 768))
+            with MODULE.ImageMetadataCache(root / MODULE.CACHE_NAME) as cache:
+                self.assertEqual(cache.get(image).display_dimensions, (1024, 768))
+
+
+if __name__ == "__main__":
+    unittest.main()
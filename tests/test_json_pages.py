@@ -0,0 +1,78 @@
+import importlib.util
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+SPEC = importlib.util.spec_from_file_location("json_pages", SCRIPTS_DIR / "json_pages.py")
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+
+def photos(count):
+    return [
+        (f"2026-07-{day:02d}T10:00:00+02:00", {"title": f"Foto {day}", "guid": f"{day}.jpg"})
+        for day in range(1, count + 1)
+    ]
+
+
+class JsonPagesTest(unittest.TestCase):
+    def test_new_photo_only_rewrites_the_last_page_and_the_index(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            self.assertEqual((3, 3), MODULE.write_pages(root, photos(5), page_size=2))
+            directory = root / MODULE.PAGES_DIR
+            mtimes = {path.name: path.stat().st_mtime_ns for path in directory.glob("*.json")}
+
+            self.assertEqual((3, 1), MODULE.write_pages(root, photos(6), page_size=2))
+            changed = sorted(
+                path.name for path in directory.glob("*.json")
+                if path.stat().st_mtime_ns != mtimes[path.name]
+            )
+            self.assertEqual(["index.json", "page-0003.json"], changed)
+
+            index = json.loads((directory / "index.json").read_text(encoding="utf-8"))
+            self.assertEqual(6, index["total"])
+            self.assertEqual([2, 2, 2], [page["count"] for page in index["pages"]])
+            self.assertEqual("2026-07-05T10:00:00+02:00", index["pages"][2]["first"])
+            page = json.loads((directory / "page-0003.json").read_text(encoding="utf-8"))
+            self.assertEqual(3, page["page"])
+            self.assertEqual(["Foto 5", "Foto 6"], [item["title"] for item in page["items"]])
+
+    def test_stale_pages_are_removed(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            MODULE.write_pages(root, photos(5), page_size=2)
+            MODULE.write_pages(root, photos(2), page_size=2)
+
+            directory = root / MODULE.PAGES_DIR
+            self.assertEqual(["page-0001.json"], sorted(path.name for path in directory.glob("page-*.json")))
+            self.assertFalse((directory / "page-0002.json.gz").exists())
+
+    def test_first_page_keeps_the_earlier_pages(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            MODULE.write_pages(root, photos(5), page_size=2)
+            directory = root / MODULE.PAGES_DIR
+            first = (directory / "page-0001.json").stat().st_mtime_ns
+            remaining = [photo for photo in photos(5) if photo[1]["guid"] != "3.jpg"]
+
+            self.assertEqual((2, 1), MODULE.write_pages(root, remaining[2:], page_size=2, first_page=2))
+            self.assertEqual(first, (directory / "page-0001.json").stat().st_mtime_ns)
+            self.assertFalse((directory / "page-0003.json").exists())
+            index = (directory / "index.json").read_text(encoding="utf-8")
+
+            self.assertEqual((2, 0), MODULE.write_pages(root, remaining, page_size=2))
+            self.assertEqual(index, (directory / "index.json").read_text(encoding="utf-8"))
+
+            with self.assertRaises(ValueError):
+                MODULE.write_pages(root, remaining, page_size=2, first_page=4)
+
+
+if __name__ == "__main__":
+    unittest.main()
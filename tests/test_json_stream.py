@@ -0,0 +1,101 @@
+import importlib.util
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+SPEC = importlib.util.spec_from_file_location("json_stream", SCRIPTS_DIR / "json_stream.py")
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+
+def feed(items):
+    return [{"rss": {"version": "2.0", "channel": {"title": "Fotos", "lastBuildDate": "hoy", "item": items}}}]
+
+
+ITEMS = [
+    {"title": "Plaza Mayor #pucela", "link": "https://fotos.aldeapucela.org/f/1/", "pubDate": "Tue"},
+    {"title": "Ñandú en el Campo Grande", "description": "<p>\"comillas\"\nsalto</p>", "tags": ["río", 1]},
+    {"title": "Vacío", "nested": {"list": [], "object": {}}},
+]
+
+
+class JsonStreamTest(unittest.TestCase):
+    def test_output_matches_json_dumps(self):
+        for items in (ITEMS, ITEMS[:1], []):
+            with self.subTest(items=len(items)):
+                expected = json.dumps(feed(items), ensure_ascii=False, indent=2) + "\n"
+                streamed = "".join(MODULE.encode(feed(MODULE.ITEMS), iter(items)))
+                self.assertEqual(expected, streamed)
+
+    def test_top_level_list(self):
+        expected = json.dumps(ITEMS, ensure_ascii=False, indent=2) + "\n"
+        self.assertEqual(expected, "".join(MODULE.encode(MODULE.ITEMS, ITEMS)))
+
+    def test_placeholder_is_required_once(self):
+        with self.assertRaises(ValueError):
+            list(MODULE.encode({"item": []}, ITEMS))
+        with self.assertRaises(ValueError):
+            list(MODULE.encode([MODULE.ITEMS, MODULE.ITEMS], ITEMS))
+
+    def test_items_are_read_back_as_encoded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "data.json"
+            for items in (ITEMS, []):
+                with self.subTest(items=len(items)):
+                    MODULE.write_if_changed(path, MODULE.encode(feed(MODULE.ITEMS), items))
+                    head, padding, tail = MODULE.layout(
+                        [{"rss": {"version": "2.0", "channel": {
+                            "title": "Fotos", "lastBuildDate": "mañana", "item": MODULE.ITEMS
+                        }}}]
+                    )
+                    encoded = list(MODULE.read_items(path, head, padding))
+                    self.assertEqual([MODULE.encode_item(item, padding) for item in items], encoded)
+
+                    expected = feed(items)
+                    expected[0]["rss"]["channel"]["lastBuildDate"] = "mañana"
+                    self.assertEqual(
+                        json.dumps(expected, ensure_ascii=False, indent=2) + "\n",
+                        "".join(MODULE.assemble(head, padding, tail, encoded)),
+                    )
+
+            path.write_text("{}\n", encoding="utf-8")
+            with self.assertRaises(ValueError):
+                list(MODULE.read_items(path, head, padding))
+
+    def test_unchanged_content_keeps_the_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "data.json"
+            self.assertTrue(MODULE.write_if_changed(path, MODULE.encode(feed(MODULE.ITEMS), ITEMS)))
+            MODULE.precompress.drain()
+            mtime = path.stat().st_mtime_ns
+
+            self.assertFalse(MODULE.write_if_changed(path, MODULE.encode(feed(MODULE.ITEMS), ITEMS)))
+            self.assertEqual(mtime, path.stat().st_mtime_ns)
+            self.assertTrue(path.with_name("data.json.gz").is_file())
+
+            self.assertTrue(MODULE.write_if_changed(path, MODULE.encode(feed(MODULE.ITEMS), ITEMS[:1])))
+            MODULE.precompress.drain()
+            self.assertEqual(feed(ITEMS[:1]), json.loads(path.read_text(encoding="utf-8")))
+
+    def test_failed_writes_keep_the_previous_file(self):
+        def broken_items():
+            yield ITEMS[0]
+            raise RuntimeError("cursor roto")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "data.json"
+            path.write_text("[]\n", encoding="utf-8")
+            with self.assertRaises(RuntimeError):
+                MODULE.write_if_changed(path, MODULE.encode(feed(MODULE.ITEMS), broken_items()))
+            self.assertEqual("[]\n", path.read_text(encoding="utf-8"))
+            self.assertEqual(["data.json"], [p.name for p in Path(directory).iterdir()])
+
+
+if __name__ == "__main__":
+    unittest.main()
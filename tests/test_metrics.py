@@ -0,0 +1,75 @@
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MODULE_PATH = PROJECT_ROOT / "scripts" / "metrics.py"
+SPEC = importlib.util.spec_from_file_location("metrics", MODULE_PATH)
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        MODULE.reset()
+
+    def test_run_exports_a_textfile_and_json_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_path = Path(directory) / "metrics.jsonl"
+            environment = {
+                MODULE.METRICS_DIR_ENV: directory,
+                MODULE.METRICS_LOG_ENV: str(log_path),
+            }
+            with patch.dict(os.environ, environment):
+                with MODULE.run("feed_rss"):
+                    with MODULE.stage("db_query"):
+                        pass
+                    MODULE.add_time("render", 0.5, calls=10)
+                    MODULE.increment("http_errors", status=503)
+                    MODULE.increment("http_errors", status=503)
+
+            textfile = (Path(directory) / "fotos_feed_rss.prom").read_text(encoding="utf-8")
+            self.assertIn('fotos_run_success{job="feed_rss"} 1', textfile)
+            self.assertIn('fotos_stage_seconds{job="feed_rss",stage="render"} 0.5', textfile)
+            self.assertIn('fotos_stage_calls{job="feed_rss",stage="render"} 10', textfile)
+            self.assertIn('fotos_http_errors{job="feed_rss",status="503"} 2', textfile)
+            self.assertIn("# TYPE fotos_stage_seconds gauge", textfile)
+
+            events = [json.loads(line) for line in log_path.read_text(encoding="utf-8").splitlines()]
+            self.assertEqual(["stage", "run"], [event["event"] for event in events])
+            self.assertEqual("feed_rss", events[0]["job"])
+            self.assertEqual(10, events[1]["stages"]["render"]["calls"])
+            self.assertEqual("ok", events[1]["status"])
+
+    def test_failed_runs_are_exported_as_errors(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with patch.dict(os.environ, {MODULE.METRICS_DIR_ENV: directory}):
+                with self.assertRaises(SystemExit):
+                    with MODULE.run("bluesky_sync"):
+                        raise SystemExit(1)
+
+            textfile = (Path(directory) / "fotos_bluesky_sync.prom").read_text(encoding="utf-8")
+            self.assertIn('fotos_run_success{job="bluesky_sync"} 0', textfile)
+
+    def test_worker_snapshots_are_merged(self):
+        MODULE.add_time("render", 1.0, calls=2)
+        values = MODULE.snapshot()
+        MODULE.reset()
+        MODULE.add_time("render", 0.25)
+        MODULE.increment("files_written", 3)
+
+        MODULE.merge(values)
+        MODULE.merge(({}, {("files_written", ()): 2}))
+
+        stages, counters = MODULE.snapshot()
+        self.assertEqual([3, 1.25, 1.0], stages["render"])
+        self.assertEqual(5, counters[("files_written", ())])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,6 +9,7 @@ from unittest.mock import patch
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
 SPEC = importlib.util.spec_from_file_location(
     "moderar_foto", SCRIPTS_DIR / "moderar-foto.py"
 )
@@ -56,28 +57,35 @@ class ModerarFotoTest(unittest.TestCase):
 
             self.assertIsNone(MODULE.set_appropriateness(db_path, 999, True))
 
-    @patch.object(MODULE.subprocess, "run")
-    def test_regeneration_runs_the_public_generators(self, run):
-        root = Path("/tmp/fotos-test")
-
-        MODULE.regenerate_public_files(root)
-
-        self.assertEqual(
-            run.call_args_list,
-            [
-                unittest.mock.call(
-                    (sys.executable, str(root / "scripts" / "feed-rss.py")),
-                    cwd=root,
-                    check=True,
-                ),
-                unittest.mock.call(
-                    (sys.executable, str(root / "scripts" / "update-ai-tags.py")),
-                    cwd=root,
-                    check=True,
-                ),
-            ],
-        )
+    def test_regeneration_publishes_in_process(self):
+        with tempfile.TemporaryDirectory() as temporary, \
+                patch.object(MODULE.publish, "publish") as publish:
+            root = Path(temporary)
 
+            self.assertTrue(MODULE.regenerate_public_files(root))
+
+        publish.assert_called_once_with(root)
+
+    def test_regeneration_of_one_photo_is_targeted(self):
+        with tempfile.TemporaryDirectory() as temporary, \
+                patch.object(MODULE.publish, "republish") as republish:
+            root = Path(temporary)
+
+            self.assertTrue(MODULE.regenerate_public_files(root, 42, 7))
+
+        republish.assert_called_once_with(root, 42, 7)
+
+    def test_regeneration_is_left_to_a_running_generation(self):
+        with tempfile.TemporaryDirectory() as temporary, \
+                patch.object(MODULE.publish, "publish") as publish:
+            root = Path(temporary)
+            with MODULE.publish.generation_lock(root) as acquired:
+                self.assertTrue(acquired)
+                self.assertFalse(MODULE.regenerate_public_files(root))
+            # The holder is asked for a full publish, tag caches included.
+            self.assertTrue(MODULE.publish.publish_requested(root))
+
+        publish.assert_not_called()
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,49 @@
+import importlib.util
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MODULE_PATH = PROJECT_ROOT / "scripts" / "page_manifest.py"
+SPEC = importlib.util.spec_from_file_location("page_manifest", MODULE_PATH)
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+
+class PageManifestTests(unittest.TestCase):
+    def test_adopts_the_json_manifest_and_existing_pages(self):
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            (root / "f" / "3").mkdir(parents=True)
+            legacy = root / "manifest.json"
+            legacy.write_text(json.dumps({"pages": {"1": "a", "2": "b"}}), encoding="utf-8")
+
+            with MODULE.PageManifest(root / "manifest.sqlite", root / "f", legacy) as manifest:
+                self.assertTrue(manifest.created)
+                self.assertEqual({"1": "a", "2": "b", "3": ""}, manifest.signatures(["1", "2", "3", "4"]))
+            self.assertFalse(legacy.exists())
+
+            with MODULE.PageManifest(root / "manifest.sqlite", root / "f", legacy) as manifest:
+                self.assertFalse(manifest.created)
+                self.assertEqual(3, manifest.count())
+
+    def test_full_build_removes_the_pages_it_did_not_see(self):
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            with MODULE.PageManifest(root / "manifest.sqlite", root / "f") as manifest:
+                manifest.update([("1", "a"), ("2", "b"), ("3", "c")])
+                manifest.begin_full_build()
+                manifest.mark_seen(["1"])
+                manifest.mark_seen(["3"])
+                self.assertEqual(["2"], manifest.unseen())
+                manifest.remove(manifest.unseen())
+                self.assertEqual(2, manifest.count())
+
+                with self.assertRaises(RuntimeError):
+                    manifest.mark_seen(["1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import importlib.util
+import re
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MODULE_PATH = PROJECT_ROOT / "scripts" / "page_template.py"
+SPEC = importlib.util.spec_from_file_location("page_template", MODULE_PATH)
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+META_RE = re.compile(r"[ \t]*<!-- META_START -->.*?<!-- META_END -->", re.DOTALL)
+SLUG_RE = re.compile(re.escape('data-slug=""'))
+TEMPLATE = (
+    "<html><head>\n  <!-- META_START -->\n  <title>Plantilla</title>\n"
+    '  <!-- META_END -->\n</head><body data-slug=""><!-- META_START --></body></html>'
+)
+
+
+class PageTemplateTest(unittest.TestCase):
+    def test_rendering_matches_a_single_regex_substitution(self):
+        template = MODULE.PageTemplate(TEMPLATE, {"slug": SLUG_RE, "meta": META_RE})
+        meta = "  <title>Foto</title>"
+        expected = META_RE.sub(meta, TEMPLATE, count=1).replace('data-slug=""', 'data-slug="a"', 1)
+        self.assertEqual(template.render(meta=meta, slug='data-slug="a"'), expected)
+
+    def test_values_are_inserted_literally(self):
+        template = MODULE.PageTemplate(TEMPLATE, {"meta": META_RE})
+        for value in (r"C:\fotos\1", r"salto\n", r"doble\\", r"\d"):
+            self.assertIn(value, template.render(meta=value))
+
+    def test_missing_slot_is_rejected(self):
+        with self.assertRaises(ValueError):
+            MODULE.PageTemplate("<html></html>", {"meta": META_RE})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import gzip
+import importlib.util
+import os
+import sys
+import tempfile
+import types
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+MODULE_PATH = SCRIPTS_DIR / "precompress.py"
+SPEC = importlib.util.spec_from_file_location("precompress", MODULE_PATH)
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+
+class PrecompressTest(unittest.TestCase):
+    def test_siblings_hold_the_compressed_source(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "data.json"
+            path.write_text('{"fotos": []}\n' * 100, encoding="utf-8")
+
+            MODULE.compress_file(path)
+
+            sibling = path.with_name("data.json.gz")
+            self.assertEqual(path.read_bytes(), gzip.decompress(sibling.read_bytes()))
+            self.assertEqual(path.stat().st_mtime_ns, sibling.stat().st_mtime_ns)
+            if MODULE.brotli is not None:
+                brotli_sibling = path.with_name("data.json.br")
+                self.assertEqual(path.read_bytes(), MODULE.brotli.decompress(brotli_sibling.read_bytes()))
+
+    def test_large_files_are_compressed_by_the_pool(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "feed.xml"
+            path.write_text("<rss>" + "<item/>" * 100 + "</rss>\n", encoding="utf-8")
+
+            # Large files are read in blocks; a tiny block size exercises that.
+            with patch.object(MODULE, "POOL_THRESHOLD", 0), patch.object(MODULE, "READ_CHUNK", 64):
+                MODULE.compress_file(path)
+                MODULE.drain()
+
+            sibling = path.with_name("feed.xml.gz")
+            self.assertEqual(path.read_bytes(), gzip.decompress(sibling.read_bytes()))
+            self.assertEqual(path.stat().st_mtime_ns, sibling.stat().st_mtime_ns)
+
+    def test_ensure_siblings_only_compresses_when_one_is_missing(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "index.html"
+            path.write_text("<html></html>\n", encoding="utf-8")
+            MODULE.compress_file(path)
+
+            with patch.object(MODULE, "compress_file") as compress_file:
+                MODULE.ensure_siblings(path)
+                compress_file.assert_not_called()
+
+                path.with_name("index.html.gz").unlink()
+                MODULE.ensure_siblings(path)
+                compress_file.assert_called_once_with(path, 0o644)
+
+    def test_ensure_siblings_replaces_siblings_of_an_older_source(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "index.html"
+            path.write_text("<html>antes</html>\n", encoding="utf-8")
+            MODULE.compress_file(path)
+            # A run that stopped after replacing the source left these behind.
+            path.write_text("<html>después</html>\n", encoding="utf-8")
+            mtime_ns = path.stat().st_mtime_ns + 1_000_000_000
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+
+            MODULE.ensure_siblings(path)
+
+            sibling = path.with_name("index.html.gz")
+            self.assertEqual(path.read_bytes(), gzip.decompress(sibling.read_bytes()))
+            self.assertEqual(path.stat().st_mtime_ns, sibling.stat().st_mtime_ns)
+
+    def test_brotli_siblings_are_written_when_brotli_is_installed(self):
+        # Stand-in for the brotli package: "compresses" by reversing the bytes.
+        brotli = types.SimpleNamespace(
+            MODE_TEXT=1,
+            compress=lambda data, mode, quality: data[::-1],
+        )
+
+        class Compressor:
+            def __init__(self, mode, quality):
+                self.data = b""
+
+            def process(self, block):
+                self.data += block
+                return b""
+
+            def finish(self):
+                return self.data[::-1]
+
+        brotli.Compressor = Compressor
+        with tempfile.TemporaryDirectory() as directory, patch.object(MODULE, "brotli", brotli):
+            small = Path(directory) / "index.html"
+            small.write_text("<html></html>\n", encoding="utf-8")
+            large = Path(directory) / "data.json"
+            large.write_text('{"fotos": []}\n' * 100, encoding="utf-8")
+
+            self.assertEqual(MODULE.sibling_suffixes(), (".gz", ".br"))
+            MODULE.compress_file(small)
+            with patch.object(MODULE, "POOL_THRESHOLD", 0), patch.object(MODULE, "READ_CHUNK", 64):
+                MODULE.compress_file(large)
+                MODULE.drain()
+
+            for path in (small, large):
+                sibling = path.with_name(path.name + ".br")
+                self.assertEqual(path.read_bytes()[::-1], sibling.read_bytes())
+                self.assertEqual(path.stat().st_mtime_ns, sibling.stat().st_mtime_ns)
+
+            with patch.object(MODULE, "compress_file") as compress_file:
+                MODULE.ensure_siblings(small)
+                compress_file.assert_not_called()
+                small.with_name("index.html.br").unlink()
+                MODULE.ensure_siblings(small)
+                compress_file.assert_called_once_with(small, 0o644)
+
+
+if __name__ == "__main__":
+    unittest.main()
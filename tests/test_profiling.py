@@ -0,0 +1,61 @@
+import argparse
+import importlib.util
+import pstats
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+MODULE_PATH = SCRIPTS_DIR / "profiling.py"
+SPEC = importlib.util.spec_from_file_location("profiling", MODULE_PATH)
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+
+def busy_stage():
+    deadline = time.perf_counter() + 0.05
+    data = []
+    while time.perf_counter() < deadline:
+        data.append(str(len(data)))
+    return data
+
+
+class ProfilingTest(unittest.TestCase):
+    def parse(self, *arguments):
+        parser = argparse.ArgumentParser()
+        MODULE.add_arguments(parser)
+        return parser.parse_args(list(arguments))
+
+    def test_without_options_nothing_is_written(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with MODULE.session("prueba", self.parse("--profile-dir", directory)):
+                busy_stage()
+            self.assertEqual([], list(Path(directory).iterdir()))
+
+    def test_profile_and_memory_trace_are_written(self):
+        with tempfile.TemporaryDirectory() as directory:
+            args = self.parse("--profile", "--trace-memory", "--profile-dir", directory)
+            with MODULE.session("prueba", args):
+                with MODULE.metrics.stage("carga"):
+                    busy_stage()
+
+            files = {path.suffix: path for path in Path(directory).iterdir()}
+            self.assertEqual({".pstats", ".collapsed", ".txt"}, set(files))
+            stats = pstats.Stats(str(files[".pstats"]))
+            self.assertTrue(any(function == "busy_stage" for _, _, function in stats.stats))
+            collapsed = files[".collapsed"].read_text(encoding="utf-8").splitlines()
+            self.assertTrue(any("busy_stage (test_profiling.py:" in line for line in collapsed))
+            self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed))
+            memory = files[".txt"].read_text(encoding="utf-8")
+            self.assertIn("== etapa carga", memory)
+            self.assertIn("== final", memory)
+            self.assertEqual([], MODULE.metrics.stage_hooks)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import importlib.util
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+SPEC = importlib.util.spec_from_file_location("public_db", SCRIPTS_DIR / "public_db.py")
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+# The queries of js/populares.js and js/database-manager.js.
+POPULAR = """
+    SELECT i.*, bic.like_count, bic.comment_count, bic.repost_count, bic.last_updated, bp.post_id,
+           ia.is_appropriate, ia.description as ai_description, ia.tags as ai_tags
+    FROM imagenes i
+    JOIN bluesky_interactions_cache bic ON i.id = bic.image_id
+    JOIN bluesky_posts bp ON i.id = bp.image_id
+    LEFT JOIN image_analysis ia ON i.id = ia.image_id
+    WHERE (ia.is_appropriate = 1 OR ia.is_appropriate IS NULL)
+      AND (bic.like_count > 0 OR bic.comment_count > 0 OR bic.repost_count > 0)
+    ORDER BY (bic.like_count + bic.comment_count * 2 + bic.repost_count) DESC, bic.like_count DESC
+"""
+GALLERY = """
+    SELECT i.*, date(i.date) as fecha_grupo, ia.is_appropriate,
+           ia.description as ai_description, ia.tags as ai_tags
+    FROM imagenes i
+    LEFT JOIN image_analysis ia ON i.id = ia.image_id
+    WHERE ia.is_appropriate = 1 OR ia.is_appropriate IS NULL
+    ORDER BY i.date DESC
+"""
+
+
+def create_database(root):
+    with sqlite3.connect(root / "fotos.db") as connection:
+        connection.executescript(
+            """
+            CREATE TABLE imagenes (id INTEGER PRIMARY KEY, path TEXT NOT NULL, date DATETIME NOT NULL,
+                                   author TEXT, description TEXT);
+            CREATE TABLE image_analysis (id INTEGER PRIMARY KEY AUTOINCREMENT, image_id INTEGER NOT NULL UNIQUE,
+                                         description TEXT NOT NULL, tags TEXT, risk_assessment TEXT,
+                                         flags TEXT, is_appropriate BOOLEAN NOT NULL);
+            CREATE TABLE bluesky_posts (id INTEGER PRIMARY KEY AUTOINCREMENT, image_id INTEGER NOT NULL,
+                                        post_id TEXT NOT NULL);
+            CREATE TABLE bluesky_interactions_cache (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                                     image_id INTEGER NOT NULL UNIQUE, like_count INTEGER,
+                                                     comment_count INTEGER, repost_count INTEGER,
+                                                     last_updated DATETIME);
+            INSERT INTO imagenes VALUES (1, '1.jpg', '2024-01-01', 'ana', 'Plaza');
+            INSERT INTO imagenes VALUES (2, '2.jpg', '2024-02-01', 'luis', 'Rechazada');
+            INSERT INTO imagenes VALUES (3, '3.jpg', '2024-03-01', 'eva', NULL);
+            INSERT INTO image_analysis (image_id, description, tags, risk_assessment, flags, is_appropriate)
+                VALUES (1, 'Una plaza', '["plaza"]', 'bajo', '[]', 1), (2, 'Otra', '[]', 'alto', '["x"]', 0);
+            INSERT INTO bluesky_posts (image_id, post_id) VALUES (1, 'a'), (2, 'b'), (3, 'c');
+            INSERT INTO bluesky_interactions_cache (image_id, like_count, comment_count, repost_count, last_updated)
+                VALUES (1, 1, 0, 0, '2024-05-01'), (2, 9, 9, 9, '2024-05-01'), (3, 0, 2, 0, '2024-05-01');
+            """
+        )
+
+
+class PublicDatabaseTest(unittest.TestCase):
+    def test_only_public_rows_and_client_columns_are_copied(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            create_database(root)
+
+            size, full_size, changed = MODULE.write_public_db(root)
+
+            self.assertTrue(changed)
+            self.assertEqual(size, (root / MODULE.NAME).stat().st_size)
+            self.assertEqual(full_size, (root / "fotos.db").stat().st_size)
+            with sqlite3.connect(root / MODULE.NAME) as public, sqlite3.connect(root / "fotos.db") as full:
+                self.assertEqual(public.execute(POPULAR).fetchall(), full.execute(POPULAR).fetchall())
+                self.assertEqual(public.execute(GALLERY).fetchall(), full.execute(GALLERY).fetchall())
+                self.assertEqual([row[0] for row in public.execute("SELECT id FROM imagenes ORDER BY id")], [1, 3])
+                columns = {row[1] for row in public.execute("PRAGMA table_info(image_analysis)")}
+                self.assertEqual(columns, {"image_id", "description", "tags", "is_appropriate"})
+                plan = " ".join(row[3] for row in public.execute("EXPLAIN QUERY PLAN " + POPULAR))
+                self.assertIn("bluesky_interactions_cache_popularity", plan)
+                self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_an_identical_build_keeps_the_file(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            create_database(root)
+            MODULE.write_public_db(root)
+            mtime = (root / MODULE.NAME).stat().st_mtime_ns
+
+            self.assertFalse(MODULE.write_public_db(root)[2])
+            self.assertEqual((root / MODULE.NAME).stat().st_mtime_ns, mtime)
+            self.assertFalse((root / f".{MODULE.NAME}.tmp").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
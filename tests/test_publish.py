@@ -0,0 +1,202 @@
+import importlib.util
+import json
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+SPEC = importlib.util.spec_from_file_location("publish", SCRIPTS_DIR / "publish.py")
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+
+def create_project(root, rows):
+    (root / "index.html").write_text(
+        "<html><head>\n<!-- SOCIAL_META_START -->\n"
+        "<title>Plantilla</title>\n<!-- SOCIAL_META_END -->\n"
+        "</head><body></body></html>",
+        encoding="utf-8",
+    )
+    (root / "files").mkdir()
+    shutil.copyfile(PROJECT_ROOT / "files" / "184500.jpg", root / "files" / "1.jpg")
+    with sqlite3.connect(root / "fotos.db") as connection:
+        connection.executescript(
+            """
+            CREATE TABLE imagenes (
+                id INTEGER PRIMARY KEY, path TEXT, date TEXT,
+                author TEXT, description TEXT
+            );
+            CREATE TABLE image_analysis (
+                image_id INTEGER UNIQUE, is_appropriate INTEGER, tags TEXT
+            );
+            """
+        )
+        for image_id, date, description, is_appropriate, tags in rows:
+            connection.execute(
+                "INSERT INTO imagenes VALUES (?, ?, ?, 'Ana', ?)",
+                (image_id, f"{image_id}.jpg", date, description),
+            )
+            connection.execute(
+                "INSERT INTO image_analysis VALUES (?, ?, ?)", (image_id, is_appropriate, tags)
+            )
+
+
+def public_files(root):
+    """Every published file, without the build dates."""
+    files = {}
+    for path in sorted(root.rglob("*")):
+        relative = path.relative_to(root).as_posix()
+        if not path.is_file() or path.suffix not in (".json", ".xml", ".html") or relative.startswith("files/"):
+            continue
+        text = path.read_text(encoding="utf-8")
+        files[relative] = "\n".join(
+            line for line in text.splitlines() if "lastBuildDate" not in line and "lastUpdate" not in line
+        )
+    return files
+
+
+def set_appropriateness(root, image_id, is_appropriate):
+    with sqlite3.connect(root / "fotos.db") as connection:
+        since = MODULE.change_log.head(connection)
+        connection.execute(
+            "UPDATE image_analysis SET is_appropriate = ? WHERE image_id = ?", (is_appropriate, image_id)
+        )
+    return since
+
+
+class PublishTest(unittest.TestCase):
+    def test_every_output_is_built_from_one_snapshot(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            create_project(root, [
+                (1, "2026-07-14T10:00:00+02:00", "Puente #pisuerga", 1, '["puente"]'),
+                (2, "2026-07-14T11:00:00+02:00", "Oculta #pisuerga", 0, '["coche"]'),
+            ])
+
+            loads = []
+            load = MODULE.Snapshot.load
+
+            def counted_load(snapshot):
+                loads.append(snapshot)
+                load(snapshot)
+
+            with patch.object(MODULE.Snapshot, "load", counted_load), redirect_stdout(StringIO()):
+                MODULE.publish(root)
+                self.assertEqual(1, len(loads))
+
+                for name in ("feed.xml", "data.json", "data/index.json", "changes/latest.json",
+                             "f/1/index.html", "sitemap.xml"):
+                    self.assertTrue((root / name).is_file(), name)
+                tags = json.loads((root / "tags-cache.json").read_text(encoding="utf-8"))
+                self.assertEqual([("#pisuerga", 1)], [(tag["tag"], tag["count"]) for tag in tags["tags"]])
+                ai_tags = json.loads((root / "ai-tags-cache.json").read_text(encoding="utf-8"))
+                self.assertEqual(["puente"], [tag["tag"] for tag in ai_tags["tags"]])
+
+                # Nothing changed: the photos are not read again.
+                MODULE.publish(root)
+                self.assertEqual(1, len(loads))
+
+    def test_republish_matches_a_full_publish(self):
+        rows = [
+            (image_id, f"2026-07-{10 + image_id % 4:02d}T10:00:00+02:00",
+             None if image_id == 5 else f"Foto {image_id} #río #Pisuerga{image_id % 2}",
+             1, '["puente", "río"]' if image_id % 2 else '["coche"]')
+            for image_id in range(1, 9)
+        ]
+        with tempfile.TemporaryDirectory() as temporary, redirect_stdout(StringIO()):
+            targeted = Path(temporary) / "targeted"
+            full = Path(temporary) / "full"
+            for root in (targeted, full):
+                root.mkdir()
+                create_project(root, rows)
+                MODULE.publish(root)
+
+            for image_id, is_appropriate in ((3, 0), (5, 0), (3, 1), (8, 0)):
+                with self.subTest(image_id=image_id, is_appropriate=is_appropriate):
+                    since = set_appropriateness(targeted, image_id, is_appropriate)
+                    self.assertTrue(MODULE.republish(targeted, image_id, since))
+                    set_appropriateness(full, image_id, is_appropriate)
+                    MODULE.publish(full)
+                    self.assertEqual(public_files(full), public_files(targeted))
+
+            # Other pending changes need the full publication.
+            since = set_appropriateness(targeted, 1, 0)
+            set_appropriateness(targeted, 2, 0)
+            self.assertFalse(MODULE.republish(targeted, 1, since))
+
+    def test_requested_publish_updates_tag_caches_after_a_feed_run(self):
+        with tempfile.TemporaryDirectory() as temporary, redirect_stdout(StringIO()):
+            root = Path(temporary)
+            create_project(root, [(1, "2026-07-14T10:00:00+02:00", "Puente", 1, '["puente"]')])
+            MODULE.publish(root)
+
+            # A moderation during cron's feed-rss.py run found the lock busy.
+            set_appropriateness(root, 1, 0)
+            MODULE.request_publish(root)
+            MODULE.load_script("feed-rss.py").generate_rss(root)
+            self.assertTrue(MODULE.publish_requested(root))
+
+            MODULE.publish(root)
+            self.assertFalse(MODULE.publish_requested(root))
+            ai_tags = json.loads((root / "ai-tags-cache.json").read_text(encoding="utf-8"))
+            self.assertEqual([], ai_tags["tags"])
+
+    def test_public_copies_are_only_rebuilt_when_fotos_db_changed(self):
+        with tempfile.TemporaryDirectory() as temporary, redirect_stdout(StringIO()):
+            root = Path(temporary)
+            create_project(root, [(1, "2026-07-14T10:00:00+02:00", "Puente", 1, '["puente"]')])
+            with sqlite3.connect(root / "fotos.db") as connection:
+                connection.executescript(
+                    """
+                    CREATE TABLE bluesky_interactions_cache (
+                        image_id INTEGER PRIMARY KEY, like_count INTEGER, comment_count INTEGER,
+                        repost_count INTEGER, last_updated DATETIME
+                    );
+                    INSERT INTO bluesky_interactions_cache VALUES (1, 1, 0, 0, '2026-07-14 10:00:00');
+                    """
+                )
+            MODULE.publish(root, ranges=True)
+
+            with patch.object(MODULE.public_db, "write_public_db") as write_public_db, \
+                    patch.object(MODULE.range_layout, "write_layout") as write_layout:
+                MODULE.publish(root)
+                write_public_db.assert_not_called()
+                write_layout.assert_not_called()
+
+            # Refreshed interaction counts are not in the change log.
+            with sqlite3.connect(root / "fotos.db") as connection:
+                connection.execute(
+                    "UPDATE bluesky_interactions_cache SET like_count = 2, last_updated = '2026-07-15 10:00:00'"
+                )
+            MODULE.publish(root)
+            with sqlite3.connect(root / "fotos-public.db") as connection:
+                likes = connection.execute("SELECT like_count FROM bluesky_interactions_cache").fetchone()[0]
+            self.assertEqual(2, likes)
+
+            set_appropriateness(root, 1, 0)
+            (root / "fotos-public" / "config.json").unlink()
+            MODULE.publish(root, ranges=True)
+            with sqlite3.connect(root / "fotos-public.db") as connection:
+                self.assertEqual(0, connection.execute("SELECT COUNT(*) FROM imagenes").fetchone()[0])
+            self.assertTrue((root / "fotos-public" / "config.json").is_file())
+
+    def test_lock_is_exclusive(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            with MODULE.generation_lock(root) as first:
+                with MODULE.generation_lock(root) as second:
+                    self.assertTrue(first)
+                    self.assertFalse(second)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import importlib.util
+import json
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+SPEC = importlib.util.spec_from_file_location("range_layout", SCRIPTS_DIR / "range_layout.py")
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+GALLERY = """
+    SELECT i.*, date(i.date) as fecha_grupo, ia.is_appropriate,
+           ia.description as ai_description, ia.tags as ai_tags
+    FROM imagenes i
+    LEFT JOIN image_analysis ia ON i.id = ia.image_id
+    ORDER BY i.date DESC
+"""
+
+
+def create_database(root, photos):
+    with sqlite3.connect(root / "fotos.db") as connection:
+        connection.executescript(
+            """
+            CREATE TABLE imagenes (id INTEGER PRIMARY KEY, path TEXT NOT NULL, date DATETIME NOT NULL,
+                                   author TEXT, description TEXT);
+            CREATE TABLE image_analysis (id INTEGER PRIMARY KEY AUTOINCREMENT, image_id INTEGER NOT NULL UNIQUE,
+                                         description TEXT NOT NULL, tags TEXT, is_appropriate BOOLEAN NOT NULL);
+            """
+        )
+        for index in range(photos):
+            # Ids out of date order, as when old photos are imported late.
+            photo_id = (index * 7919) % photos + 1
+            connection.execute(
+                "INSERT INTO imagenes VALUES (?, ?, ?, 'ana', ?)",
+                (photo_id, f"{photo_id}.jpg", f"2024-01-01 {index // 3600:02d}:{index // 60 % 60:02d}:{index % 60:02d}",
+                 "Descripción " * 20),
+            )
+            connection.execute(
+                "INSERT INTO image_analysis (image_id, description, tags, is_appropriate) VALUES (?, 'x', '[]', ?)",
+                (photo_id, int(index % 10 != 0)),
+            )
+
+
+def read_database(directory):
+    config = json.loads((directory / MODULE.CONFIG_NAME).read_text(encoding="utf-8"))
+    chunks = sorted(directory.glob(config["urlPrefix"] + "*"))
+    data = b"".join(chunk.read_bytes() for chunk in chunks)
+    return config, chunks, data
+
+
+class RangeLayoutTest(unittest.TestCase):
+    def test_chunks_and_manifest_describe_the_clustered_public_database(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            create_database(root, 500)
+
+            size, count, written = MODULE.write_layout(root, page_size=1024, chunk_size=16384)
+
+            config, chunks, data = read_database(root / MODULE.DIRECTORY)
+            self.assertEqual((count, written), (len(chunks), len(chunks)))
+            self.assertGreater(count, 1)
+            self.assertEqual(config["serverMode"], "chunked")
+            self.assertEqual(config["requestChunkSize"], 1024)
+            self.assertEqual(config["databaseLengthBytes"], size)
+            self.assertEqual(len(data), size)
+            layout = root / "layout.db"
+            layout.write_bytes(data)
+            with sqlite3.connect(layout) as connection, sqlite3.connect(root / "fotos.db") as full:
+                self.assertEqual(connection.execute("PRAGMA page_size").fetchone()[0], 1024)
+                self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+                expected = full.execute(GALLERY.replace("ORDER BY", "WHERE ia.is_appropriate = 1 ORDER BY")).fetchall()
+                self.assertEqual(connection.execute(GALLERY).fetchall(), expected)
+                plan = " ".join(row[3] for row in connection.execute("EXPLAIN QUERY PLAN " + GALLERY))
+                self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_unchanged_chunks_are_kept_and_stale_ones_removed(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            create_database(root, 500)
+            MODULE.write_layout(root, page_size=1024, chunk_size=16384)
+            directory = root / MODULE.DIRECTORY
+            (directory / MODULE.chunk_name(999)).write_bytes(b"")
+
+            self.assertEqual(MODULE.write_layout(root, page_size=1024, chunk_size=16384)[2], 0)
+            self.assertFalse((directory / MODULE.chunk_name(999)).exists())
+
+    def test_chunk_size_must_hold_whole_pages(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            with self.assertRaises(ValueError):
+                MODULE.write_layout(Path(temporary), page_size=4096, chunk_size=5000)
+
+
+if __name__ == "__main__":
+    unittest.main()
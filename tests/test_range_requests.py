@@ -0,0 +1,46 @@
+import importlib.util
+import re
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BENCHMARKS_DIR = PROJECT_ROOT / "benchmarks"
+sys.path.insert(0, str(BENCHMARKS_DIR))
+SPEC = importlib.util.spec_from_file_location("benchmark_range_requests", BENCHMARKS_DIR / "range_requests.py")
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+
+def collapse(text):
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class RangeRequestsTest(unittest.TestCase):
+    def test_queries_are_the_ones_the_client_runs(self):
+        for name, (source, sql) in MODULE.QUERIES.items():
+            with self.subTest(name):
+                self.assertIn(collapse(sql), collapse((PROJECT_ROOT / source).read_text(encoding="utf-8")))
+
+    @unittest.skipIf(MODULE.apsw is None, "apsw no está instalado")
+    def test_lookups_fetch_a_few_pages_and_the_gallery_most_of_the_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            project = MODULE.build_synthetic_project(Path(directory) / "project", 2000)
+
+            report = MODULE.run(project, [1024])
+
+            layout = report[0]
+            results = {result["query"]: result for result in layout["queries"]}
+            for name in ("database-manager.js:post_id", "editorial-promo.js:populares"):
+                self.assertGreater(results[name]["rows"], 0)
+                self.assertLess(results[name]["bytes"], 64 * 1024)
+            gallery = results["database-manager.js:galeria"]
+            self.assertGreater(gallery["rows"], 0)
+            self.assertGreater(gallery["bytes"], layout["database_bytes"] // 4)
+            self.assertLessEqual(gallery["bytes"], layout["database_bytes"])
+
+
+if __name__ == "__main__":
+    unittest.main()
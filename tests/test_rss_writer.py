@@ -0,0 +1,85 @@
+import importlib.util
+import sys
+import unittest
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from xml.dom import minidom
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+SPEC = importlib.util.spec_from_file_location("rss_writer", SCRIPTS_DIR / "rss_writer.py")
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+GOLDEN_PATH = PROJECT_ROOT / "tests" / "golden" / "feed.xml"
+CHANNEL = [
+    ("title", "Fotos de Valladolid - Aldea Pucela", {}),
+    ("link", "https://fotos.aldeapucela.org/", {}),
+    ("description", "Fotos de Valladolid de la mayor comunidad vecinal online sobre Valladolid", {}),
+    ("copyright", "Las imágenes están bajo licencia CC BY-SA 4.0 - https://creativecommons.org/licenses/by-sa/4.0/", {}),
+    (
+        "creativeCommons:license",
+        "https://creativecommons.org/licenses/by-sa/4.0/",
+        {"xmlns:creativeCommons": "http://backend.userland.com/creativeCommonsRssModule"},
+    ),
+    ("language", "es", {}),
+    ("lastBuildDate", "Tue, 14 Jul 2026 10:00:00 +0200", {}),
+]
+ITEMS = [
+    {
+        "title": "Plaza Mayor & \"Campo Grande\" <noche>",
+        "link": "https://fotos.aldeapucela.org/f/1/",
+        "description": (
+            '<img src="https://fotos.aldeapucela.org/files/1.jpg" style="max-width:600px;height:auto;"/>'
+            "<p>Primera línea\nsegunda línea con 'comillas' y ñandú</p>"
+        ),
+        "pubDate": "Tue, 14 Jul 2026 10:00:00 +0200",
+        "guid": "https://fotos.aldeapucela.org/files/1.jpg",
+    },
+    {
+        "title": "2.jpg",
+        "link": "https://fotos.aldeapucela.org/f/2/",
+        "description": "",
+        "pubDate": "Thu, 01 Jan 1970 00:00:00 +0000",
+        "guid": "https://fotos.aldeapucela.org/files/2.jpg",
+    },
+]
+
+
+def minidom_feed(channel_fields, items):
+    """The ElementTree and minidom round trip feed-rss.py used before."""
+    rss = ET.Element("rss", version="2.0")
+    channel = ET.SubElement(rss, "channel")
+    for tag, text, attributes in channel_fields:
+        ET.SubElement(channel, tag, attributes).text = text
+    for item_data in items:
+        item = ET.SubElement(channel, "item")
+        for field, value in item_data.items():
+            ET.SubElement(item, field).text = value
+    return minidom.parseString(ET.tostring(rss)).toprettyxml(indent="  ")
+
+
+class RssWriterTest(unittest.TestCase):
+    def test_output_matches_the_golden_file(self):
+        self.assertEqual(
+            GOLDEN_PATH.read_text(encoding="utf-8"),
+            "".join(MODULE.encode(CHANNEL, ITEMS)),
+        )
+
+    def test_output_matches_the_minidom_round_trip(self):
+        for items in (ITEMS, ITEMS[1:], []):
+            with self.subTest(items=len(items)):
+                self.assertEqual(minidom_feed(CHANNEL, items), "".join(MODULE.encode(CHANNEL, items)))
+
+    def test_line_endings_are_normalised_and_invalid_characters_dropped(self):
+        self.assertEqual("a\nb\nc &amp; d", MODULE.escape("a\r\nb\rc\x00\x1f & d"))
+        self.assertEqual(
+            minidom_feed(CHANNEL, [{"title": "a\r\nb\rc"}]),
+            "".join(MODULE.encode(CHANNEL, [{"title": "a\r\nb\rc"}])),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
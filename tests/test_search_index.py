@@ -0,0 +1,122 @@
+import importlib.util
+import json
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+SPEC = importlib.util.spec_from_file_location("search_index", SCRIPTS_DIR / "search_index.py")
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+
+def create_database(path):
+    connection = sqlite3.connect(path)
+    connection.executescript(
+        """
+        CREATE TABLE imagenes (id INTEGER PRIMARY KEY, path TEXT NOT NULL, date DATETIME NOT NULL,
+                               author TEXT, description TEXT);
+        CREATE TABLE image_analysis (id INTEGER PRIMARY KEY AUTOINCREMENT, image_id INTEGER NOT NULL UNIQUE,
+                                     description TEXT NOT NULL, tags TEXT, is_appropriate BOOLEAN NOT NULL);
+        INSERT INTO imagenes VALUES (1, '1.jpg', '2024-01-01', 'ana', 'Paseo por el Río');
+        INSERT INTO imagenes VALUES (2, '2.jpg', '2024-02-01', 'luis', 'Puente de noche');
+        INSERT INTO image_analysis (image_id, description, tags, is_appropriate)
+            VALUES (2, 'Un puente sobre el rio', '["arquitectura"]', 1);
+        """
+    )
+    connection.commit()
+    return connection
+
+
+def postings(root, term):
+    path = root / "search" / f"{term}.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))["photos"]
+
+
+def read_tree(directory):
+    return {path.name: path.read_bytes() for path in sorted(directory.glob("*.json"))}
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        connection = sqlite3.connect(":memory:")
+        try:
+            connection.execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+        except sqlite3.OperationalError:
+            self.skipTest("SQLite sin FTS5")
+        finally:
+            connection.close()
+
+    def test_terms_fold_accents_and_skip_stopwords(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            connection = create_database(root / "fotos.db")
+
+            self.assertIsNotNone(MODULE.write_index(root, connection))
+
+            self.assertEqual(postings(root, "rio"), ["2.jpg", "1.jpg"])
+            self.assertEqual(postings(root, "arquitectura"), ["2.jpg"])
+            self.assertIsNone(postings(root, "el"))
+            index = json.loads((root / "search" / "index.json").read_text(encoding="utf-8"))
+            self.assertIn("el", index["stopwords"])
+            connection.close()
+
+    def test_changes_rewrite_only_their_terms_like_a_rebuild(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            connection = create_database(root / "fotos.db")
+            MODULE.write_index(root, connection)
+
+            connection.execute("UPDATE imagenes SET description = 'Niebla' WHERE id = 1")
+            connection.execute("UPDATE image_analysis SET is_appropriate = 0 WHERE image_id = 2")
+            connection.execute("INSERT INTO imagenes VALUES (3, '3.jpg', '2024-03-01', 'eva', 'Otro río')")
+            connection.commit()
+
+            MODULE.write_index(root, connection)
+            self.assertEqual(postings(root, "rio"), ["3.jpg"])
+            self.assertEqual(postings(root, "niebla"), ["1.jpg"])
+            self.assertIsNone(postings(root, "puente"))
+            self.assertEqual(MODULE.write_index(root, connection), (0, 0))
+
+            incremental = read_tree(root / "search")
+            (root / "search" / "index.json").unlink()
+            MODULE.write_index(root, connection)
+            self.assertEqual(read_tree(root / "search"), incremental)
+            connection.close()
+
+    def test_install_only_writes_the_schema_when_a_trigger_changed(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            connection = create_database(root / "fotos.db")
+            self.assertTrue(MODULE.install(connection))
+            cookie = connection.execute("PRAGMA schema_version").fetchone()[0]
+
+            self.assertTrue(MODULE.install(connection))
+            self.assertEqual(cookie, connection.execute("PRAGMA schema_version").fetchone()[0])
+
+            # An older definition of a trigger is replaced.
+            connection.executescript(
+                """
+                DROP TRIGGER photo_search_imagenes_update;
+                CREATE TRIGGER photo_search_imagenes_update AFTER UPDATE ON imagenes BEGIN SELECT 1; END;
+                """
+            )
+            self.assertTrue(MODULE.install(connection))
+            self.assertNotEqual(cookie, connection.execute("PRAGMA schema_version").fetchone()[0])
+            MODULE.write_index(root, connection)
+            connection.execute("UPDATE imagenes SET description = 'Niebla' WHERE id = 1")
+            connection.commit()
+            MODULE.write_index(root, connection)
+            self.assertEqual(postings(root, "niebla"), ["1.jpg"])
+            connection.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import importlib.util
+import tempfile
+import unittest
+from pathlib import Path
+from xml.etree import ElementTree as ET
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MODULE_PATH = PROJECT_ROOT / "scripts" / "sitemap.py"
+SPEC = importlib.util.spec_from_file_location("sitemap", MODULE_PATH)
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+BASE_URL = "https://example.org"
+NAMESPACE = {"s": MODULE.NAMESPACE}
+
+
+def photos(count):
+    return [(f"{BASE_URL}/f/{number}/", f"2026-07-{number:02d}") for number in range(1, count + 1)]
+
+
+class ShardedSitemapTest(unittest.TestCase):
+    def test_index_lists_fixed_size_shards(self):
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            MODULE.write_sitemaps(root, BASE_URL, [f"{BASE_URL}/"], photos(5), {}, shard_size=2)
+
+            index = ET.parse(root / "sitemap-index.xml").getroot()
+            entries = [
+                (sitemap.findtext("s:loc", namespaces=NAMESPACE), sitemap.findtext("s:lastmod", namespaces=NAMESPACE))
+                for sitemap in index.findall("s:sitemap", NAMESPACE)
+            ]
+            self.assertEqual(
+                [
+                    (f"{BASE_URL}/sitemaps/pages.xml", None),
+                    (f"{BASE_URL}/sitemaps/photos-0001.xml", "2026-07-02"),
+                    (f"{BASE_URL}/sitemaps/photos-0002.xml", "2026-07-04"),
+                    (f"{BASE_URL}/sitemaps/photos-0003.xml", "2026-07-05"),
+                ],
+                entries,
+            )
+            last = ET.parse(root / "sitemaps" / "photos-0003.xml").getroot()
+            self.assertEqual(
+                [f"{BASE_URL}/f/5/"],
+                [url.findtext("s:loc", namespaces=NAMESPACE) for url in last.findall("s:url", NAMESPACE)],
+            )
+
+    def test_only_the_shards_that_changed_are_rewritten(self):
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            digests, _ = MODULE.write_sitemaps(root, BASE_URL, [], photos(5), {}, shard_size=2)
+            self.assertEqual({"pages.xml", "photos-0001.xml", "photos-0002.xml", "photos-0003.xml"}, set(digests))
+
+            digests, written = MODULE.write_sitemaps(root, BASE_URL, [], photos(6), digests, shard_size=2)
+            self.assertEqual(["sitemaps/photos-0003.xml", "sitemap-index.xml", "sitemap.xml"], written)
+
+            _, written = MODULE.write_sitemaps(root, BASE_URL, [], photos(3), digests, shard_size=2)
+            self.assertEqual(
+                ["sitemaps/photos-0002.xml", "sitemaps/photos-0003.xml", "sitemap-index.xml", "sitemap.xml"],
+                written,
+            )
+            self.assertFalse((root / "sitemaps" / "photos-0003.xml").exists())
+
+    def test_first_shard_keeps_the_earlier_shards(self):
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            digests, _ = MODULE.write_sitemaps(root, BASE_URL, [], photos(5), {}, shard_size=2)
+            remaining = [photo for photo in photos(5) if photo[0] != f"{BASE_URL}/f/3/"]
+
+            tail_digests, written = MODULE.write_sitemaps(
+                root, BASE_URL, [], remaining[2:], digests, shard_size=2, first_shard=2
+            )
+            self.assertEqual(
+                ["sitemaps/photos-0002.xml", "sitemaps/photos-0003.xml", "sitemap-index.xml", "sitemap.xml"],
+                written,
+            )
+            index = (root / "sitemap-index.xml").read_text(encoding="utf-8")
+
+            full_digests, written = MODULE.write_sitemaps(root, BASE_URL, [], remaining, tail_digests, shard_size=2)
+            self.assertEqual([], written)
+            self.assertEqual(full_digests, tail_digests)
+            self.assertEqual(index, (root / "sitemap-index.xml").read_text(encoding="utf-8"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import importlib.util
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+SPEC = importlib.util.spec_from_file_location("snapshot", SCRIPTS_DIR / "snapshot.py")
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+change_log = MODULE.change_log
+
+
+def create_database(db_path):
+    with sqlite3.connect(db_path) as connection:
+        connection.executescript(
+            """
+            CREATE TABLE imagenes (
+                id INTEGER PRIMARY KEY, path TEXT, date TEXT,
+                author TEXT, description TEXT
+            );
+            CREATE TABLE image_analysis (
+                image_id INTEGER, is_appropriate INTEGER, tags TEXT
+            );
+            """
+        )
+        change_log.install(connection)
+        connection.executescript(
+            """
+            INSERT INTO imagenes VALUES
+                (1, '1.jpg', '2026-07-14T10:00:00+02:00', 'Ana', 'Primera'),
+                (2, '2.jpg', '2026-07-14T12:00:00+02:00', 'Luis', NULL),
+                (3, '3.jpg', '2026-07-14T11:00:00+02:00', 'Eva', 'Rechazada'),
+                (4, '4.jpg', '2026-07-14T11:00:00+02:00', 'Eva', 'Aprobada');
+            INSERT INTO image_analysis VALUES (3, 0, '["coche"]'), (4, 1, '["puente"]');
+            """
+        )
+
+
+class SnapshotTest(unittest.TestCase):
+    def test_public_photos_are_streamed_in_each_order(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            db_path = Path(temporary) / "fotos.db"
+            create_database(db_path)
+            snapshot = MODULE.Snapshot(db_path)
+            self.assertFalse(snapshot.loaded)
+
+            self.assertEqual([1, 4, 2], [photo.id for photo in snapshot.photos])
+            self.assertTrue(snapshot.loaded)
+            self.assertEqual([2, 4, 1], [photo.id for photo in snapshot.newest_first()])
+            self.assertEqual([4, 1], [photo.id for photo in snapshot.described(newest_first=True)])
+            self.assertEqual([1], [photo.id for photo in snapshot.described(image_ids=[1, 2, 3])])
+            self.assertEqual([1, 4], [photo.id for photo in snapshot.changed([4, 3, 1])])
+            self.assertEqual('["puente"]', snapshot.get(4).ai_tags)
+            self.assertIsNone(snapshot.get(3))
+
+    def test_every_consumer_sees_the_photos_as_of_the_head(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            db_path = Path(temporary) / "fotos.db"
+            create_database(db_path)
+            with sqlite3.connect(db_path) as connection:
+                connection.executescript(
+                    """
+                    CREATE TABLE bluesky_interactions_cache (
+                        image_id INTEGER PRIMARY KEY, like_count INTEGER,
+                        comment_count INTEGER, repost_count INTEGER
+                    );
+                    INSERT INTO bluesky_interactions_cache VALUES (4, 3, 1, 2);
+                    """
+                )
+                head = change_log.head(connection)
+            snapshot = MODULE.Snapshot(db_path)
+            self.assertEqual([1, 4, 2], [photo.id for photo in snapshot.photos])
+
+            with sqlite3.connect(db_path) as connection:
+                connection.execute("DELETE FROM imagenes WHERE id = 1")
+                connection.execute("UPDATE bluesky_interactions_cache SET like_count = 9")
+            # Later commits are left for the next run.
+            self.assertEqual(head, snapshot.head)
+            self.assertEqual([2, 4, 1], [photo.id for photo in snapshot.newest_first()])
+            self.assertEqual((3, 1, 2), snapshot.get(4)[-3:])
+            self.assertEqual((None, None, None), snapshot.get(1)[-3:])
+
+    def test_limited_snapshot_keeps_the_requested_photos_that_are_not_public(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            db_path = Path(temporary) / "fotos.db"
+            create_database(db_path)
+            snapshot = MODULE.Snapshot(db_path, image_ids=[3, 4])
+
+            self.assertEqual([4], [photo.id for photo in snapshot.photos])
+            self.assertEqual('["coche"]', snapshot.requested(3).ai_tags)
+            self.assertIsNone(snapshot.get(3))
+            self.assertEqual((1, 1, 0), snapshot.position(4))
+
+    def test_idle_snapshot_reads_nothing(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            db_path = Path(temporary) / "fotos.db"
+            create_database(db_path)
+            snapshot = MODULE.Snapshot(db_path)
+
+            self.assertEqual([], snapshot.changed([]))
+            self.assertFalse(snapshot.loaded)
+
+    def test_schema_without_ai_tags(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            db_path = Path(temporary) / "fotos.db"
+            with sqlite3.connect(db_path) as connection:
+                connection.executescript(
+                    """
+                    CREATE TABLE imagenes (
+                        id INTEGER PRIMARY KEY, path TEXT, date TEXT,
+                        author TEXT, description TEXT
+                    );
+                    CREATE TABLE image_analysis (image_id INTEGER, is_appropriate INTEGER);
+                    INSERT INTO imagenes VALUES (1, '1.jpg', NULL, NULL, 'Sin analizar');
+                    """
+                )
+            snapshot = MODULE.Snapshot(db_path)
+
+            self.assertEqual(0, snapshot.head)
+            self.assertEqual([(1, None)], [(photo.id, photo.ai_tags) for photo in snapshot.photos])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import importlib.util
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+SPEC = importlib.util.spec_from_file_location("tag_cache", SCRIPTS_DIR / "tag_cache.py")
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+
+
+class TagCacheTest(unittest.TestCase):
+    def test_cache_is_sorted_by_frequency_and_only_written_when_tags_change(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            root = Path(temporary)
+            entries = [
+                {"tag": "#Río", "normalized_tag": "#rio", "count": 2},
+                {"tag": "#puente", "normalized_tag": "#puente", "count": 2},
+                {"tag": "#noche", "normalized_tag": "#noche", "count": 5},
+            ]
+
+            self.assertTrue(MODULE.write_cache(root, "tags-cache.json", entries, "normalized_tag"))
+            cache = json.loads((root / "tags-cache.json").read_text(encoding="utf-8"))
+            self.assertEqual(["#noche", "#puente", "#Río"], [entry["tag"] for entry in cache["tags"]])
+
+            self.assertFalse(MODULE.write_cache(root, "tags-cache.json", entries[::-1], "normalized_tag"))
+            unchanged = json.loads((root / "tags-cache.json").read_text(encoding="utf-8"))
+            self.assertEqual(cache["lastUpdate"], unchanged["lastUpdate"])
+
+            self.assertTrue(MODULE.write_cache(root, "tags-cache.json", entries[:1], "normalized_tag"))
+            self.assertTrue((root / "tags-cache.json.gz").is_file())
+
+
+if __name__ == "__main__":
+    unittest.main()
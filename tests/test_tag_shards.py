@@ -0,0 +1,125 @@
+import importlib.util
+import json
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+
+def load(name):
+    spec = importlib.util.spec_from_file_location(name, SCRIPTS_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+MODULE = load("tag_shards")
+hashtag_index = load("hashtag_index")
+ai_tag_index = load("ai_tag_index")
+
+
+class TagShardsTest(unittest.TestCase):
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory()
+        self.root = Path(self.temporary.name)
+        self.connection = sqlite3.connect(self.root / "fotos.db")
+        self.connection.executescript(
+            """
+            CREATE TABLE imagenes (
+                id INTEGER PRIMARY KEY, path TEXT, date TEXT, author TEXT, description TEXT
+            );
+            CREATE TABLE image_analysis (
+                image_id INTEGER UNIQUE, tags TEXT, is_appropriate INTEGER NOT NULL
+            );
+            INSERT INTO imagenes VALUES
+                (1, '1.jpg', '2026-07-01', 'Ana', 'El #Río'),
+                (2, '2.jpg', '2026-07-03', 'Luis', 'Otra vez el #rio'),
+                (3, '3.jpg', '2026-07-02', 'Eva', 'La #plaza');
+            INSERT INTO image_analysis VALUES
+                (1, '["puente", "a/b"]', 1), (2, '["puente"]', 1), (3, '["plaza"]', 1);
+            """
+        )
+        hashtag_index.sync(self.connection)
+        ai_tag_index.install(self.connection)
+
+    def tearDown(self):
+        self.connection.close()
+        self.temporary.cleanup()
+
+    def write(self, kind, page_size=MODULE.PAGE_SIZE):
+        hashtag_index.sync(self.connection)
+        return MODULE.write_shards(self.root, self.connection, kind, page_size)
+
+    def read(self, relative):
+        return json.loads((self.root / relative).read_text(encoding="utf-8"))
+
+    def test_first_run_writes_every_tag_newest_first(self):
+        self.assertEqual(self.write("tags"), (2, 2))
+        self.assertEqual(self.write("ai-tags"), (3, 3))
+
+        shard = self.read("tags/rio.json")
+        self.assertEqual(shard["tag"], "#rio")
+        self.assertEqual(shard["count"], 2)
+        self.assertEqual(
+            shard["photos"][0], {"id": "2", "path": "2.jpg", "date": "2026-07-03", "author": "Luis"}
+        )
+        self.assertEqual([photo["id"] for photo in self.read("ai-tags/puente.json")["photos"]], ["2", "1"])
+        self.assertEqual(self.read("ai-tags/a%2Fb.json")["tag"], "a/b")
+
+    def test_only_tags_of_changed_photos_are_rewritten(self):
+        self.write("tags")
+        self.write("ai-tags")
+        self.assertEqual(self.write("ai-tags"), (0, 0))
+
+        self.connection.executescript(
+            """
+            UPDATE image_analysis SET is_appropriate = 0 WHERE image_id = 3;
+            UPDATE imagenes SET author = 'Luisa' WHERE id = 2;
+            """
+        )
+        self.assertEqual(self.write("tags"), (2, 2))
+        self.assertFalse((self.root / "tags/plaza.json").exists())
+        self.assertEqual(self.read("tags/rio.json")["photos"][0]["author"], "Luisa")
+
+        self.assertEqual(self.write("ai-tags"), (2, 2))
+        self.assertFalse((self.root / "ai-tags/plaza.json").exists())
+        self.assertEqual(self.read("ai-tags/puente.json")["photos"][0]["author"], "Luisa")
+
+    def test_long_lists_are_paginated(self):
+        self.write("ai-tags", page_size=1)
+
+        shard = self.read("ai-tags/puente.json")
+        self.assertEqual((shard["count"], shard["pages"]), (2, 1))
+        self.assertEqual([photo["id"] for photo in shard["photos"]], ["2"])
+        self.assertEqual(self.read("ai-tags/puente/page-0001.json")["photos"][0]["id"], "1")
+
+        self.connection.execute("DELETE FROM image_analysis WHERE image_id = 2")
+        self.connection.commit()
+        self.write("ai-tags", page_size=1)
+        self.assertEqual(self.read("ai-tags/puente.json")["pages"], 0)
+        self.assertFalse((self.root / "ai-tags/puente").exists())
+
+    def test_a_new_photo_only_changes_the_newest_page(self):
+        pages = dict(MODULE.pages("#rio", [{"id": str(n)} for n in range(5, 0, -1)], 2))
+        newer = dict(MODULE.pages("#rio", [{"id": str(n)} for n in range(6, 0, -1)], 2))
+
+        self.assertEqual(sorted(pages), [0, 1, 2])
+        self.assertEqual([photo["id"] for photo in json.loads(pages[0])["photos"]], ["5"])
+        self.assertEqual([photo["id"] for photo in json.loads(pages[1])["photos"]], ["2", "1"])
+        self.assertEqual(sorted(newer), [0, 1, 2])
+        self.assertEqual((pages[1], pages[2]), (newer[1], newer[2]))
+
+    def test_shard_names_escape_unsafe_characters(self):
+        self.assertEqual(MODULE.shard_name("río"), "río")
+        self.assertEqual(MODULE.shard_name(".oculto/50%"), "%2Eoculto%2F50%25")
+        self.assertIsNone(MODULE.shard_name(""))
+
+
+if __name__ == "__main__":
+    unittest.main()
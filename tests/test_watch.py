@@ -0,0 +1,78 @@
+import importlib.util
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+SPEC = importlib.util.spec_from_file_location("watch", SCRIPTS_DIR / "watch.py")
+MODULE = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(MODULE)
+change_log = MODULE.change_log
+
+
+class WatchTest(unittest.TestCase):
+    def test_bursts_of_commits_are_coalesced_into_one_rebuild(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            db_path = Path(temporary) / "fotos.db"
+            with sqlite3.connect(db_path) as connection:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute(
+                    "CREATE TABLE imagenes (id INTEGER PRIMARY KEY, path TEXT, date TEXT, "
+                    "author TEXT, description TEXT)"
+                )
+                change_log.install(connection)
+
+            rebuilds = []
+
+            def rebuild():
+                # Like a generator, mark the change log as processed; this
+                # write must not trigger another rebuild.
+                with sqlite3.connect(db_path) as connection:
+                    head, _, _ = change_log.pending(connection, "test")
+                    rebuilds.append(head)
+                    change_log.mark(connection, "test", head, None)
+
+            stop = threading.Event()
+            thread = threading.Thread(
+                target=MODULE.watch,
+                args=(db_path, rebuild, "test", stop),
+                kwargs={"interval": 0.02, "debounce": 0.2, "max_delay": 5},
+            )
+            thread.start()
+            try:
+                deadline = time.monotonic() + 5
+                while not rebuilds and time.monotonic() < deadline:
+                    time.sleep(0.02)
+                for photo_id in range(1, 4):
+                    with sqlite3.connect(db_path) as connection:
+                        connection.execute(
+                            "INSERT INTO imagenes (id, path) VALUES (?, ?)", (photo_id, f"{photo_id}.jpg")
+                        )
+                    time.sleep(0.05)
+                deadline = time.monotonic() + 5
+                while len(rebuilds) < 2 and time.monotonic() < deadline:
+                    time.sleep(0.02)
+                time.sleep(0.3)
+            finally:
+                stop.set()
+                thread.join(5)
+
+            self.assertFalse(thread.is_alive())
+            self.assertEqual([0, 3], rebuilds)
+
+    def test_settle_waits_at_most_max_delay(self):
+        connection = sqlite3.connect(":memory:")
+        started = time.monotonic()
+        MODULE.settle(connection, threading.Event(), 0.01, debounce=10, max_delay=0.1)
+        self.assertLess(time.monotonic() - started, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()